@@ -0,0 +1,197 @@
+# opt in timing and memory of the pipeline stages
+# the stages wrap their work in measure(stage), which does nothing unless an Instrumentation is
+# running. while one is, every stage adds its wall time, rows and tracemalloc peak to a record
+# per (stage, location), so a stage that runs once per batch still ends up as one line.
+# stages nest, the time and peak of a stage include the stages inside it. the report is json
+# and the whole run can also be dumped as a cProfile file. every stage module imports measure,
+# so cProfile, tracemalloc and json are only imported once a run asks for them
+import contextlib
+import os
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterator, TypedDict
+
+if TYPE_CHECKING:
+    import cProfile
+
+
+class StageRecord(TypedDict):
+    stage: str
+    location: str | None
+    calls: int # times the stage ran, once per batch for the batch stages
+    seconds: float
+    rows: int
+    rows_per_second: float
+    peak_mb: float | None # highest traced memory above the start of the stage
+
+
+class StageCounter:
+    """Handed to the code inside a stage so it can say how many rows it handled."""
+    __slots__ = ("rows",)
+
+    def __init__(self, rows: int = 0):
+        self.rows = rows
+
+
+# the running instrumentation of this process, None when nothing is measured
+_active: "Instrumentation | None" = None
+# handed out when nothing is measured, the rows set on it go nowhere
+_IGNORED = StageCounter()
+
+
+def active() -> "Instrumentation | None":
+    return _active
+
+
+def _make_parent_dir(path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+
+def measure(stage: str, location: str | None = None, rows: int = 0):
+    """Context manager around the work of one stage, yields a StageCounter to set the rows on.
+        location defaults to the location of the stage it is inside of"""
+    if _active is None:
+        return contextlib.nullcontext(_IGNORED)
+    return _active.stage(stage, location, StageCounter(rows))
+
+
+class Instrumentation:
+    def __init__(self, memory: bool = True, profile_path: str | None = None):
+        # tracemalloc makes everything slower, the times of a memory run are higher than usual
+        self.memory = memory
+        self.profile_path = profile_path
+        self.profiler: "cProfile.Profile | None" = None
+        self.started_at: datetime | None = None
+        self.started = 0.0
+        self.seconds = 0.0
+        self.totals: dict[tuple[str, str | None], StageRecord] = {}
+        # [memory when the stage started, highest memory seen so far] of every open stage
+        self._open: list[list[int]] = []
+        self._locations: list[str | None] = []
+        self._started_tracemalloc = False
+        self.pid: int | None = None
+
+    def start(self):
+        global _active
+        # a forked shard process starts with the instrumentation of its parent, that one is
+        # only replaced here and never stopped
+        if _active is not None and _active.pid == os.getpid():
+            raise Exception("Instrumentation is already running in this process")
+        _active = self
+        self.pid = os.getpid()
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        if self.memory:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+        if self.profile_path:
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop(self):
+        global _active
+        if self.profiler:
+            self.profiler.disable()
+            _make_parent_dir(self.profile_path)
+            self.profiler.dump_stats(self.profile_path)
+            self.profiler = None
+        if self._started_tracemalloc:
+            import tracemalloc
+
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self.seconds = time.perf_counter() - self.started
+        _active = None
+
+    def __enter__(self) -> "Instrumentation":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    @contextlib.contextmanager
+    def stage(self, stage: str, location: str | None, counter: StageCounter) -> Iterator[StageCounter]:
+        if location is None and self._locations:
+            location = self._locations[-1]
+        tracing = False
+        if self.memory:
+            import tracemalloc
+
+            tracing = tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            # the stage outside of this one keeps the peak it reached so far, then the peak is
+            # reset so this stage only sees its own
+            if self._open:
+                self._open[-1][1] = max(self._open[-1][1], peak)
+            tracemalloc.reset_peak()
+            self._open.append([current, current])
+        self._locations.append(location)
+        started = time.perf_counter()
+        try:
+            yield counter
+        finally:
+            seconds = time.perf_counter() - started
+            self._locations.pop()
+            peak_mb = None
+            if tracing:
+                start_memory, highest = self._open.pop()
+                highest = max(highest, tracemalloc.get_traced_memory()[1])
+                if self._open:
+                    self._open[-1][1] = max(self._open[-1][1], highest)
+                peak_mb = (highest - start_memory) / 2 ** 20
+            self._add(stage, location, 1, seconds, counter.rows, peak_mb)
+
+    def _add(self, stage: str, location: str | None, calls: int, seconds: float, rows: int, peak_mb: float | None):
+        record = self.totals.get((stage, location))
+        if record is None:
+            record = self.totals[(stage, location)] = StageRecord(
+                stage=stage, location=location, calls=0, seconds=0.0, rows=0, rows_per_second=0.0, peak_mb=None,
+            )
+        record["calls"] += calls
+        record["seconds"] += seconds
+        record["rows"] += rows
+        record["rows_per_second"] = record["rows"] / record["seconds"] if record["seconds"] else 0.0
+        if peak_mb is not None:
+            record["peak_mb"] = max(record["peak_mb"] or 0.0, peak_mb)
+
+    def merge(self, records: list[StageRecord]):
+        """Adds the records of an instrumentation that ran in another process."""
+        for record in records:
+            self._add(record["stage"], record["location"], record["calls"], record["seconds"], record["rows"],
+                      record["peak_mb"])
+
+    def records(self) -> list[StageRecord]:
+        return list(self.totals.values())
+
+    def report(self) -> dict:
+        return {
+            "started": self.started_at.isoformat() if self.started_at else None,
+            "seconds": self.seconds or (time.perf_counter() - self.started if self.started else 0.0),
+            "memory": self.memory,
+            "profile": self.profile_path,
+            "stages": self.records(),
+        }
+
+    def write_report(self, path: str):
+        import json
+
+        _make_parent_dir(path)
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+def location_profile_path(profile_path: str | None, location: str) -> str | None:
+    """The cProfile file of a location loaded in its own process, next to the run's file."""
+    if not profile_path:
+        return None
+    root, ext = os.path.splitext(profile_path)
+    return f"{root}_{location}{ext or '.prof'}"
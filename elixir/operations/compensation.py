@@ -0,0 +1,70 @@
+# employee compensation with effective dates, loaded from data/compensation.csv
+# each row of the file is the rate of one employee from its effective_from date until the
+# next row of the same employee, so a raise partway through a period is just another row.
+# shifts pick up their rate with one as-of join on the employee and the shift start
+import os
+from datetime import date
+from typing import TypedDict
+import numpy as np
+import pandas as pd
+
+COMPENSATION_FILE_NAME = "compensation.csv"
+COMPENSATION_FILE = os.path.join("data", COMPENSATION_FILE_NAME)
+# the employee identity, the rates are matched on the full name
+IDENTITY_COLUMNS = ["first_name", "last_name"]
+
+
+class CompensationEntry(TypedDict):
+    first_name: str
+    last_name: str
+    effective_from: date
+    rate: float
+    tips_eligible: bool
+
+
+class CompensationTable:
+    def __init__(self, entries: pd.DataFrame):
+        entries = entries[IDENTITY_COLUMNS + ["effective_from", "rate", "tips_eligible"]].copy()
+        for column in IDENTITY_COLUMNS:
+            entries[column] = entries[column].fillna("").astype(str).str.strip()
+        entries["effective_from"] = pd.to_datetime(entries["effective_from"]).astype("datetime64[us]")
+        entries["rate"] = entries["rate"].astype(float)
+        # "False" or "no" from a csv or a hand built frame are not eligible, bools read as themselves
+        entries["tips_eligible"] = entries["tips_eligible"].astype(str).str.strip().str.lower().isin(["true", "yes", "1"])
+        # merge_asof needs the right side sorted by the as-of column
+        self.entries = entries.sort_values("effective_from", kind="stable").reset_index(drop=True)
+
+    @classmethod
+    def from_csv(cls, csv_file: str = COMPENSATION_FILE) -> "CompensationTable":
+        """Loads the table from a csv with first_name, last_name, effective_from, rate and
+            tips_eligible columns"""
+        return cls(pd.read_csv(csv_file, dtype={"first_name": str, "last_name": str}, keep_default_na=False))
+
+    @classmethod
+    def from_entries(cls, entries: list[CompensationEntry]) -> "CompensationTable":
+        return cls(pd.DataFrame(entries, columns=IDENTITY_COLUMNS + ["effective_from", "rate", "tips_eligible"]))
+
+    def lookup(self, first_names, last_names, times) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the wage rate and tip eligibility in force at each time for each employee,
+            in the order given. Employees with no entry at that time get a rate of 0 and no tips"""
+        left = pd.DataFrame({
+            "first_name": pd.Series(first_names, dtype=object).fillna("").astype(str).to_numpy(),
+            "last_name": pd.Series(last_names, dtype=object).fillna("").astype(str).to_numpy(),
+            "time": np.asarray(times, dtype="datetime64[us]"),
+            "position": np.arange(len(first_names)),
+        })
+        left = left.sort_values("time", kind="stable")
+
+        matched = pd.merge_asof(
+            left, self.entries, left_on="time", right_on="effective_from", by=IDENTITY_COLUMNS, direction="backward"
+        ).sort_values("position")
+
+        missing = matched["rate"].isna()
+        if missing.any():
+            employees = matched.loc[missing, IDENTITY_COLUMNS].drop_duplicates()
+            names = sorted(f"{first} {last}".strip() for first, last in employees.itertuples(index=False))
+            print(f"Warning: no compensation in force for {', '.join(names)}, using a rate of 0 and no tips")
+
+        rates = matched["rate"].fillna(0.0).to_numpy(dtype=np.float64)
+        tips_eligible = matched["tips_eligible"].astype("boolean").fillna(False).to_numpy(dtype=bool)
+        return rates, tips_eligible
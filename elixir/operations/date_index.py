@@ -0,0 +1,59 @@
+# sorted index of shifts or tips by one of their datetimes
+# the records are sorted once and then every range or per day lookup is a binary search,
+# O(log n + k) instead of a scan over every record. the local date only ever moves forward
+# with the time, so the records of one day are always a single slice of the sorted list.
+# an index belongs to the list it was built from, replacing that list or adding to it makes
+# the index stale. records changed in place without a new list are not seen, replace the list
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from operator import itemgetter
+from typing import Generic, Iterable, TypeVar
+from elixir.operations.work_team import to_eastern
+
+Record = TypeVar("Record")
+
+
+def to_day(day: date | datetime) -> date:
+    """The local eastern date of a datetime, dates are returned as they are."""
+    if isinstance(day, datetime):
+        return to_eastern(day).date()
+    return day
+
+
+class DateIndex(Generic[Record]):
+    def __init__(self, records: Iterable[Record], key: str):
+        self.key = key
+        # the list the index was built from, see is_current
+        self.source = records
+        # sorted is stable so records at the same time keep the order they were parsed in
+        self.records: list[Record] = sorted(records, key=itemgetter(key))
+        self.keys: list[datetime] = [record[key] for record in self.records]
+        # first and end position of every local date
+        self.days: dict[date, tuple[int, int]] = {}
+        for position, key_datetime in enumerate(self.keys):
+            day = to_day(key_datetime)
+            first, _ = self.days.get(day, (position, position))
+            self.days[day] = (first, position + 1)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def is_current(self, records: list[Record]) -> bool:
+        """True when the index was built from this same list and it has not changed size."""
+        return records is self.source and len(records) == len(self.records)
+
+    def bounds(self, start: datetime | None = None, end: datetime | None = None) -> tuple[int, int]:
+        """Positions of the records with start <= key <= end, either end can be left open."""
+        first = bisect_left(self.keys, to_eastern(start)) if start else 0
+        last = bisect_right(self.keys, to_eastern(end)) if end else len(self.keys)
+        return first, max(first, last)
+
+    def between(self, start: datetime | None = None, end: datetime | None = None) -> list[Record]:
+        """The records with start <= key <= end in time order."""
+        first, last = self.bounds(start, end)
+        return self.records[first:last]
+
+    def on_day(self, day: date | datetime) -> list[Record]:
+        """The records on a local date in time order."""
+        first, last = self.days.get(to_day(day), (0, 0))
+        return self.records[first:last]
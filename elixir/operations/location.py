@@ -0,0 +1,316 @@
+# loading the time and tips csvs of each location into shifts and tips
+# ElixirOperations reads every csv of one location, load_locations runs it over every location
+# of the data folder. the package re-exports these names, import them from elixir.operations
+
+from datetime import datetime
+from itertools import repeat
+from typing import Callable, Iterable, Iterator, TypedDict
+from elixir.instrumentation import Instrumentation, StageRecord, active, location_profile_path, measure
+from elixir.quantic import QuanticTipCsvParser, QunanticShiftCsvParser, QuanticTipData, QunaticShiftData
+from elixir.quantic.cache import QuanticCsvCache
+from elixir.operations.date_index import DateIndex
+from elixir.operations.shift_parser import ElixirShiftParser, ElixirShift, SHIFT_LENGTH_MAX
+from elixir.operations.shift_validation import ShiftValidationReport, ShiftValidator
+from elixir.operations.tip_parser import ElixirTipParser, ElixirTip
+from elixir.operations.store import ElixirStore
+from elixir.operations.work_team import to_eastern
+import os
+
+# folder holding a sub folder per location, each with time and tips folders
+DATA_DIR = "data"
+
+
+def discover_locations(data_dir: str = DATA_DIR) -> list[str]:
+    """Returns the locations in the data folder, every sub folder that has a time or tips
+        folder is a location. Sorted so the locations are always processed in the same order"""
+    locations = []
+    for entry in sorted(os.scandir(data_dir), key=lambda entry: entry.name):
+        if not entry.is_dir():
+            continue
+        if any(os.path.isdir(os.path.join(entry.path, csv_type)) for csv_type in ("time", "tips")):
+            locations.append(entry.name.lower())
+    return locations
+
+
+def _read_csv_rows(parser_class, csv_file: str, cache: QuanticCsvCache | None) -> Iterable[dict]:
+    """Returns the quantic rows of one csv file, from the cache when one is given."""
+    if cache:
+        return cache.load_rows(parser_class, csv_file)
+    return parser_class(csv_file, stream=True).iter_rows()
+
+
+# the per file work is done in module level functions so they can be sent to a process pool
+def parse_time_file(csv_file: str, location: str, cache: QuanticCsvCache | None = None,
+                    validator: ShiftValidator | None = None) -> tuple[list, ShiftValidationReport]:
+    """Parses one time csv file into alpha/bravo shifts grouped by punch, see
+        ElixirShiftParser.iter_punches, and the validation report of the file. A validator
+        that already holds the punches of other files also quarantines overlaps with those"""
+    rows = _read_csv_rows(QunanticShiftCsvParser, csv_file, cache)
+    shift_parser = ElixirShiftParser(rows, location, stream=True, validator=validator, csv_file=csv_file)
+    return list(shift_parser.iter_punches()), shift_parser.validation
+
+
+def parse_tips_file(csv_file: str, location: str, cache: QuanticCsvCache | None = None) -> list[ElixirTip]:
+    """Parses one tips csv file into tips."""
+    rows = _read_csv_rows(QuanticTipCsvParser, csv_file, cache)
+    return ElixirTipParser(rows, location).parsed_tips
+
+
+def _load_location(location: str, data_dir: str, cache: QuanticCsvCache | None, workers: int | None,
+                   store: ElixirStore | None) -> "ElixirOperations":
+    return ElixirOperations(location=location, cache=cache, workers=workers, data_dir=data_dir, store=store)
+
+
+def _load_location_instrumented(location: str, data_dir: str, cache: QuanticCsvCache | None, workers: int | None,
+                                store: ElixirStore | None, memory: bool, profile_path: str | None
+                                ) -> tuple["ElixirOperations", list[StageRecord]]:
+    """_load_location in a shard process measured by its own instrumentation, the records are
+        sent back to be merged into the run's"""
+    with Instrumentation(memory, location_profile_path(profile_path, location)) as instrumentation:
+        ops = _load_location(location, data_dir, cache, workers, store)
+    return ops, instrumentation.records()
+
+
+def load_locations(locations: list[str] | None = None, data_dir: str = DATA_DIR, cache: QuanticCsvCache | None = None,
+                   workers: int | None = None, shards: int | None = None,
+                   store: ElixirStore | None = None) -> dict[str, "ElixirOperations"]:
+    """Loads the operations of every location, each location is an independent shard.
+        With more than one shard the locations are loaded in that many processes at once,
+        the results are keyed and ordered by location either way. locations defaults to the
+        locations found in data_dir"""
+    if locations is None:
+        locations = discover_locations(data_dir)
+    locations = [location.lower() for location in locations]
+
+    if shards and shards > 1 and len(locations) > 1:
+        # the process pool is only imported when it is used, it is slow to import
+        from concurrent.futures import ProcessPoolExecutor
+
+        instrumentation = active()
+        with ProcessPoolExecutor(max_workers=min(shards, len(locations))) as pool:
+            if instrumentation is None:
+                loaded = list(pool.map(_load_location, locations, repeat(data_dir), repeat(cache), repeat(workers),
+                                       repeat(store)))
+            else:
+                # each shard measures itself, the records come back with the operations
+                loaded = []
+                for ops, records in pool.map(_load_location_instrumented, locations, repeat(data_dir), repeat(cache),
+                                             repeat(workers), repeat(store), repeat(instrumentation.memory),
+                                             repeat(instrumentation.profile_path)):
+                    instrumentation.merge(records)
+                    loaded.append(ops)
+    else:
+        loaded = [_load_location(location, data_dir, cache, workers, store) for location in locations]
+    return dict(zip(locations, loaded))
+
+
+class ElixirOperations:
+    def __init__(self, location: str = "buford", stream: bool = False, cache: QuanticCsvCache | None = None,
+                 workers: int | None = None, data_dir: str = DATA_DIR, store: ElixirStore | None = None):
+        self.location = location.lower()
+        self.data_dir = data_dir
+        # optional sqlite store, the parsed shifts and tips are upserted into it and
+        # get_workers is answered from it
+        self.store = store
+        # optional cache of parsed csv files, unchanged files are read from it instead of parsed
+        self.cache = cache
+        # number of processes used to parse the csv files, None or 1 parses them in this process
+        self.workers = workers
+        self.shifts: list[ElixirShift] = []
+        self.tips: list[ElixirTip] = []
+        # shifts sorted by start date for the date range lookups, built on first use
+        self._shift_index: DateIndex[ElixirShift] | None = None
+        # problems found in the shift data, the bad shifts are quarantined here instead of stopping the run
+        self.validation = ShiftValidationReport()
+
+        # in stream mode nothing is loaded up front, use iter_shifts() and iter_tips()
+        if not stream:
+            self.process_time()
+            self.process_tips()
+
+
+    def get_workers(self, start_date_range:datetime| None =None, end_date_range: datetime | None = None) -> list[str]:
+        """Returns a unique list of workers on shifts
+        optional datetime range"""
+        # every shift that ends by end_date_range also starts by it, so the shifts to check are
+        # one slice of the shifts sorted by start date
+        shifts = self.shift_index.between(start_date_range, end_date_range)
+        if end_date_range:
+            end_date_range = to_eastern(end_date_range)
+            shifts = [shift for shift in shifts if shift.get("end_date") <= end_date_range]
+
+        # get a distinct list of workers on shifts, sorted so the result is always the same
+        return sorted({f"{shift.get('first_name','')} {shift.get('last_name','')}" for shift in shifts})
+
+    def get_stored_workers(self, start_date_range: datetime | None = None,
+                           end_date_range: datetime | None = None) -> list[str]:
+        """Same as get_workers but answered from the store, so it covers every export of the
+            location ever loaded into it and not only the shifts parsed here"""
+        if not self.store:
+            raise ValueError(f"get_stored_workers needs a store, {self.location} has none")
+        return self.store.get_workers(self.location, start_date_range, end_date_range)
+
+    @property
+    def shift_index(self) -> DateIndex[ElixirShift]:
+        """self.shifts sorted by start date, rebuilt when self.shifts is replaced or has changed size."""
+        if self._shift_index is None or not self._shift_index.is_current(self.shifts):
+            self._shift_index = DateIndex(self.shifts, "start_date")
+        return self._shift_index
+
+    def get_csv_paths(self, csv_type: str = 'time'):
+        # csv type is either time or tips
+        # the location of the file after the data folder has the site location
+        # e.g. data/buford/tipsb_time_33125.csv
+        # we would  return buford as the site location
+        if csv_type not in ['time', 'tips']:
+            raise ValueError(f"Invalid csv_type: {csv_type}. Must be 'time' or 'tips'.")
+        location_name = self.location.lower()
+        csv_type = csv_type.lower()
+        csv_directory = os.path.join(self.data_dir, location_name, csv_type)
+        # a location may only have one of the two folders
+        if not os.path.isdir(csv_directory):
+            return []
+        # get all the csv files in the directory, sorted so the files are always read in the same order
+        directory_files = sorted(os.listdir(csv_directory))
+        # filter out the files that are not csvs
+        csv_files = [file for file in directory_files if file.endswith('.csv')]
+        # want to return the full path to the csv files
+        csv_files_paths = [os.path.join(csv_directory, file) for file in csv_files]
+        # return the list of csv files
+        return csv_files_paths
+
+
+    def iter_time_rows(self) -> Iterator[QunaticShiftData]:
+        """Yields the quantic shift rows of every time csv for the location, one file at a time."""
+        for csv_file in self.get_csv_paths("time"):
+            yield from _read_csv_rows(QunanticShiftCsvParser, csv_file, self.cache)
+
+    def iter_tip_rows(self) -> Iterator[QuanticTipData]:
+        """Yields the quantic tip rows of every tips csv for the location, one file at a time."""
+        for csv_file in self.get_csv_paths("tips"):
+            yield from _read_csv_rows(QuanticTipCsvParser, csv_file, self.cache)
+
+    def iter_punches(self, validator: ShiftValidator | None = None
+                     ) -> Iterator[tuple[int, QunaticShiftData, datetime, datetime, list[ElixirShift]]]:
+        """Streams the punches of every time csv, see ElixirShiftParser.iter_punches. Each file
+            gets its own parser so the issues point at rows of their file, the parsers share
+            one validator so a punch overlapping a punch of an earlier file is quarantined"""
+        validator = validator or ShiftValidator(self.location, SHIFT_LENGTH_MAX)
+        for csv_file in self.get_csv_paths("time"):
+            rows = _read_csv_rows(QunanticShiftCsvParser, csv_file, self.cache)
+            yield from ElixirShiftParser(rows, self.location, stream=True, validator=validator,
+                                         csv_file=csv_file).iter_punches()
+
+    def iter_shifts(self) -> Iterator[ElixirShift]:
+        """Streams the parsed shifts straight from the csv files without building any lists.
+            self.validation is filled in as the shifts are read"""
+        validator = ShiftValidator(self.location, SHIFT_LENGTH_MAX)
+        self.validation = validator.report
+        return (team_shift for *_, team_shifts in self.iter_punches(validator) for team_shift in team_shifts)
+
+    def iter_tips(self) -> Iterator[ElixirTip]:
+        """Streams the parsed tips straight from the csv files without building any lists."""
+        return ElixirTipParser(self.iter_tip_rows(), self.location, stream=True).iter_tips()
+
+    def _parse_files_in_pool(self, parse_file: Callable, csv_files: list[str]) -> list:
+        """Runs parse_file for every csv file in a process pool. The results come back in
+            the order of csv_files so merging them gives the same output as a serial run"""
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(csv_files))) as pool:
+            return list(pool.map(parse_file, csv_files, repeat(self.location), repeat(self.cache)))
+
+    def _use_pool(self, csv_files: list[str]) -> bool:
+        return bool(self.workers and self.workers > 1 and len(csv_files) > 1)
+
+    def process_time(self) -> list[ElixirShift]:
+        # the default location is buford thie is the folder after data that holds
+        # the data for time and tips
+        with measure("process_time", self.location) as counter:
+            self._process_time()
+            counter.rows = len(self.shifts)
+
+        print(f"process time parsed shifts length {len(self.shifts)}")
+        if self.validation.issues:
+            print(f"Warning: {self.location} shift validation {self.validation.summary()}")
+        return self.shifts
+
+    def _process_time(self):
+        csv_files = self.get_csv_paths("time")
+        if self._use_pool(csv_files):
+            # each csv file is parsed, validated and split in its own process, the punches
+            # are then checked here for overlaps between the files
+            self.shifts = []
+            self.validation = ShiftValidationReport()
+            overlap_validator = ShiftValidator(self.location, SHIFT_LENGTH_MAX)
+            file_punches_kept = []
+            parsed_files = self._parse_files_in_pool(parse_time_file, csv_files)
+            for csv_file, (file_punches, file_validation) in zip(csv_files, parsed_files):
+                self.validation.extend(file_validation)
+                kept = []
+                for punch in file_punches:
+                    row_index, shift, clocked_in, clocked_out, team_shifts = punch
+                    if not overlap_validator.check_overlap(row_index, shift, clocked_in, clocked_out, csv_file):
+                        kept.append(punch)
+                        self.shifts.extend(team_shifts)
+                file_punches_kept.append(kept)
+            self.validation.extend(overlap_validator.report)
+            if self.store:
+                self._store_punches(csv_files, file_punches_kept)
+        elif self.store:
+            # the punches are kept together by file so the store can replace what each file
+            # added last time
+            validator = ShiftValidator(self.location, SHIFT_LENGTH_MAX)
+            self.validation = validator.report
+            file_punches_kept = [parse_time_file(csv_file, self.location, self.cache, validator)[0]
+                                 for csv_file in csv_files]
+            self._store_punches(csv_files, file_punches_kept)
+            self.shifts = [team_shift for punches in file_punches_kept for *_, team_shifts in punches
+                           for team_shift in team_shifts]
+        else:
+            # the rows are streamed from each csv file into the shift parser so the only
+            # list we build is the final list of shifts
+            self.shifts = list(self.iter_shifts())
+        self._shift_index = None
+
+
+    def _store_punches(self, csv_files: list[str], file_punches: list[list]):
+        with measure("store_upsert_punches", rows=sum(len(punches) for punches in file_punches)):
+            for csv_file, punches in zip(csv_files, file_punches):
+                self.store.upsert_punches(self.location, punches, csv_file)
+
+    def process_tips(self) -> list[ElixirTip]:
+        # the data for time and tips
+        csv_files = self.get_csv_paths("tips")
+        with measure("process_tips", self.location) as counter:
+            file_tips = None
+            if self._use_pool(csv_files):
+                file_tips = self._parse_files_in_pool(parse_tips_file, csv_files)
+            elif self.store:
+                # the store replaces what each file added last time, so the tips are kept by file
+                file_tips = [parse_tips_file(csv_file, self.location, self.cache) for csv_file in csv_files]
+            if file_tips is not None:
+                self.tips = [tip for tips in file_tips for tip in tips]
+            else:
+                # the rows are streamed from each csv file into the tip parser
+                self.tips = list(self.iter_tips())
+            counter.rows = len(self.tips)
+
+        if self.store:
+            with measure("store_upsert_tips", self.location, rows=len(self.tips)):
+                for csv_file, tips in zip(csv_files, file_tips):
+                    self.store.upsert_tips(tips, csv_file)
+
+        print(f"process tips parsed tips length {len(self.tips)}")
+        return self.tips
+
+
+# Example Usage:
+# if __name__ == '__main__':
+#     time_data = ElixirOperations().process_time()
+#     for time in time_data[:10]:
+#         print(json.dumps(time, indent=4))
+
+#     tip_data = ElixirOperations().process_tips()
+#     for tip in tip_data[:10]:
+#         print(json.dumps(tip, indent=4))
@@ -0,0 +1,68 @@
+# weekly overtime over the alpha/bravo shift segments
+# the 40th hour of a week can fall in the middle of a segment, so the segments are sorted
+# once by employee, week and clock in time and a grouped running total of the hours says how
+# many hours each employee had before every segment. a segment is regular time up to the
+# threshold and overtime after it, all of it array math over the whole frame
+from typing import TYPE_CHECKING, NamedTuple
+
+# OvertimeRule is needed to parse the command line, numpy and pandas only load with the split
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class OvertimeRule(NamedTuple):
+    weekly_hours: float = 40.0 # hours of a week paid at the regular rate
+    multiplier: float = 1.5 # overtime pay is the wage rate times this
+    week_start: int = 0 # weekday the work week starts on, monday is 0
+
+
+class OvertimeSplit(NamedTuple):
+    regular_hours: "np.ndarray"
+    overtime_hours: "np.ndarray"
+    week_start: "np.ndarray" # datetime64[D] first day of the work week of each segment
+
+
+def week_starts(days, week_start: int = 0) -> "np.ndarray":
+    """The first day of the work week of each day."""
+    import numpy as np
+
+    day_numbers = np.asarray(days, dtype="datetime64[D]").astype(np.int64)
+    # 1970-01-01 was a thursday, weekday 3
+    return (day_numbers - (day_numbers + 3 - week_start) % 7).astype("datetime64[D]")
+
+
+def split_overtime(employee_codes, start_times, hours_worked, rule: OvertimeRule = OvertimeRule()) -> OvertimeSplit:
+    """Splits the hours of every segment into regular and overtime hours. The week of a segment
+        is the week it starts in, segments are counted in clock in order within each
+        employee's week"""
+    import numpy as np
+
+    employee_codes = np.asarray(employee_codes, dtype=np.int64)
+    start_times = np.asarray(start_times, dtype="datetime64[us]")
+    hours = np.asarray(hours_worked, dtype=np.float64)
+    weeks = week_starts(start_times, rule.week_start)
+
+    # segments of one employee's week next to each other, in clock in order
+    order = np.lexsort((start_times, weeks, employee_codes))
+    sorted_hours = hours[order]
+    running = np.cumsum(sorted_hours)
+
+    # running total at the end of each segment minus the total before its group started
+    group_first = np.ones(len(order), dtype=bool)
+    group_first[1:] = (employee_codes[order][1:] != employee_codes[order][:-1]) | (weeks[order][1:] != weeks[order][:-1])
+    group_offset = np.maximum.accumulate(np.where(group_first, np.arange(len(order)), 0))
+    hours_before = running - sorted_hours - (running - sorted_hours)[group_offset]
+
+    regular = np.empty_like(hours)
+    regular[order] = np.clip(rule.weekly_hours - hours_before, 0.0, sorted_hours)
+    return OvertimeSplit(regular_hours=regular, overtime_hours=hours - regular, week_start=weeks)
+
+
+def employee_codes(first_names, last_names) -> "np.ndarray":
+    """One integer per distinct (first_name, last_name)."""
+    import numpy as np
+    import pandas as pd
+
+    names = pd.MultiIndex.from_arrays([pd.Index(first_names, dtype=object), pd.Index(last_names, dtype=object)])
+    codes, _ = pd.factorize(names)
+    return codes.astype(np.int64)
@@ -0,0 +1,45 @@
+# pay periods given as a sorted list of boundary dates
+# each period runs from one boundary up to the day before the next, so n boundaries make
+# n - 1 periods back to back. rows are put in their period with one sorted search on their
+# local date, a year of periods costs the same as one
+from datetime import date
+import numpy as np
+import pandas as pd
+
+
+class PayPeriods:
+    def __init__(self, boundaries: list[date | str]):
+        self.boundaries = np.unique(np.array([np.datetime64(b, "D") for b in boundaries], dtype="datetime64[D]"))
+        if len(self.boundaries) < 2:
+            raise Exception(f"pay periods need at least a start and an end boundary, got {list(boundaries)}")
+
+    def __len__(self) -> int:
+        return len(self.boundaries) - 1
+
+    @property
+    def starts(self) -> np.ndarray:
+        """First day of each period."""
+        return self.boundaries[:-1]
+
+    @property
+    def ends(self) -> np.ndarray:
+        """Last day of each period, the day before the next boundary."""
+        return self.boundaries[1:] - np.timedelta64(1, "D")
+
+    def tag(self, days) -> np.ndarray:
+        """Returns the period number of each day, -1 for days outside every period."""
+        days = np.asarray(days, dtype="datetime64[D]")
+        periods = np.searchsorted(self.boundaries, days, side="right") - 1
+        periods[(periods < 0) | (periods >= len(self))] = -1
+        return periods
+
+    def tag_frame(self, df: pd.DataFrame, date_column: str = "date") -> pd.DataFrame:
+        """Adds period_start and period_end columns from the local date column, rows outside
+            every period get None for both. The frame is changed in place and returned"""
+        periods = self.tag(df[date_column].to_numpy())
+        outside = periods < 0
+        starts = np.where(outside, np.datetime64("NaT"), self.starts[periods])
+        ends = np.where(outside, np.datetime64("NaT"), self.ends[periods])
+        df["period_start"] = starts.astype("datetime64[D]").astype(object)
+        df["period_end"] = ends.astype("datetime64[D]").astype(object)
+        return df
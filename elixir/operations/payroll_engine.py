@@ -0,0 +1,119 @@
+# array versions of the payroll math in summary_dataframes and payroll_utils
+# the (date, location, shift_type) keys are encoded to integer codes once, after that the
+# daily sums are bincounts and the joins are plain array lookups by code, no row-wise
+# python runs at all. the codes are ordered like the keys so the groups come out in the
+# same order as a sorted groupby
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+class GroupKeys(NamedTuple):
+    # sorted values each part of a code stands for
+    dates: np.ndarray # datetime64[D]
+    locations: np.ndarray
+    shift_types: np.ndarray
+
+    @property
+    def size(self) -> int:
+        """The number of possible codes, every code is below this."""
+        return len(self.dates) * len(self.locations) * len(self.shift_types)
+
+    def decode(self, codes) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the days, locations and shift types of the codes."""
+        codes = np.asarray(codes, dtype=np.int64)
+        date_codes, rest = np.divmod(codes, len(self.locations) * len(self.shift_types))
+        location_codes, shift_type_codes = np.divmod(rest, len(self.shift_types))
+        return self.dates[date_codes], self.locations[location_codes], self.shift_types[shift_type_codes]
+
+
+def _factorize(parts: list, dtype) -> tuple[list[np.ndarray], np.ndarray]:
+    """Numbers the values of all the parts together by their sorted distinct values, returns
+        the codes of each part and the distinct values"""
+    values = np.concatenate([np.asarray(part, dtype=dtype) for part in parts])
+    codes, uniques = pd.factorize(values, sort=True)
+    splits = np.cumsum([len(part) for part in parts])[:-1]
+    return np.split(codes.astype(np.int64), splits), np.asarray(uniques, dtype=dtype)
+
+
+def encode_group_keys(*columns: tuple) -> tuple[GroupKeys, list[np.ndarray]]:
+    """Encodes one or more (days, locations, shift_types) column triples to combined group codes.
+        All the triples share one numbering so codes from shifts and tips can be matched, the
+        codes of each triple are returned in the order given"""
+    date_codes, dates = _factorize([c[0] for c in columns], "datetime64[D]")
+    location_codes, locations = _factorize([c[1] for c in columns], object)
+    shift_type_codes, shift_types = _factorize([c[2] for c in columns], object)
+
+    keys = GroupKeys(dates=dates, locations=locations, shift_types=shift_types)
+    codes = [
+        combine_codes(d, l, t, len(locations), len(shift_types))
+        for d, l, t in zip(date_codes, location_codes, shift_type_codes)
+    ]
+    return keys, codes
+
+
+def combine_codes(date_codes, location_codes, shift_type_codes, n_locations: int, n_shift_types: int) -> np.ndarray:
+    """Packs the part codes into one code, ordered by date then location then shift type."""
+    date_codes = np.asarray(date_codes, dtype=np.int64)
+    return (date_codes * n_locations + np.asarray(location_codes, dtype=np.int64)) * n_shift_types \
+        + np.asarray(shift_type_codes, dtype=np.int64)
+
+
+class DailyRates(NamedTuple):
+    # one entry per (date, location, shift_type) that has shifts, sorted by code
+    codes: np.ndarray
+    minutes_worked: np.ndarray
+    tip_amount: np.ndarray # nan when there were no tips
+    hourly_tip_rate: np.ndarray
+
+
+def daily_rates(shift_codes, minutes_worked, tip_codes, tip_amounts, size: int) -> DailyRates:
+    """Sums the minutes worked and the tips of each group and works out the hourly tip rate.
+        Groups with shifts but no tips keep a nan tip amount and rate, same as the left merge
+        of the daily frames did"""
+    shift_codes = np.asarray(shift_codes, dtype=np.int64)
+    tip_codes = np.asarray(tip_codes, dtype=np.int64)
+
+    shift_counts = np.bincount(shift_codes, minlength=size)
+    minutes = np.bincount(shift_codes, weights=np.asarray(minutes_worked, dtype=np.float64), minlength=size)
+    tip_counts = np.bincount(tip_codes, minlength=size)
+    tips = np.bincount(tip_codes, weights=np.asarray(tip_amounts, dtype=np.float64), minlength=size)
+
+    codes = np.flatnonzero(shift_counts)
+    minutes = minutes[codes]
+    tips = np.where(tip_counts[codes] > 0, tips[codes], np.nan)
+
+    hours = minutes / 60
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(minutes > 0, tips / np.where(hours > 0, hours, 1), 0.0)
+
+    return DailyRates(codes=codes, minutes_worked=minutes, tip_amount=tips, hourly_tip_rate=rate)
+
+
+def lookup_by_code(group_codes, group_values, codes, size: int, fill: float = np.nan) -> np.ndarray:
+    """Array version of a left join on the group code, returns the value of the group of each
+        code or fill when the group isn't there"""
+    table = np.full(size, fill, dtype=np.float64)
+    table[np.asarray(group_codes, dtype=np.int64)] = np.asarray(group_values, dtype=np.float64)
+    return table[np.asarray(codes, dtype=np.int64)]
+
+
+def shift_tips(hours_worked, hourly_tip_rate, tips_eligible) -> np.ndarray:
+    """The tips of each shift, hours times the group rate for the shifts that get tips.
+        A nan rate, a group without tips or one missing from the rates, counts as no tips so
+        the total comp of the shift is still its wages"""
+    rate = np.nan_to_num(np.asarray(hourly_tip_rate, dtype=np.float64), nan=0.0)
+    return np.where(np.asarray(tips_eligible, dtype=bool), np.asarray(hours_worked, dtype=np.float64) * rate, 0.0)
+
+
+# "%I:%M %p" of every minute of the day, indexed by minute
+CLOCK_LABELS = np.array([f"{(minute // 60) % 12 or 12:02d}:{minute % 60:02d} {'AM' if minute < 720 else 'PM'}"
+                         for minute in range(24 * 60)], dtype=object)
+
+
+def format_clock_times(times) -> np.ndarray:
+    """Array version of strftime('%I:%M %p') for naive datetime64 wall clock times, each time
+        is looked up by its minute of the day instead of formatting it"""
+    minutes = np.asarray(times, dtype="datetime64[m]").astype(np.int64)
+    return CLOCK_LABELS[minutes % (24 * 60)]
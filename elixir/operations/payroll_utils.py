@@ -1,87 +1,161 @@
 import pandas as pd
+from elixir.instrumentation import measure
 from zoneinfo import ZoneInfo
-from elixir.operations import ElixirOperations
-from elixir.reports.summary_dataframes import get_summary_dataframes
+from elixir.operations import DATA_DIR
+from elixir.operations.compensation import CompensationTable
+from elixir.operations.overtime import OvertimeRule, employee_codes, split_overtime
+from elixir.operations.pay_periods import PayPeriods
+from elixir.operations.payroll_engine import encode_group_keys, format_clock_times, lookup_by_code, shift_tips
+from elixir.operations.tip_allocation import allocate_tips
+from elixir.quantic.cache import QuanticCsvCache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from elixir.pipeline import PayrollRun
 
 # --- Constants ---
 eastern = ZoneInfo("America/New_York")
 
-# Static employee compensation data (for now hardcoded)
-EMPLOYEE_COMPENSATION = {
-    "Chad":      {"rate": 0.00, "tips": False},
-    "Colleen":   {"rate": 0.00, "tips": False},
-    "Ryan":      {"rate": 0.00, "tips": False},
-    "Alyssa":    {"rate": 0.00, "tips": False},
-    "Bennet":    {"rate": 12.00, "tips": True},
-    "Joanna":    {"rate": 12.00, "tips": True},
-    "Kathryn":   {"rate": 12.00, "tips": True},
-    "Melanie":   {"rate": 12.00, "tips": True},
-    "Nate":      {"rate": 15.00, "tips": True},
-    "Pam":       {"rate": 12.00, "tips": True},
-    "Patrick":   {"rate": 12.00, "tips": True},
-    "Samantha":  {"rate": 12.00, "tips": True},
-    "Sarah Beth":{"rate": 15.00, "tips": True},
-    "Caroline":  {"rate": 12.00, "tips": True},
-    "Lauren":    {"rate": 12.00, "tips": True},
-    "Laura":     {"rate": 12.00, "tips": True},
-    "Becca":     {"rate": 12.00, "tips": True},
-    "Keri":      {"rate": 12.00, "tips": True},
-    "Haley":     {"rate": 12.00, "tips": True},
-    "Vanessa":   {"rate": 12.00, "tips": True},
-}
-
-def get_payroll_calculations():
-    # Load parsed summary DataFrames
-    shifts_df, tips_df, daily_rates_df = get_summary_dataframes()
-
-    # Convert datetime and extract date
-    datetime_cols = ['start_date', 'end_date']
-    for col in datetime_cols:
-        shifts_df[col] = pd.to_datetime(shifts_df[col])
-    shifts_df['clock_in'] = shifts_df['start_date'].dt.strftime('%I:%M %p')
-    shifts_df['clock_out'] = shifts_df['end_date'].dt.strftime('%I:%M %p')
+
+def get_payroll_calculations(cache: QuanticCsvCache | None = None, workers: int | None = None,
+                             run: "PayrollRun | None" = None, compensation: CompensationTable | None = None,
+                             periods: PayPeriods | None = None, data_dir: str = DATA_DIR, shards: int | None = None,
+                             allocate: bool = False, overtime: OvertimeRule | None = None):
+    # a run already holding the summary frames is used as is, otherwise one is made here so the
+    # tips are allocated on the aware times of its parsed records
+    if run is None:
+        from elixir.pipeline import PayrollRun
+
+        run = PayrollRun(cache=cache, workers=workers, compensation=compensation, periods=periods, data_dir=data_dir,
+                         shards=shards, allocate=allocate, overtime=overtime)
+    return run.payroll
+
+
+def build_payroll_calculations(shifts_df: pd.DataFrame, daily_rates_df: pd.DataFrame,
+                               compensation: CompensationTable | None = None, periods: PayPeriods | None = None,
+                               tips_df: pd.DataFrame | None = None, overtime: OvertimeRule | None = None,
+                               shift_times_df: pd.DataFrame | None = None):
+    """Builds the payroll detail and summary frames from the summary frames. The frames given
+        are not changed so they can still be written out as they are.
+        With pay periods every shift is tagged with the period of its date, shifts outside all
+        the periods are left out and both frames are grouped by period.
+        With the tips frame every tip is also credited to the tip eligible staff on the clock
+        when it came in, next to the pooled shift_tip. The tips are allocated on epoch time, on
+        the aware start_date and end_date of shift_times_df when it is given, its rows in the
+        order of shifts_df, the wall clock of shifts_df is read as eastern otherwise.
+        With an overtime rule the hours of each employee's work week past the threshold are paid
+        at the overtime rate and wages is the regular plus the overtime wages"""
+    with measure("payroll_calculations", rows=len(shifts_df)):
+        return _build_payroll_calculations(shifts_df, daily_rates_df, compensation, periods, tips_df, overtime,
+                                           shift_times_df)
+
+
+def _build_payroll_calculations(shifts_df: pd.DataFrame, daily_rates_df: pd.DataFrame,
+                                compensation: CompensationTable | None, periods: PayPeriods | None,
+                                tips_df: pd.DataFrame | None, overtime: OvertimeRule | None,
+                                shift_times_df: pd.DataFrame | None = None):
+    if compensation is None:
+        compensation = CompensationTable.from_csv()
+    shifts_df = shifts_df.copy()
+
+    # start_date and end_date are already datetime columns, extract the times and date
+    shifts_df['clock_in'] = format_clock_times(shifts_df['start_date'].to_numpy())
+    shifts_df['clock_out'] = format_clock_times(shifts_df['end_date'].to_numpy())
     shifts_df['date'] = shifts_df['start_date'].dt.date
 
     # Calculate hours worked per shift
     shifts_df['hours_worked'] = (shifts_df['end_date'] - shifts_df['start_date']).dt.total_seconds() / 3600
 
-    # Add wage rate and tip eligibility
-    shifts_df['wage_rate'] = shifts_df['first_name'].map(lambda x: EMPLOYEE_COMPENSATION.get(x, {}).get('rate', 0))
-    shifts_df['tips_eligible'] = shifts_df['first_name'].map(lambda x: EMPLOYEE_COMPENSATION.get(x, {}).get('tips', False))
+    # Add the wage rate and tip eligibility in force when each shift started
+    with measure("compensation_lookup", rows=len(shifts_df)):
+        shifts_df['wage_rate'], shifts_df['tips_eligible'] = compensation.lookup(
+            shifts_df['first_name'], shifts_df['last_name'], shifts_df['start_date']
+        )
 
     # Calculate wages
-    shifts_df['wages'] = shifts_df['hours_worked'] * shifts_df['wage_rate']
-
-    # Merge in tip rate
-    shifts_df = pd.merge(
-        shifts_df,
-        daily_rates_df[['date', 'location', 'shift_type', 'hourly_tip_rate']],
-        on=['date', 'location', 'shift_type'],
-        how='left'
+    if overtime is None:
+        shifts_df['wages'] = shifts_df['hours_worked'] * shifts_df['wage_rate']
+    else:
+        with measure("overtime", rows=len(shifts_df)):
+            split = split_overtime(
+                employee_codes(shifts_df['first_name'], shifts_df['last_name']),
+                shifts_df['start_date'].to_numpy(), shifts_df['hours_worked'].to_numpy(), overtime,
+            )
+        shifts_df['week_start'] = split.week_start.astype(object)
+        shifts_df['regular_hours'] = split.regular_hours
+        shifts_df['overtime_hours'] = split.overtime_hours
+        shifts_df['regular_wages'] = shifts_df['regular_hours'] * shifts_df['wage_rate']
+        shifts_df['overtime_wages'] = shifts_df['overtime_hours'] * shifts_df['wage_rate'] * overtime.multiplier
+        shifts_df['wages'] = shifts_df['regular_wages'] + shifts_df['overtime_wages']
+
+    # Join in the tip rate of each shift's (date, location, shift_type) by integer code
+    shift_keys = (
+        shifts_df['start_date'].to_numpy().astype('datetime64[D]'),
+        shifts_df['location'].to_numpy(dtype=object),
+        shifts_df['shift_type'].to_numpy(dtype=object),
+    )
+    rate_keys = (
+        daily_rates_df['date'].to_numpy().astype('datetime64[D]'),
+        daily_rates_df['location'].to_numpy(dtype=object),
+        daily_rates_df['shift_type'].to_numpy(dtype=object),
     )
+    with measure("tip_rate_join", rows=len(shifts_df)):
+        keys, (shift_codes, rate_codes) = encode_group_keys(shift_keys, rate_keys)
+        shifts_df['hourly_tip_rate'] = lookup_by_code(
+            rate_codes, daily_rates_df['hourly_tip_rate'].to_numpy(), shift_codes, keys.size
+        )
 
     # Calculate shift_tip
-    shifts_df['shift_tip'] = shifts_df.apply(
-        lambda row: row['hours_worked'] * row['hourly_tip_rate'] if row['tips_eligible'] else 0,
-        axis=1
-    )
+    shifts_df['shift_tip'] = shift_tips(shifts_df['hours_worked'], shifts_df['hourly_tip_rate'], shifts_df['tips_eligible'])
 
     # Calculate total compensation
     shifts_df['total_comp'] = shifts_df['wages'] + shifts_df['shift_tip']
 
-    # Payroll calculation detail
-    payroll_calc_df = shifts_df[[
+    detail_columns = [
         'first_name', 'last_name', 'date','clock_in','clock_out', 'location', 'shift_type',
         'hours_worked', 'wage_rate', 'wages', 'shift_tip', 'total_comp'
-    ]]
-
-    # Payroll summary by employee
-    payroll_summary_df = payroll_calc_df.groupby(['first_name', 'last_name']).agg(
-        total_hours=('hours_worked', 'sum'),
-        total_wages=('wages', 'sum'),
-        total_tips=('shift_tip', 'sum'),
-        total_comp=('total_comp', 'sum')
-    ).reset_index()
+    ]
+    summary_keys = ['first_name', 'last_name']
+    summary_totals = {
+        'total_hours': ('hours_worked', 'sum'),
+        'total_wages': ('wages', 'sum'),
+        'total_tips': ('shift_tip', 'sum'),
+        'total_comp': ('total_comp', 'sum'),
+    }
+
+    if overtime is not None:
+        position = detail_columns.index('wages')
+        detail_columns[position:position] = ['week_start', 'regular_hours', 'overtime_hours', 'regular_wages', 'overtime_wages']
+        summary_totals['total_regular_hours'] = ('regular_hours', 'sum')
+        summary_totals['total_overtime_hours'] = ('overtime_hours', 'sum')
+        summary_totals['total_overtime_wages'] = ('overtime_wages', 'sum')
+
+    if tips_df is not None:
+        with measure("tip_allocation", rows=len(shifts_df) + len(tips_df)):
+            shifts_df['allocated_tip'], unallocated = allocate_tips(
+                shifts_df if shift_times_df is None else shift_times_df, tips_df, shifts_df['tips_eligible'])
+        shifts_df['allocated_comp'] = shifts_df['wages'] + shifts_df['allocated_tip']
+        if unallocated:
+            print(f"Warning: ${unallocated:,.2f} of tips came in with no tip eligible staff on the clock")
+        detail_columns += ['allocated_tip', 'allocated_comp']
+        summary_totals['total_allocated_tips'] = ('allocated_tip', 'sum')
+        summary_totals['total_allocated_comp'] = ('allocated_comp', 'sum')
+
+    if periods is not None:
+        periods.tag_frame(shifts_df)
+        outside = shifts_df['period_start'].isna()
+        if outside.any():
+            print(f"Warning: {int(outside.sum())} shifts are outside the pay periods and left out of payroll")
+            shifts_df = shifts_df[~outside]
+        detail_columns = ['period_start', 'period_end'] + detail_columns
+        summary_keys = ['period_start', 'period_end'] + summary_keys
+
+    # Payroll calculation detail
+    payroll_calc_df = shifts_df[detail_columns]
+
+    # Payroll summary by employee (and period)
+    with measure("payroll_summary", rows=len(payroll_calc_df)):
+        payroll_summary_df = payroll_calc_df.groupby(summary_keys).agg(**summary_totals).reset_index()
 
     return payroll_calc_df, payroll_summary_df
 
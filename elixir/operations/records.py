@@ -0,0 +1,71 @@
+# compact records for the parsed shifts and tips
+# a year of shifts is millions of segments and as dicts every one of them carries its own
+# hash table. these records keep their fields in __slots__ and still read like the dicts they
+# replaced, record["start_date"], record.get("location"), dict(record) and == against a dict
+# all work. the strings that repeat on every record of an employee are interned so the
+# records share one copy, and the frames are built a column at a time from the slots
+from collections.abc import Mapping
+from operator import attrgetter
+import sys
+from typing import TYPE_CHECKING, Iterator
+
+# only the frame builder needs pandas
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def intern_string(value):
+    """sys.intern for strings, anything else (None from a missing column) is returned as is."""
+    return sys.intern(value) if type(value) is str else value
+
+
+class SlotRecord(Mapping):
+    """Read only mapping over the __slots__ of a subclass, the slots are the keys in order.
+        Subclasses take their fields as positional arguments in slot order"""
+    __slots__ = ()
+    _keys: frozenset[str] = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._keys = frozenset(cls.__slots__)
+
+    def __getitem__(self, key: str):
+        if key in self._keys:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        if key in self._keys:
+            return getattr(self, key)
+        return default
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def __reduce__(self):
+        # pickled as the constructor arguments, smaller than the slot state dict and it is
+        # what the process pools and caches send around
+        return type(self), tuple(getattr(self, key) for key in self.__slots__)
+
+
+def records_frame(records: list, record_type: type[SlotRecord]) -> "pd.DataFrame":
+    """DataFrame with a column per field of record_type, read straight from the slots one
+        column at a time so no dict is made per record. Lists holding plain dicts go through
+        the usual DataFrame constructor.
+        This is not zero copy, every column is copied out of the records once. The records are
+        kept per row because the parsers, DateIndex, the validator, the store and the caches all
+        work a record at a time"""
+    import pandas as pd
+
+    if all(type(record) is record_type for record in records):
+        return pd.DataFrame({key: list(map(attrgetter(key), records)) for key in record_type.__slots__})
+    return pd.DataFrame([record if isinstance(record, dict) else dict(record) for record in records])
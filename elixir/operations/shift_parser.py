@@ -1,31 +1,43 @@
-from typing import TypedDict
+from typing import Iterable, Iterator
+from elixir.instrumentation import measure
 from elixir.quantic import QunaticShiftData
-from datetime import datetime
-from elixir.operations.work_team import WorkTeamDay
-import pytz
+from datetime import date as date_type, datetime
+from elixir.operations.date_index import DateIndex
+from elixir.operations.records import SlotRecord, intern_string
+from elixir.operations.work_team import from_epoch_us, split_team_arrays, to_eastern, to_epoch_us
+from elixir.operations.shift_validation import (ISSUE_SHIFT_TOO_LONG, SEVERITY_ERROR, ShiftValidationReport,
+                                                ShiftValidator)
 # elixir shift class to ingest the shift data from the quantic system and parse it
 # we will use the data to create the ExlixirShift dict
 from zoneinfo import ZoneInfo
 eastern = ZoneInfo("America/New_York")
 
 
-class ElixirShift(TypedDict):
-    shift_type: str # this can only be alpha or bravo
-    start_date: datetime
-    end_date: datetime
-    first_name: str
-    last_name: str
-    shift_status: str
-    location: str
+class ElixirShift(SlotRecord):
+    # reads like a dict of these keys, the slot order is the column order of the shifts frame
+    __slots__ = ("first_name", "last_name", "start_date", "end_date", "shift_status", "shift_type", "location")
 
-# maximum lenght of shift allowed before we throw an error
+    def __init__(self, first_name: str, last_name: str, start_date: datetime, end_date: datetime,
+                 shift_status: str, shift_type: str, location: str):
+        self.first_name = first_name
+        self.last_name = last_name
+        self.start_date = start_date
+        self.end_date = end_date
+        self.shift_status = shift_status
+        self.shift_type = shift_type # this can only be alpha or bravo, "a" or "b"
+        self.location = location
+
+# maximum lenght of shift allowed before the shift is quarantined
 SHIFT_LENGTH_MAX = 17
 
+# number of shifts split into teams together
+SPLIT_BATCH_SIZE = 4096
+
 
 # exception thrown when length of shift is greater than SHIFT_LENGTH_MAX
 class ElixirShiftLengthError(Exception):
     def __init__(self, user_name: str, shift_start:datetime, shift_end:datetime , shift_location: str):
-        shift_length_hours = (shift_end - shift_start).total_seconds() / 3600
+        shift_length_hours = (to_epoch_us(to_eastern(shift_end)) - to_epoch_us(to_eastern(shift_start))) / 3_600_000_000
         shift_start_date = shift_start.strftime("%m/%d/%y")
         formatted_message = f"User {user_name} started a shift at {shift_start_date} with a total shift length of {shift_length_hours} hours at {shift_location}"
         self.message = formatted_message
@@ -33,25 +45,31 @@ class ElixirShiftLengthError(Exception):
 
 
 class ElixirShiftParser:
-    def __init__(self, qunatic_shift_data: list[QunaticShiftData], location: str):
+    def __init__(self, qunatic_shift_data: Iterable[QunaticShiftData], location: str, stream: bool = False,
+                 strict: bool = False, validator: ShiftValidator | None = None, csv_file: str | None = None):
         if not location:
             raise Exception("Location is required")
         self.location = location
         self.shift_data = qunatic_shift_data
+        # the file the rows come from, the validation issues point at its rows
+        self.csv_file = csv_file
         self.parsed_shifts: list[ElixirShift] = []
-        self.parse_shifts()
-
-
-    def _calculate_shift_length(self, clocked_in_str: str, clocked_out_str: str) -> int:
+        # lookup by start date, built from parsed_shifts on first use
+        self._date_index: DateIndex[ElixirShift] | None = None
+        # bad shifts are quarantined and reported in self.validation, strict raises on the first one instead
+        self.strict = strict
+        # a validator can be shared between parsers so overlapping shifts are found across them
+        self._shared_validator = validator
+        self.validator = validator or ShiftValidator(location, SHIFT_LENGTH_MAX)
+        # in stream mode the shifts are only produced through iter_shifts()
+        if not stream:
+            self.parse_shifts()
+
+
+    def _calculate_shift_length(self, clocked_in: datetime, clocked_out: datetime) -> int:
              """Calculates the shift length in minutes."""
-             try:
-                clocked_in = datetime.strptime(clocked_in_str, "%m-%d-%y %I:%M %p")
-                clocked_out = datetime.strptime(clocked_out_str, "%m-%d-%y %I:%M %p")
-                shift_length_minutes = (clocked_out - clocked_in).total_seconds() / 60
-                return int(shift_length_minutes)
-             except ValueError:
-                 print("Error: Invalid date/time format. Skipping shift length calculation.")
-                 return 0  # Or handle the error appropriately, e.g., raise an exception
+             shift_length_minutes = (to_epoch_us(to_eastern(clocked_out)) - to_epoch_us(to_eastern(clocked_in))) / 60_000_000
+             return int(shift_length_minutes)
 
     def _is_total_row(self, shift: QunaticShiftData) -> bool:
         """Checks if a shift row is a total row.
@@ -63,105 +81,132 @@ class ElixirShiftParser:
 
 
 
-    def _handle_bad_entries(self, shift: QunaticShiftData):
-        """ user's shouldn't be clocked in in the data that is imported
-            we will take action here to notify and warn the admin of
-            any shifts that are not in the 'Clocked In' status
-
-           another cas is when the shift length is greater than 16 hours
-
-           Lets raise and error for this """
-
-        user_name = shift.get("first_name") + " " + shift.get("last_name")
-        # clocked_in and clocked_out are ISO 8601 format strings
-        clocked_in_dt = datetime.fromisoformat(shift.get("clocked_in"))
-        clocked_out_dt = datetime.fromisoformat(shift.get("clocked_out"))
-
-        # Normalize to Eastern Time
-        if clocked_in_dt.tzinfo is None:
-            clocked_in_dt = clocked_in_dt.replace(tzinfo=eastern)
-        else:
-            clocked_in_dt = clocked_in_dt.astimezone(eastern)
-
-        if clocked_out_dt.tzinfo is None:
-            clocked_out_dt = clocked_out_dt.replace(tzinfo=eastern)
-        else:
-            clocked_out_dt = clocked_out_dt.astimezone(eastern)
+    @property
+    def validation(self) -> ShiftValidationReport:
+        """Every problem found in the shifts parsed so far and the quarantined rows."""
+        return self.validator.report
 
-        if shift.get("status") == "Clocked In":
-            # TODO: notify admin of clocked in shift
-            print(f"User {user_name} is clocked in")
-            pass
+    def _handle_bad_entries(self, batch: list[tuple[int, QunaticShiftData, datetime | None, datetime | None]]
+                            ) -> list[tuple[int, QunaticShiftData, datetime, datetime]]:
+        """ user's shouldn't be clocked in in the data that is imported, shifts shouldn't be
+            missing a punch, be longer than SHIFT_LENGTH_MAX or overlap another shift of the user.
 
-        # throw an error if the shift doesn't have a clocked in and clocked out time
-        if not clocked_in_dt or not clocked_out_dt:
-            raise Exception(f"Error: Shift {user_name} has no clocked in or clocked out time.")
+            The whole batch is checked and every problem is added to self.validation, the bad
+            shifts are quarantined and the good ones are returned. In strict mode the first
+            bad shift raises instead """
+        issue_count = len(self.validation.issues)
+        valid_batch = self.validator.validate(batch, self.csv_file)
 
-        shift_length = (clocked_out_dt - clocked_in_dt).total_seconds() / 3600
-
-        if shift_length > SHIFT_LENGTH_MAX:
-            raise ElixirShiftLengthError(user_name, shift_start=clocked_in_dt, shift_end=clocked_out_dt, shift_location=self.location)
-
-
-    def parse_shifts(self):
-        parsed_shifts = []
-        for shift in self.shift_data:
+        for issue in self.validation.issues[issue_count:]:
+            if issue["severity"] != SEVERITY_ERROR:
+                # warnings don't stop the shift, they are printed here and kept in self.validation
+                print(issue["message"])
+                continue
+            if not self.strict:
+                continue
+            if issue["issue"] == ISSUE_SHIFT_TOO_LONG:
+                raise ElixirShiftLengthError(issue["user_name"], shift_start=issue["clocked_in"],
+                                             shift_end=issue["clocked_out"], shift_location=self.location)
+            raise Exception(f"Error: {issue['message']}")
+
+        return valid_batch
+
+    def _split_batch(self, batch: list[tuple[int, QunaticShiftData, datetime | None, datetime | None]]
+                     ) -> Iterator[tuple[int, QunaticShiftData, datetime, datetime, list[ElixirShift]]]:
+        """Splits a batch of shifts into workteams a and b in one pass and yields the workteam
+            shifts of each quantic row in order"""
+        # handle clocked in and the other bad entries first
+        with measure("shift_validation", rows=len(batch)):
+            batch = self._handle_bad_entries(batch)
+        if not batch:
+            return
+        with measure("shift_split", rows=len(batch)):
+            punches = self._split_valid_batch(batch)
+        yield from punches
+
+    def _split_valid_batch(self, batch: list[tuple[int, QunaticShiftData, datetime, datetime]]
+                           ) -> list[tuple[int, QunaticShiftData, datetime, datetime, list[ElixirShift]]]:
+        """The punches of a batch that passed validation, each with its workteam shifts."""
+        punches = []
+        start_us = [to_epoch_us(start_datetime) for _, _, start_datetime, _ in batch]
+        end_us = [to_epoch_us(end_datetime) for _, _, _, end_datetime in batch]
+        team_split = split_team_arrays(start_us, end_us)
+
+        has_a = team_split.has_a.tolist()
+        has_b = team_split.has_b.tolist()
+        boundaries = team_split.boundary.tolist()
+        # there are only a few distinct boundaries, one per day
+        boundary_datetimes = {boundary: from_epoch_us(boundary, eastern) for boundary in set(boundaries)}
+
+        location = intern_string(self.location)
+        for i, (row_index, shift, start_datetime, end_datetime) in enumerate(batch):
+            boundary = boundaries[i]
+            team_shifts = []
+            # the names and status repeat on every shift of an employee, interned they are shared
+            first_name = intern_string(shift.get("first_name"))
+            last_name = intern_string(shift.get("last_name"))
+            status = intern_string(shift.get("status"))
+
+            if has_a[i]:
+                a_end = end_datetime if end_us[i] <= boundary else boundary_datetimes[boundary]
+                team_shifts.append(ElixirShift(first_name, last_name, start_datetime, a_end, status, "a", location))
+
+            if has_b[i]:
+                b_start = start_datetime if start_us[i] >= boundary else boundary_datetimes[boundary]
+                team_shifts.append(ElixirShift(first_name, last_name, b_start, end_datetime, status, "b", location))
+
+            punches.append((row_index, shift, start_datetime, end_datetime, team_shifts))
+        return punches
+
+    def iter_shifts(self) -> Iterator[ElixirShift]:
+        """Yields the alpha/bravo shifts. The quantic rows are read in batches of SPLIT_BATCH_SIZE
+            and each batch is split into teams together, so the input can still be a stream."""
+        for _, _, _, _, team_shifts in self.iter_punches():
+            yield from team_shifts
+
+    def iter_punches(self) -> Iterator[tuple[int, QunaticShiftData, datetime, datetime, list[ElixirShift]]]:
+        """Yields (row_index, quantic row, clocked in, clocked out, workteam shifts) for every
+            valid quantic row, this keeps the workteam shifts of each punch together"""
+        batch = []
+        for row_index, shift in enumerate(self.shift_data):
             # this is a total row, skip it
             if self._is_total_row(shift):
                 continue
 
 
-            # handle clocked in
-            self._handle_bad_entries(shift)
-
+            # the quantic parser already gives aware datetimes, this only normalizes them to eastern
+            start_datetime = to_eastern(shift.get("clocked_in")) if shift.get("clocked_in") else None
+            end_datetime = to_eastern(shift.get("clocked_out")) if shift.get("clocked_out") else None
 
             # splits this into a workteams a or b
-            start_datetime = datetime.fromisoformat(shift.get("clocked_in"))
-            end_datetime = datetime.fromisoformat(shift.get("clocked_out"))
-
-            if start_datetime.tzinfo is None:
-                start_datetime = start_datetime.replace(tzinfo=eastern)
-            else:
-                start_datetime = start_datetime.astimezone(eastern)
-
-            if end_datetime.tzinfo is None:
-                end_datetime = end_datetime.replace(tzinfo=eastern)
-            else:
-                end_datetime = end_datetime.astimezone(eastern)
-
-            work_team_shifts =WorkTeamDay(start_date=start_datetime, end_date=end_datetime)
-
-            if work_team_shifts.team_a:
-                shift_a = {
-                    "first_name": shift.get("first_name"),
-                    "last_name": shift.get("last_name"),
-                    "start_date": work_team_shifts.team_a.get("start_date"),
-                    "end_date": work_team_shifts.team_a.get("end_date"),
-                    "shift_status": shift.get("status"),
-                    "shift_type": "a",
-                    "location": self.location,
-                }
-                parsed_shifts.append(shift_a)
-
-            if work_team_shifts.team_b:
-                shift_b = {
-                    "first_name": shift.get("first_name"),
-                    "last_name": shift.get("last_name"),
-                    "start_date": work_team_shifts.team_b.get("start_date"),
-                    "end_date": work_team_shifts.team_b.get("end_date"),
-                    "shift_status": shift.get("status"),
-                    "shift_type": "b",
-                    "location": self.location,
-                }
-                parsed_shifts.append(shift_b)
-
-        self.parsed_shifts = parsed_shifts
+            batch.append((row_index, shift, start_datetime, end_datetime))
+            if len(batch) >= SPLIT_BATCH_SIZE:
+                yield from self._split_batch(batch)
+                batch = []
+
+        if batch:
+            yield from self._split_batch(batch)
+
+    def parse_shifts(self):
+        # start a fresh validation when parsing again, otherwise every shift would overlap itself
+        if self._shared_validator is None:
+            self.validator = ShiftValidator(self.location, SHIFT_LENGTH_MAX)
+        self.parsed_shifts = list(self.iter_shifts())
+        self._date_index = None
         return self.parsed_shifts
 
-    def get_shifts_by_date(self, date: datetime) -> list[ElixirShift]:
-        """Returns a list of shifts for a specific date."""
-        shifts: list[ElixirShift] = []
-        for shift in self.parsed_shifts:
-            if shift.get("start_date") == date:
-                shifts.append(shift)
-        return shifts
+    @property
+    def date_index(self) -> DateIndex[ElixirShift]:
+        """parsed_shifts sorted by start_date, rebuilt when parsed_shifts is replaced or has
+            changed size"""
+        if self._date_index is None or not self._date_index.is_current(self.parsed_shifts):
+            self._date_index = DateIndex(self.parsed_shifts, "start_date")
+        return self._date_index
+
+    def get_shifts_by_date(self, date: datetime | date_type) -> list[ElixirShift]:
+        """Returns a list of shifts that started on a specific date."""
+        return self.date_index.on_day(date)
+
+    def get_shifts_between(self, start: datetime | None = None, end: datetime | None = None) -> list[ElixirShift]:
+        """Returns the shifts that started from start to end, both included, in time order."""
+        return self.date_index.between(start, end)
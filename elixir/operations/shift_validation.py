@@ -0,0 +1,193 @@
+# validation of the quantic shift rows before they are split into workteams
+# every row is checked and every problem goes into a report instead of the first bad punch
+# stopping the run. rows with errors are quarantined and the rest carry on to the split
+from bisect import bisect_left
+from datetime import datetime
+from typing import TypedDict
+from elixir.operations.work_team import to_eastern, to_epoch_us
+from elixir.quantic import QunaticShiftData
+
+# the kinds of problems found
+ISSUE_SHIFT_TOO_LONG = "shift_too_long"
+ISSUE_OPEN_SHIFT = "open_shift"
+ISSUE_MISSING_PUNCH = "missing_punch"
+ISSUE_OVERLAPPING_SHIFT = "overlapping_shift"
+
+# errors are quarantined, warnings are reported and the row is still used
+SEVERITY_ERROR = "error"
+SEVERITY_WARNING = "warning"
+
+
+class ShiftIssue(TypedDict):
+    issue: str # one of the ISSUE_ values
+    severity: str # error or warning
+    csv_file: str | None # file the row was read from, None when the rows didn't come from a file
+    row_index: int # position of the row in its csv file, 0 is the first row after the header
+    user_name: str
+    location: str
+    clocked_in: datetime | None
+    clocked_out: datetime | None
+    message: str
+
+
+class ShiftValidationReport:
+    def __init__(self):
+        self.issues: list[ShiftIssue] = []
+        self.quarantined: list[QunaticShiftData] = []
+        self.checked_rows = 0
+
+    def add(self, issue: ShiftIssue):
+        self.issues.append(issue)
+
+    def extend(self, other: "ShiftValidationReport"):
+        """Adds the issues and quarantined rows of another report to this one."""
+        self.issues.extend(other.issues)
+        self.quarantined.extend(other.quarantined)
+        self.checked_rows += other.checked_rows
+
+    def get_errors(self) -> list[ShiftIssue]:
+        return [issue for issue in self.issues if issue["severity"] == SEVERITY_ERROR]
+
+    def get_warnings(self) -> list[ShiftIssue]:
+        return [issue for issue in self.issues if issue["severity"] == SEVERITY_WARNING]
+
+    def has_errors(self) -> bool:
+        return any(issue["severity"] == SEVERITY_ERROR for issue in self.issues)
+
+    def summary(self) -> str:
+        """Returns a one line count of the issues by kind."""
+        counts: dict[str, int] = {}
+        for issue in self.issues:
+            counts[issue["issue"]] = counts.get(issue["issue"], 0) + 1
+        details = ", ".join(f"{count} {issue}" for issue, count in sorted(counts.items()))
+        return f"checked {self.checked_rows} shifts, quarantined {len(self.quarantined)}" + (f" ({details})" if details else "")
+
+
+class ShiftValidator:
+    """Checks batches of shift rows for over long shifts, open shifts, missing punches and
+        shifts that overlap another shift of the same employee.
+        The accepted shifts of each employee are kept sorted by clock in, so every new shift
+        only has to be compared with its neighbours to find an overlap, this also catches
+        overlaps between batches and between files given to the same validator.
+        Lengths and overlaps are worked out on epoch time, two times of one zone compare by
+        their wall clock and that is off across a DST change"""
+
+    def __init__(self, location: str, max_hours: float):
+        self.location = location
+        self.max_hours = max_hours
+        self.report = ShiftValidationReport()
+        # accepted (clocked_in, clocked_out) of each employee as epoch microseconds, sorted by clocked_in
+        self._accepted_starts: dict[tuple[str, str], list[int]] = {}
+        self._accepted_ends: dict[tuple[str, str], list[int]] = {}
+
+    def _issue(self, issue: str, severity: str, row_index: int, shift: QunaticShiftData,
+               clocked_in: datetime | None, clocked_out: datetime | None, message: str,
+               csv_file: str | None = None) -> ShiftIssue:
+        user_name = f"{shift.get('first_name', '')} {shift.get('last_name', '')}"
+        return ShiftIssue(
+            issue=issue,
+            severity=severity,
+            csv_file=csv_file,
+            row_index=row_index,
+            user_name=user_name,
+            location=self.location,
+            clocked_in=clocked_in,
+            clocked_out=clocked_out,
+            message=f"User {user_name} {message} at {self.location}",
+        )
+
+    def _check_row(self, row_index: int, shift: QunaticShiftData, clocked_in: datetime | None,
+                   clocked_out: datetime | None, csv_file: str | None = None) -> list[ShiftIssue]:
+        """Checks the problems that only need the row itself."""
+        issues = []
+        is_open = shift.get("status") == "Clocked In"
+
+        if clocked_in is None or clocked_out is None:
+            missing = "clocked in" if clocked_in is None else "clocked out"
+            if is_open and clocked_out is None:
+                issues.append(self._issue(ISSUE_OPEN_SHIFT, SEVERITY_ERROR, row_index, shift, clocked_in, clocked_out,
+                                          "is still clocked in with no clocked out time", csv_file))
+            else:
+                issues.append(self._issue(ISSUE_MISSING_PUNCH, SEVERITY_ERROR, row_index, shift, clocked_in, clocked_out,
+                                          f"has a shift with no {missing} time", csv_file))
+            return issues
+
+        if is_open:
+            # the shift has both punches so it can still be used, just let the admin know
+            issues.append(self._issue(ISSUE_OPEN_SHIFT, SEVERITY_WARNING, row_index, shift, clocked_in, clocked_out,
+                                      "is clocked in", csv_file))
+
+        shift_length_hours = (to_epoch_us(to_eastern(clocked_out)) - to_epoch_us(to_eastern(clocked_in))) / 3_600_000_000
+        if shift_length_hours > self.max_hours:
+            shift_start_date = clocked_in.strftime("%m/%d/%y")
+            issues.append(self._issue(ISSUE_SHIFT_TOO_LONG, SEVERITY_ERROR, row_index, shift, clocked_in, clocked_out,
+                                      f"started a shift at {shift_start_date} with a total shift length of {shift_length_hours} hours", csv_file))
+        elif shift_length_hours < 0:
+            issues.append(self._issue(ISSUE_MISSING_PUNCH, SEVERITY_ERROR, row_index, shift, clocked_in, clocked_out,
+                                      "has a shift that clocked out before it clocked in", csv_file))
+        return issues
+
+    def _find_overlap(self, employee: tuple[str, str], clocked_in: datetime, clocked_out: datetime) -> bool:
+        """Checks a shift against the accepted shifts of the employee and accepts it when it
+            doesn't overlap any of them. Shifts that only touch are not overlapping"""
+        starts = self._accepted_starts.setdefault(employee, [])
+        ends = self._accepted_ends.setdefault(employee, [])
+        clocked_in, clocked_out = to_epoch_us(to_eastern(clocked_in)), to_epoch_us(to_eastern(clocked_out))
+        position = bisect_left(starts, clocked_in)
+        # the accepted shifts never overlap each other so only the neighbours need checking
+        if position > 0 and ends[position - 1] > clocked_in:
+            return True
+        if position < len(starts) and starts[position] < clocked_out:
+            return True
+        if position < len(starts) and starts[position] == clocked_in:
+            return True
+        starts.insert(position, clocked_in)
+        ends.insert(position, clocked_out)
+        return False
+
+    def accept(self, employee: tuple[str, str], clocked_in: datetime, clocked_out: datetime) -> bool:
+        """Adds a shift of the employee that was accepted before, e.g. read from an earlier
+            file in a previous run, so new shifts are checked against it. Returns False when it
+            overlaps a shift that is already there and was left out"""
+        return not self._find_overlap(employee, clocked_in, clocked_out)
+
+    def validate(self, batch: list[tuple[int, QunaticShiftData, datetime | None, datetime | None]],
+                 csv_file: str | None = None) -> list[tuple[int, QunaticShiftData, datetime, datetime]]:
+        """Checks a batch of (row_index, row, clocked_in, clocked_out) from one csv file and
+            returns the rows that can be split, in their original order. The issues go into
+            self.report. The rows are checked one at a time, an overlap can only be decided once
+            the shifts before it are accepted or quarantined"""
+        self.report.checked_rows += len(batch)
+        quarantined: set[int] = set()
+        passed = []
+        for row_index, shift, clocked_in, clocked_out in batch:
+            issues = self._check_row(row_index, shift, clocked_in, clocked_out, csv_file)
+            for issue in issues:
+                self.report.add(issue)
+            if any(issue["severity"] == SEVERITY_ERROR for issue in issues):
+                quarantined.add(row_index)
+                self.report.quarantined.append(shift)
+            else:
+                passed.append((row_index, shift, clocked_in, clocked_out))
+
+        # overlaps are found by going through the shifts sorted by clocked in,
+        # the later of two overlapping shifts is the one quarantined
+        order = sorted(passed, key=lambda item: (to_epoch_us(to_eastern(item[2])), to_epoch_us(to_eastern(item[3])), item[0]))
+        for row_index, shift, clocked_in, clocked_out in order:
+            if self.check_overlap(row_index, shift, clocked_in, clocked_out, csv_file):
+                quarantined.add(row_index)
+
+        return [item for item in passed if item[0] not in quarantined]
+
+    def check_overlap(self, row_index: int, shift: QunaticShiftData, clocked_in: datetime, clocked_out: datetime,
+                      csv_file: str | None = None) -> bool:
+        """Checks one shift for an overlap with the shifts already accepted, reports and
+            quarantines it when it overlaps"""
+        employee = (shift.get("first_name", ""), shift.get("last_name", ""))
+        if not self._find_overlap(employee, clocked_in, clocked_out):
+            return False
+        self.report.add(self._issue(ISSUE_OVERLAPPING_SHIFT, SEVERITY_ERROR, row_index, shift, clocked_in, clocked_out,
+                                    f"has a shift from {clocked_in.strftime('%m/%d/%y %I:%M %p')} to "
+                                    f"{clocked_out.strftime('%m/%d/%y %I:%M %p')} that overlaps another shift", csv_file))
+        self.report.quarantined.append(shift)
+        return True
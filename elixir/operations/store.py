@@ -0,0 +1,307 @@
+# sqlite store of the parsed shifts and tips so questions about them don't need the csv files
+# every punch and tip is upserted, a punch is identified by the location, the employee and the
+# clock in time, a tip by the location, its quantic REF# and its time, so loading the same export
+# twice or a re-export with fixes never doubles anything. the queries all go through indexes on
+# (location, date, shift_type) and on the employee. every punch and tip also remembers the csv
+# file it came from, loading a file again first deletes what it added last time so a punch
+# whose clock in was corrected in a re-export doesn't stay behind under its old time
+import os
+import sqlite3
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterable
+from elixir.operations.shift_parser import ElixirShift
+from elixir.operations.tip_parser import ElixirTip
+from elixir.operations.work_team import to_eastern, to_epoch_us
+from elixir.quantic import QunaticShiftData
+from elixir.quantic.cache import CACHE_DIR
+
+# pandas is only imported by the queries that return frames, get_workers never loads it
+if TYPE_CHECKING:
+    import pandas as pd
+    from elixir.operations.compensation import CompensationTable
+
+STORE_FILE = os.path.join(CACHE_DIR, "elixir.db")
+
+# times are stored as local eastern wall clock text, the same way they are written to the reports
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS punches (
+    id INTEGER PRIMARY KEY,
+    location TEXT NOT NULL,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    clocked_in TEXT NOT NULL,
+    clocked_out TEXT NOT NULL,
+    csv_file TEXT,
+    UNIQUE (location, first_name, last_name, clocked_in)
+);
+CREATE TABLE IF NOT EXISTS shifts (
+    punch_id INTEGER NOT NULL REFERENCES punches(id) ON DELETE CASCADE,
+    shift_type TEXT NOT NULL,
+    location TEXT NOT NULL,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    date TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    minutes_worked REAL NOT NULL,
+    shift_status TEXT,
+    PRIMARY KEY (punch_id, shift_type)
+);
+CREATE INDEX IF NOT EXISTS shifts_by_day ON shifts (location, date, shift_type);
+CREATE INDEX IF NOT EXISTS shifts_by_employee ON shifts (first_name, last_name, start_date);
+CREATE TABLE IF NOT EXISTS tips (
+    location TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    tip_date TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    tip_amount REAL NOT NULL,
+    shift_type TEXT NOT NULL,
+    csv_file TEXT,
+    PRIMARY KEY (location, ref, tip_date, seq)
+);
+CREATE INDEX IF NOT EXISTS tips_by_day ON tips (location, date, shift_type);
+CREATE TABLE IF NOT EXISTS compensation (
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    effective_from TEXT NOT NULL,
+    rate REAL NOT NULL,
+    tips_eligible INTEGER NOT NULL,
+    PRIMARY KEY (first_name, last_name, effective_from)
+);
+"""
+
+# the minutes and tips of each (date, location, shift_type) with shifts, like daily_rates_df
+DAILY_RATES_QUERY = """
+WITH daily_shifts AS (
+    SELECT date, location, shift_type, SUM(minutes_worked) AS minutes_worked
+    FROM shifts {where}
+    GROUP BY date, location, shift_type
+), daily_tips AS (
+    SELECT date, location, shift_type, SUM(tip_amount) AS tip_amount
+    FROM tips {where}
+    GROUP BY date, location, shift_type
+)
+SELECT s.date, s.location, s.shift_type, s.minutes_worked, t.tip_amount,
+       CASE WHEN s.minutes_worked > 0 THEN t.tip_amount / (s.minutes_worked / 60.0) ELSE 0 END AS hourly_tip_rate
+FROM daily_shifts s
+LEFT JOIN daily_tips t ON t.date = s.date AND t.location = s.location AND t.shift_type = s.shift_type
+ORDER BY s.date, s.location, s.shift_type
+"""
+
+# payroll totals by employee, the same math as build_payroll_calculations. the rate of each
+# shift is the latest compensation row that took effect on or before the shift started
+PAYROLL_TOTALS_QUERY = """
+WITH rates AS (
+{rates}
+), priced AS (
+    SELECT sh.first_name, sh.last_name, sh.minutes_worked / 60.0 AS hours_worked,
+           COALESCE(c.rate, 0) AS wage_rate, COALESCE(c.tips_eligible, 0) AS tips_eligible,
+           COALESCE(r.hourly_tip_rate, 0) AS hourly_tip_rate
+    FROM shifts sh
+    LEFT JOIN compensation c ON c.rowid = (
+        SELECT c2.rowid FROM compensation c2
+        WHERE c2.first_name = sh.first_name AND c2.last_name = sh.last_name AND c2.effective_from <= sh.start_date
+        ORDER BY c2.effective_from DESC LIMIT 1
+    )
+    LEFT JOIN rates r ON r.date = sh.date AND r.location = sh.location AND r.shift_type = sh.shift_type
+    {shift_where}
+)
+SELECT first_name, last_name,
+       SUM(hours_worked) AS total_hours,
+       SUM(hours_worked * wage_rate) AS total_wages,
+       SUM(CASE WHEN tips_eligible THEN hours_worked * hourly_tip_rate ELSE 0 END) AS total_tips,
+       SUM(hours_worked * wage_rate + CASE WHEN tips_eligible THEN hours_worked * hourly_tip_rate ELSE 0 END) AS total_comp
+FROM priced
+GROUP BY first_name, last_name
+ORDER BY first_name, last_name
+"""
+
+
+# indexes on the csv_file columns, made after the columns are added to a store from before them
+FILE_INDEXES = """
+CREATE INDEX IF NOT EXISTS punches_by_file ON punches (location, csv_file);
+CREATE INDEX IF NOT EXISTS tips_by_file ON tips (csv_file);
+"""
+
+
+def _format_time(date_time: datetime) -> str:
+    """Local wall clock text of an aware or naive eastern datetime."""
+    return to_eastern(date_time).strftime(TIME_FORMAT)
+
+
+def _minutes_between(start: datetime, end: datetime) -> float:
+    """Elapsed minutes between two eastern times, from the epoch so a DST change counts."""
+    return (to_epoch_us(to_eastern(end)) - to_epoch_us(to_eastern(start))) / 60e6
+
+
+def _source_file(csv_file: str | None) -> str | None:
+    """The stored name of a csv file, absolute so the same file is one name from any folder."""
+    return os.path.abspath(csv_file) if csv_file else None
+
+
+def _date_filters(location: str | None, start_date: str | None, end_date: str | None, prefix: str = "") -> tuple[str, list]:
+    """Builds the where clause and its parameters for the optional location and date range,
+        dates are YYYY-MM-DD and both ends are included"""
+    clauses, params = [], []
+    if location:
+        clauses.append(f"{prefix}location = ?")
+        params.append(location.lower())
+    if start_date:
+        clauses.append(f"{prefix}date >= ?")
+        params.append(str(start_date))
+    if end_date:
+        clauses.append(f"{prefix}date <= ?")
+        params.append(str(end_date))
+    return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+class ElixirStore:
+    def __init__(self, path: str = STORE_FILE):
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # opened on first use so the store can be handed to other processes, each opens its own
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._connection.execute("PRAGMA foreign_keys = ON")
+            self._connection.executescript(SCHEMA)
+            # stores made before the csv_file columns get them added
+            for table in ("punches", "tips"):
+                columns = {row[1] for row in self._connection.execute(f"PRAGMA table_info({table})")}
+                if "csv_file" not in columns:
+                    self._connection.execute(f"ALTER TABLE {table} ADD COLUMN csv_file TEXT")
+            self._connection.executescript(FILE_INDEXES)
+        return self._connection
+
+    def __getstate__(self):
+        return {"path": self.path, "_connection": None}
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def upsert_punches(self, location: str, punches: Iterable[tuple[int, QunaticShiftData, datetime, datetime, list[ElixirShift]]],
+                       csv_file: str | None = None):
+        """Upserts punches from ElixirShiftParser.iter_punches. A punch already stored gets its
+            clock out and its alpha/bravo shifts replaced, so a re-exported shift is updated in place.
+            With the csv file the punches came from, the punches that file added before are
+            deleted first so a file loaded again is replaced as a whole"""
+        location, csv_file = location.lower(), _source_file(csv_file)
+        with self.connection as connection:
+            if csv_file:
+                # the shifts of the punches go with them
+                connection.execute("DELETE FROM punches WHERE location = ? AND csv_file = ?", (location, csv_file))
+            for _, shift, clocked_in, clocked_out, team_shifts in punches:
+                first_name, last_name = shift.get("first_name", ""), shift.get("last_name", "")
+                punch_id = connection.execute(
+                    """INSERT INTO punches (location, first_name, last_name, clocked_in, clocked_out, csv_file)
+                       VALUES (?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (location, first_name, last_name, clocked_in)
+                       DO UPDATE SET clocked_out = excluded.clocked_out, csv_file = excluded.csv_file
+                       RETURNING id""",
+                    (location, first_name, last_name, _format_time(clocked_in), _format_time(clocked_out), csv_file),
+                ).fetchone()[0]
+                connection.execute("DELETE FROM shifts WHERE punch_id = ?", (punch_id,))
+                connection.executemany(
+                    """INSERT INTO shifts (punch_id, shift_type, location, first_name, last_name, date,
+                                           start_date, end_date, minutes_worked, shift_status)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    [(
+                        punch_id, team_shift["shift_type"], location, first_name, last_name,
+                        team_shift["start_date"].strftime("%Y-%m-%d"),
+                        _format_time(team_shift["start_date"]), _format_time(team_shift["end_date"]),
+                        _minutes_between(team_shift["start_date"], team_shift["end_date"]),
+                        team_shift.get("shift_status"),
+                    ) for team_shift in team_shifts],
+                )
+
+    def upsert_tips(self, tips: Iterable[ElixirTip], csv_file: str | None = None):
+        """Upserts tips by location, REF# and time. A REF# is a check and a split check has
+            a tip per card under the same REF#, tips of one check at the same minute are told
+            apart by their order in the export. With the csv file the tips came from, the tips
+            that file added before are deleted first"""
+        csv_file = _source_file(csv_file)
+        rows = []
+        seen: dict[tuple[str, str, str], int] = {}
+        for tip in tips:
+            location, tip_date = tip["location"].lower(), _format_time(tip["tip_date"])
+            key = (location, tip["ref"], tip_date)
+            seq = seen.get(key, 0)
+            seen[key] = seq + 1
+            rows.append((location, tip["ref"], tip_date, seq, tip["tip_date"].strftime("%Y-%m-%d"),
+                         tip["tip_amount"], tip["shift_type"], csv_file))
+
+        with self.connection as connection:
+            if csv_file:
+                # the file is in the folder of its location, its path alone finds its tips
+                connection.execute("DELETE FROM tips WHERE csv_file = ?", (csv_file,))
+            connection.executemany(
+                """INSERT INTO tips (location, ref, tip_date, seq, date, tip_amount, shift_type, csv_file)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (location, ref, tip_date, seq) DO UPDATE SET
+                       tip_amount = excluded.tip_amount, shift_type = excluded.shift_type,
+                       csv_file = excluded.csv_file""",
+                rows,
+            )
+
+    def load_compensation(self, compensation: "CompensationTable"):
+        """Replaces the stored compensation with the table, used by payroll_totals."""
+        entries = compensation.entries
+        with self.connection as connection:
+            connection.execute("DELETE FROM compensation")
+            connection.executemany(
+                "INSERT OR REPLACE INTO compensation VALUES (?, ?, ?, ?, ?)",
+                [(first, last, effective_from.strftime("%Y-%m-%d"), float(rate), int(bool(tips)))
+                 for first, last, effective_from, rate, tips in entries[
+                     ["first_name", "last_name", "effective_from", "rate", "tips_eligible"]].itertuples(index=False)],
+            )
+
+    def get_workers(self, location: str | None = None, start_date_range: datetime | None = None,
+                    end_date_range: datetime | None = None) -> list[str]:
+        """Same as ElixirOperations.get_workers, the distinct workers on shifts that started at
+            or after start_date_range and ended at or before end_date_range"""
+        clauses, params = [], []
+        if location:
+            clauses.append("location = ?")
+            params.append(location.lower())
+        if start_date_range:
+            clauses.append("start_date >= ?")
+            params.append(_format_time(start_date_range))
+        if end_date_range:
+            clauses.append("end_date <= ?")
+            params.append(_format_time(end_date_range))
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        rows = self.connection.execute(
+            f"SELECT DISTINCT first_name, last_name FROM shifts {where} ORDER BY first_name, last_name", params
+        ).fetchall()
+        return [f"{first_name} {last_name}" for first_name, last_name in rows]
+
+    def daily_rates_df(self, location: str | None = None, start_date: str | None = None,
+                       end_date: str | None = None) -> "pd.DataFrame":
+        """The daily rates frame for the optional location and date range (YYYY-MM-DD, inclusive)."""
+        import pandas as pd
+
+        where, params = _date_filters(location, start_date, end_date)
+        df = pd.read_sql_query(DAILY_RATES_QUERY.format(where=where), self.connection, params=params * 2)
+        df["date"] = pd.to_datetime(df["date"]).dt.date
+        return df
+
+    def payroll_totals_df(self, location: str | None = None, start_date: str | None = None,
+                          end_date: str | None = None) -> "pd.DataFrame":
+        """Payroll totals by employee for the optional location and date range, the same as the
+            payroll summary frame. load_compensation has to be called first"""
+        import pandas as pd
+
+        where, params = _date_filters(location, start_date, end_date)
+        shift_where, shift_params = _date_filters(location, start_date, end_date, prefix="sh.")
+        query = PAYROLL_TOTALS_QUERY.format(rates=DAILY_RATES_QUERY.format(where=where), shift_where=shift_where)
+        return pd.read_sql_query(query, self.connection, params=params * 2 + shift_params)
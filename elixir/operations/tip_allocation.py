@@ -0,0 +1,86 @@
+# tips credited to the staff on the clock when the tip came in
+# the pooled method spreads all the tips of a day and shift type over everyone who worked it,
+# here each tip is split evenly between the tip eligible employees clocked in at that location
+# at the tip time. it is a sweep over sorted times, no tip is ever compared with every shift:
+#   - the number of people on the clock at a tip is (starts <= t) - (ends <= t), two sorted searches
+#   - each tip's share per person is summed into a running total over the tips in time order
+#   - a shift gets the running total at its end minus the running total at its start
+# shifts are half open [start, end) so the alpha/bravo halves of one punch never both get a tip.
+# the times are epoch microseconds, on the fall back night the wall clock runs through 1 AM
+# twice and only the epoch can tell a tip in the first pass from one in the second
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+from elixir.operations.work_team import to_eastern, to_epoch_us
+
+
+class TipAllocation(NamedTuple):
+    allocated: np.ndarray # tips credited to each shift
+    staff_on_clock: np.ndarray # eligible people clocked in at each tip
+    unallocated: np.ndarray # the tip amount nobody eligible was on the clock for
+
+
+def _to_us(times) -> np.ndarray:
+    return np.asarray(times, dtype="datetime64[us]").astype(np.int64)
+
+
+def epoch_us(times: pd.Series) -> np.ndarray:
+    """Epoch microseconds of a column of times. An aware column is converted as a whole, any
+        other column goes through to_epoch_us one time at a time, naive times are taken to be
+        eastern wall clock like to_eastern does"""
+    if isinstance(times.dtype, pd.DatetimeTZDtype):
+        return _to_us(times.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy())
+    return np.array([to_epoch_us(to_eastern(time)) for time in times], dtype=np.int64)
+
+
+def allocate_location_tips(shift_starts, shift_ends, tip_times, tip_amounts) -> TipAllocation:
+    """Splits the tips of one location between the shifts on the clock at each tip time. The
+        times are epoch microseconds, or datetime64 when they are all in one offset"""
+    starts, ends = _to_us(shift_starts), _to_us(shift_ends)
+    times, amounts = _to_us(tip_times), np.asarray(tip_amounts, dtype=np.float64)
+
+    sorted_starts, sorted_ends = np.sort(starts), np.sort(ends)
+    staff = np.searchsorted(sorted_starts, times, side="right") - np.searchsorted(sorted_ends, times, side="right")
+    share = np.where(staff > 0, amounts / np.maximum(staff, 1), 0.0)
+
+    # running total of the per person share over the tips in time order
+    order = np.argsort(times, kind="stable")
+    tip_times_sorted = times[order]
+    running = np.concatenate([[0.0], np.cumsum(share[order])])
+    # tips with start <= time < end
+    allocated = running[np.searchsorted(tip_times_sorted, ends, side="left")] \
+        - running[np.searchsorted(tip_times_sorted, starts, side="left")]
+
+    return TipAllocation(
+        allocated=allocated,
+        staff_on_clock=staff,
+        unallocated=np.where(staff > 0, 0.0, amounts),
+    )
+
+
+def allocate_tips(shifts_df: pd.DataFrame, tips_df: pd.DataFrame, eligible=None) -> tuple[np.ndarray, float]:
+    """Returns the tips credited to every shift of shifts_df in its order and the total of the
+        tips nobody eligible was clocked in for. eligible marks the shifts that can get tips,
+        every shift can when it isn't given. The times are the start_date, end_date and tip_date
+        columns, they are allocated on epoch time so they should be aware, naive wall clock
+        times can't tell the two 1 AM hours of the fall back night apart"""
+    allocated = np.zeros(len(shifts_df), dtype=np.float64)
+    if eligible is None:
+        eligible = np.ones(len(shifts_df), dtype=bool)
+    eligible = np.asarray(eligible, dtype=bool)
+
+    shift_locations = shifts_df["location"].to_numpy(dtype=object)
+    tip_locations = tips_df["location"].to_numpy(dtype=object)
+    shift_starts, shift_ends = epoch_us(shifts_df["start_date"]), epoch_us(shifts_df["end_date"])
+    tip_times = epoch_us(tips_df["tip_date"])
+    unallocated = 0.0
+    for location in pd.unique(tip_locations):
+        on_location = (shift_locations == location) & eligible
+        tips_here = tip_locations == location
+        allocation = allocate_location_tips(
+            shift_starts[on_location], shift_ends[on_location],
+            tip_times[tips_here], tips_df["tip_amount"].to_numpy()[tips_here],
+        )
+        allocated[on_location] = allocation.allocated
+        unallocated += float(allocation.unallocated.sum())
+    return allocated, unallocated
@@ -1,26 +1,41 @@
-from typing import TypedDict, List, Dict
-from datetime import datetime
-from elixir.operations.work_team import WorkTeamDay, TeamType
-from dateutil import parser  # For more robust date parsing
+from typing import List, Dict, Iterable, Iterator
+from datetime import date as date_type, datetime
+from elixir.instrumentation import measure
+from elixir.operations.date_index import DateIndex
+from elixir.operations.records import SlotRecord, intern_string
+from elixir.operations.work_team import get_team_codes, to_eastern, to_epoch_us
 from elixir.quantic import QuanticTipData  # Import the type
 from zoneinfo import ZoneInfo
 eastern = ZoneInfo("America/New_York")
 
-class ElixirTip(TypedDict):
-    tip_date: datetime
-    tip_amount: float
-    shift_type: str  # "a" or "b"
-    location: str
+# number of tips assigned to a team together
+TEAM_BATCH_SIZE = 4096
+
+class ElixirTip(SlotRecord):
+    # reads like a dict of these keys, the slot order is the column order of the tips frame
+    __slots__ = ("tip_date", "tip_amount", "shift_type", "location", "ref")
+
+    def __init__(self, tip_date: datetime, tip_amount: float, shift_type: str, location: str, ref: str):
+        self.tip_date = tip_date
+        self.tip_amount = tip_amount
+        self.shift_type = shift_type  # "a" or "b"
+        self.location = location
+        self.ref = ref  # quantic REF# of the tip
 
 
 class ElixirTipParser:
-    def __init__(self, quantic_tip_data: List[QuanticTipData], location: str):
+    def __init__(self, quantic_tip_data: Iterable[QuanticTipData], location: str, stream: bool = False):
         if not location:
             raise ValueError("Location is required")
         self.location = location
         self.quantic_tip_data = quantic_tip_data  # Changed from csv_file_path
         self.parsed_tips: List[ElixirTip] = []
-        self.parse_tips()
+        # lookups by date and shift type, built from parsed_tips on first use
+        self._date_index: DateIndex[ElixirTip] | None = None
+        self._shift_type_index: Dict[str, List[ElixirTip]] = {}
+        # in stream mode the tips are only produced through iter_tips()
+        if not stream:
+            self.parse_tips()
 
     def _is_total_row(self, row: QuanticTipData) -> bool:
         """ Checks if row a total row used to calculate totals for dataset"""
@@ -38,73 +53,88 @@ class ElixirTipParser:
             print(f"Warning: Could not parse tip amount: {tip_str}. Skipping.")
             return 0.0  # Or handle the error as appropriate
 
-    def parse_tips(self):
-        parsed_tips: List[ElixirTip] = []
+    def _assign_batch(self, batch: list[tuple[datetime, float, str]]) -> Iterator[ElixirTip]:
+        """Works out the shift type (a or b) of a batch of tips in one pass and yields the tips."""
+        with measure("tip_parse", rows=len(batch)):
+            tips = list(self._build_batch(batch))
+        yield from tips
+
+    def _build_batch(self, batch: list[tuple[datetime, float, str]]) -> Iterator[ElixirTip]:
+        """The tips of a batch with their shift type, tips right on the boundary are left out."""
+        shift_types = get_team_codes([to_epoch_us(tip_dt) for tip_dt, _, _ in batch]).tolist()
+        location = intern_string(self.location)
+        for (tip_dt, tip_amount, ref), shift_type in zip(batch, shift_types):
+            # Only build the ElixirTip if shift_type is valid, tips right on the boundary have none
+            if shift_type:
+                yield ElixirTip(tip_dt, tip_amount, intern_string(shift_type), location, ref)
 
+    def iter_tips(self) -> Iterator[ElixirTip]:
+        """Yields the parsed tips. The quantic rows are read in batches of TEAM_BATCH_SIZE so
+            the shift types are worked out together, the input can still be a stream."""
         if not self.quantic_tip_data:  # Check if the input data is empty
-            return []
+            return
 
+        batch = []
         for tip_data in self.quantic_tip_data:  # Iterate through QuanticTipData objects
 
             # Skip rows that have TOTAL in first col
             if self._is_total_row(tip_data):
                 continue
 
-            date_time_str = tip_data.get("date_time")
-            if not date_time_str:
+            date_time = tip_data.get("date_time")
+            if not date_time:
                 continue
             try:
-                tip_dt = datetime.fromisoformat(date_time_str)
-                if tip_dt.tzinfo is None:
-                    tip_dt = tip_dt.replace(tzinfo=eastern)
-                else:
-                    tip_dt = tip_dt.astimezone(eastern)
+                # the quantic parser already gives an aware datetime, this only normalizes it to eastern
+                tip_dt = to_eastern(date_time)
             except ValueError:
-                print(f"Warning: Invalid ISO date string: {date_time_str}")
+                print(f"Warning: Invalid ISO date string: {date_time}")
                 continue
 
 
-            employee_name = str(tip_data.get('employee_name', '')).strip()
             tip_amount_str = str(tip_data.get('tip', ''))
             tip_amount = self._extract_tip_amount(tip_amount_str)
 
+            batch.append((tip_dt, tip_amount, str(tip_data.get('ref', ''))))
+            if len(batch) >= TEAM_BATCH_SIZE:
+                yield from self._assign_batch(batch)
+                batch = []
 
-            # Determine the shift type (a or b) using WorkTeamDay
-            tip_team_type = WorkTeamDay.get_team_by_time(tip_dt)
-            shift_type = None
-            if tip_team_type == TeamType.a:
-                shift_type = "a"
-            if tip_team_type == TeamType.b:
-                shift_type = "b"
+        if batch:
+            yield from self._assign_batch(batch)
 
-            # Only build the ElixirTip if tip_dt and shift_type are valid
-            if shift_type:
-                tip: ElixirTip = {
-                    "tip_date": tip_dt,
-                    "tip_amount": tip_amount,
-                    "shift_type": shift_type,
-                    "location": self.location,
-                }
-                parsed_tips.append(tip)
-
-        self.parsed_tips = parsed_tips
+    def parse_tips(self):
+        self.parsed_tips = list(self.iter_tips())
+        self._date_index = None
         return self.parsed_tips
 
-    def get_tips_by_date(self, date: datetime) -> List[ElixirTip]:
+    def _get_indexes(self) -> tuple[DateIndex[ElixirTip], Dict[str, List[ElixirTip]]]:
+        """Builds the date and shift type indexes of parsed_tips once, they are rebuilt when
+            parsed_tips is replaced or has changed size"""
+        if self._date_index is None or not self._date_index.is_current(self.parsed_tips):
+            self._date_index = DateIndex(self.parsed_tips, "tip_date")
+            self._shift_type_index = {}
+            for tip in self._date_index.records:
+                self._shift_type_index.setdefault(tip["shift_type"], []).append(tip)
+        return self._date_index, self._shift_type_index
+
+    @property
+    def date_index(self) -> DateIndex[ElixirTip]:
+        """parsed_tips sorted by tip_date."""
+        return self._get_indexes()[0]
+
+    def get_tips_by_date(self, date: datetime | date_type) -> List[ElixirTip]:
         """Returns a list of tips for a specific date."""
-        tips_for_date: List[ElixirTip] = []
-        for tip in self.parsed_tips:
-            if tip.get("tip_date").date() == date.date():  # Compare dates only
-                tips_for_date.append(tip)
-        return tips_for_date
+        return self.date_index.on_day(date)
+
+    def get_tips_between(self, start: datetime | None = None, end: datetime | None = None) -> List[ElixirTip]:
+        """Returns the tips from start to end, both included, in time order."""
+        return self.date_index.between(start, end)
 
     def get_tips_by_shift(self, shift_type: str) -> List[ElixirTip]:
         """Returns a list of tips for a specific shift type ('a' or 'b')."""
         if shift_type not in ("a", "b"):
             raise ValueError("Invalid shift type.  Must be 'a' or 'b'.")
 
-        tips_for_shift: List[ElixirTip] = []
-        for tip in self.parsed_tips:
-            if tip["shift_type"] == shift_type:
-                tips_for_shift.append(tip)
-        return tips_for_shift
+        _, shift_type_index = self._get_indexes()
+        return list(shift_type_index.get(shift_type, []))
@@ -1,13 +1,17 @@
 # exlixir work team class is a utility static method class that will take in a
 # start and end dateime and return what team  datetime a
-from datetime import datetime, time
+from datetime import date, datetime, time, timedelta, timezone
+from typing import TYPE_CHECKING, NamedTuple, TypedDict
 
 from enum import Enum
 
-from pandas.io.formats.style_render import TypedDict
+# numpy is only imported by the batch functions, so importing this module stays cheap
+if TYPE_CHECKING:
+    import numpy as np
 # we want workteam enum for the shifts
 # alpha and bravo are the two shifts
 from zoneinfo import ZoneInfo
+eastern = ZoneInfo("America/New_York")
 SHIFT_BOUNDARY = datetime.strptime("6:30 PM", '%I:%M %p').time()
 
 
@@ -86,3 +90,109 @@ class WorkTeamDay():
         if time > WorkTeamDay.get_boundary_time(time):
             return TeamType.b
         return None
+
+
+# the batch splitter works on int64 epoch microseconds so whole columns can be compared at once
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+DAY_MICROSECONDS = 24 * 60 * 60 * 1_000_000
+
+
+def to_eastern(date_time: datetime | str) -> datetime:
+    """Returns a datetime as an aware datetime in eastern time, this is the one place the
+        shift and tip times are normalized. Naive datetimes are taken to already be eastern,
+        ISO 8601 strings are still accepted for data that didn't come from the quantic parsers"""
+    if isinstance(date_time, str):
+        date_time = datetime.fromisoformat(date_time)
+    if date_time.tzinfo is None:
+        return date_time.replace(tzinfo=eastern)
+    if date_time.tzinfo is eastern:
+        return date_time
+    return date_time.astimezone(eastern)
+
+
+def to_epoch_us(date_time: datetime) -> int:
+    """Returns an aware datetime as integer microseconds since the epoch."""
+    return (date_time - EPOCH) // ONE_MICROSECOND
+
+
+def from_epoch_us(epoch_us: int, tz: ZoneInfo = eastern) -> datetime:
+    """Returns integer microseconds since the epoch as an aware datetime in tz."""
+    return (EPOCH + timedelta(microseconds=int(epoch_us))).astimezone(tz)
+
+
+class TeamSplit(NamedTuple):
+    # one entry per shift, all times are epoch microseconds
+    has_a: "np.ndarray"
+    a_start: "np.ndarray"
+    a_end: "np.ndarray"
+    has_b: "np.ndarray"
+    b_start: "np.ndarray"
+    b_end: "np.ndarray"
+    boundary: "np.ndarray"
+
+
+def get_boundary_epochs(times_us, boundary_time: time = SHIFT_BOUNDARY,
+                        tz: ZoneInfo = eastern) -> "np.ndarray":
+    """Vectorized WorkTeamDay.get_boundary_time, returns the boundary time on the local date
+        of every time as epoch microseconds.
+        The boundary is only worked out with zoneinfo once per calendar day, each time is then
+        matched to its local day by searching the sorted local midnights. That keeps the utc
+        offset right on both sides of a DST change"""
+    import numpy as np
+
+    times_us = np.asarray(times_us, dtype=np.int64)
+    if times_us.size == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # the local date of a time is always within a day of its utc date
+    utc_days = np.unique(times_us // DAY_MICROSECONDS)
+    candidate_days = np.unique(np.concatenate([utc_days - 1, utc_days, utc_days + 1]))
+    days = [date(1970, 1, 1) + timedelta(days=int(day)) for day in candidate_days]
+
+    midnights = np.array([to_epoch_us(datetime.combine(day, time(0), tzinfo=tz)) for day in days], dtype=np.int64)
+    boundaries = np.array([to_epoch_us(datetime.combine(day, boundary_time, tzinfo=tz)) for day in days], dtype=np.int64)
+
+    day_index = np.searchsorted(midnights, times_us, side="right") - 1
+    return boundaries[day_index]
+
+
+def split_team_arrays(start_us, end_us, boundary_time: time = SHIFT_BOUNDARY,
+                      tz: ZoneInfo = eastern) -> TeamSplit:
+    """Batch version of WorkTeamDay, splits arrays of clock in/out times into the alpha and
+        bravo segments in one pass. The rules are the same as WorkTeamDay.get_team_hours,
+        the boundary is taken on the local date the shift started so shifts crossing
+        midnight stay bravo until they end. WorkTeamDay is kept as the reference version"""
+    import numpy as np
+
+    start_us = np.asarray(start_us, dtype=np.int64)
+    end_us = np.asarray(end_us, dtype=np.int64)
+    boundary = get_boundary_epochs(start_us, boundary_time, tz)
+
+    # team a runs until the boundary, there is none if the shift started after it
+    has_a = start_us <= boundary
+    a_end = np.minimum(end_us, boundary)
+    # team b starts at the boundary, there is none if the shift ended before it
+    has_b = end_us >= boundary
+    b_start = np.maximum(start_us, boundary)
+
+    return TeamSplit(
+        has_a=has_a,
+        a_start=start_us,
+        a_end=a_end,
+        has_b=has_b,
+        b_start=b_start,
+        b_end=end_us,
+        boundary=boundary,
+    )
+
+
+def get_team_codes(times_us, boundary_time: time = SHIFT_BOUNDARY,
+                   tz: ZoneInfo = eastern) -> "np.ndarray":
+    """Vectorized WorkTeamDay.get_team_by_time, returns "a" before the boundary, "b" after it
+        and "" for times right on the boundary"""
+    import numpy as np
+
+    times_us = np.asarray(times_us, dtype=np.int64)
+    boundary = get_boundary_epochs(times_us, boundary_time, tz)
+    return np.where(times_us < boundary, "a", np.where(times_us > boundary, "b", ""))
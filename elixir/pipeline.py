@@ -0,0 +1,103 @@
+# one run of the payroll pipeline, from the quantic csv files to the payroll frames
+# every stage is worked out the first time something asks for it and then kept on the run,
+# so the csv files are parsed and split once no matter how many outputs are built from them
+from functools import cached_property
+import os
+from typing import TYPE_CHECKING
+from elixir.operations import DATA_DIR, ElixirOperations, ElixirShift, ElixirTip, discover_locations, load_locations
+from elixir.operations.overtime import OvertimeRule
+from elixir.operations.store import ElixirStore
+from elixir.quantic.cache import QuanticCsvCache
+
+# the frame building modules bring in pandas, they are imported by the stages that use them
+if TYPE_CHECKING:
+    import pandas as pd
+    from elixir.operations.compensation import CompensationTable
+    from elixir.operations.pay_periods import PayPeriods
+
+
+class PayrollRun:
+    def __init__(self, locations: tuple[str, ...] | None = None, cache: QuanticCsvCache | None = None,
+                 workers: int | None = None, compensation: "CompensationTable | None" = None,
+                 periods: "PayPeriods | None" = None, data_dir: str = DATA_DIR, shards: int | None = None,
+                 store: ElixirStore | None = None, allocate: bool = False,
+                 overtime: OvertimeRule | None = None):
+        self.data_dir = data_dir
+        # every location in the data folder unless they are given
+        self.locations = tuple(location.lower() for location in locations) if locations else tuple(discover_locations(data_dir))
+        self.cache = cache
+        self.workers = workers
+        # number of locations loaded at once in their own processes
+        self.shards = shards
+        # optional sqlite store the parsed shifts and tips are upserted into
+        self.store = store
+        # with pay periods every frame is tagged with its period and payroll is grouped by it
+        self.periods = periods
+        # credit each tip to the staff on the clock when it came in, next to the pooled tips
+        self.allocate = allocate
+        # weekly overtime is only paid when a rule is given
+        self.overtime = overtime
+        if compensation is not None:
+            self.compensation = compensation
+
+    @cached_property
+    def compensation(self) -> "CompensationTable":
+        from elixir.operations.compensation import COMPENSATION_FILE_NAME, CompensationTable
+
+        return CompensationTable.from_csv(os.path.join(self.data_dir, COMPENSATION_FILE_NAME))
+
+    @cached_property
+    def operations(self) -> dict[str, ElixirOperations]:
+        """The parsed operations of each location, the locations are loaded as separate shards."""
+        return load_locations(list(self.locations), self.data_dir, self.cache, self.workers, self.shards, self.store)
+
+    @cached_property
+    def shifts(self) -> list[ElixirShift]:
+        return [shift for ops in self.operations.values() for shift in ops.shifts]
+
+    @cached_property
+    def tips(self) -> list[ElixirTip]:
+        return [tip for ops in self.operations.values() for tip in ops.tips]
+
+    @cached_property
+    def summary(self) -> "tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]":
+        """The shifts, tips and daily rates frames."""
+        from elixir.reports.summary_dataframes import build_summary_dataframes
+
+        return build_summary_dataframes(self.shifts, self.tips, self.periods)
+
+    @property
+    def shifts_df(self) -> "pd.DataFrame":
+        return self.summary[0]
+
+    @property
+    def tips_df(self) -> "pd.DataFrame":
+        return self.summary[1]
+
+    @property
+    def daily_rates_df(self) -> "pd.DataFrame":
+        return self.summary[2]
+
+    @cached_property
+    def payroll(self) -> "tuple[pd.DataFrame, pd.DataFrame]":
+        """The payroll detail and payroll summary frames."""
+        from elixir.operations.payroll_utils import build_payroll_calculations
+
+        tips_df = shift_times_df = None
+        if self.allocate:
+            # the parsed records still have their aware times, the summary frames only have wall
+            # clock, so the tips are allocated on frames of the records
+            from elixir.operations.records import records_frame
+
+            tips_df = records_frame(self.tips, ElixirTip)
+            shift_times_df = records_frame(self.shifts, ElixirShift)
+        return build_payroll_calculations(self.shifts_df, self.daily_rates_df, self.compensation, self.periods,
+                                          tips_df, self.overtime, shift_times_df)
+
+    @property
+    def payroll_calc_df(self) -> "pd.DataFrame":
+        return self.payroll[0]
+
+    @property
+    def payroll_summary_df(self) -> "pd.DataFrame":
+        return self.payroll[1]
@@ -2,36 +2,85 @@
 # we will take in a csv file and map data fields from it
 # there is a shift csv and a tip csv
 # we will create a class for each of these csvs to  parase the data using seperate mappid dictionaries
+import abc
 import re
 import csv
 from datetime import datetime, tzinfo  # Import datetime for time calculations
-from typing import TypedDict
+from typing import Iterator, TypedDict
 from zoneinfo import ZoneInfo
 import zoneinfo
+from elixir.instrumentation import measure
 
 class QuanticParseError(Exception):
     def __init__(self, message: str):
         self.message = message
         super().__init__(self.message)
 
-class BaseCsvParser:  # Base class to share common functionalities
-    def __init__(self, csv_file):
+# number of rows read before the schema columns are converted together
+ROW_BATCH_SIZE = 4096
+
+
+class BaseCsvParser(abc.ABC):  # Base class to share common functionalities
+    # per column schema set by the subclasses, maps a cleaned header to the type it holds.
+    # columns that are not in the schema are kept as stripped strings and never checked for dates
+    schema: dict[str, str] = {}
+
+    def __init__(self, csv_file, stream: bool = False):
         self.csv_file = csv_file
         self.timezone = ZoneInfo("America/New_York")  # Initialize timezone object
-        self.data = self.parse_csv()
-
-    def _parse_quantive_datetime(self, date_time_str: str) -> str:
-        """Parses a QuantiC date/time string into an ISO 8601 format."""
+        # rows grouped by employee, built on first use by _get_employee_index()
+        self._employee_index: dict = {}
+        self._indexed_data: list | None = None
+        self._indexed_rows = 0
+        # in stream mode the rows are only read through iter_rows() and never kept in memory
+        self.data = [] if stream else self.parse_csv()
+
+    def _parse_quantive_datetime(self, date_time_str: str) -> datetime:
+        """Parses a QuantiC date/time string into an aware datetime in the parser timezone."""
         try:
             date_time = datetime.strptime(date_time_str, "%m-%d-%y %I:%M %p")
             # Localize the datetime object to the specified timezone
-            localized_date_time = date_time.replace(tzinfo=self.timezone)
-            # return ISO 8601 format with timezone
-            iso_format = localized_date_time.isoformat()
-            return iso_format
+            return date_time.replace(tzinfo=self.timezone)
         except ValueError:
             raise QuanticParseError(f"Invalid date/time format: {date_time_str} expected format: MM-DD-YY HH:MM AM/PM")
 
+    def _parse_datetime_column(self, values: list[str]) -> list[datetime | str]:
+        """Parses a batch of QuantiC date/time strings from one column into aware datetimes.
+            Quantic always writes MM-DD-YY HH:MM AM/PM so the fields are read by position and
+            repeated values are only parsed once, anything else goes through strptime"""
+        parsed: dict[str, datetime] = {}
+        timezone = self.timezone
+        column = []
+        for value in values:
+            # empty cells are left alone, these are the total rows
+            if not value:
+                column.append(value)
+                continue
+            date_time = parsed.get(value)
+            if date_time is None:
+                if len(value) == 17 and value[2] == "-" and value[5] == "-" and value[8] == " " and value[11] == ":":
+                    try:
+                        hour = int(value[9:11])
+                        meridian = value[15:].upper()
+                        if 1 <= hour <= 12 and meridian in ("AM", "PM"):
+                            hour = hour % 12 + (12 if meridian == "PM" else 0)
+                            date_time = datetime(2000 + int(value[6:8]), int(value[0:2]), int(value[3:5]),
+                                                 hour, int(value[12:14]), tzinfo=timezone)
+                    except ValueError:
+                        date_time = None
+                if date_time is None:
+                    # not in the fixed layout, let strptime parse it or raise the parse error
+                    date_time = self._parse_quantive_datetime(value)
+                parsed[value] = date_time
+            column.append(date_time)
+        return column
+
+    def _get_column_parser(self, column_type: str):
+        """Returns the batch parser for a schema column type."""
+        if column_type == "datetime":
+            return self._parse_datetime_column
+        raise QuanticParseError(f"Unknown column type in schema: {column_type}")
+
 
     def clean_header(self, header):
         """Cleans a single header string using regex to create snake_case."""
@@ -42,36 +91,92 @@ class BaseCsvParser:  # Base class to share common functionalities
         cleaned_header = re.sub(r"\s+", "_", cleaned_header).lower()
         return cleaned_header
 
-    def parse_csv(self):
-        """Parses the CSV file with generic logic, to be customized by subclasses."""
-        data = []
+    def _convert_batch(self, batch: list[dict], schema_columns: list[tuple[str, str]]):
+        """Converts the schema columns of a batch of rows, one column at a time."""
+        for header_key, column_type in schema_columns:
+            column_parser = self._get_column_parser(column_type)
+            values = [row.get(header_key, "") for row in batch]
+            for row, value in zip(batch, column_parser(values)):
+                if header_key in row:
+                    row[header_key] = value
+
+    def iter_rows(self) -> Iterator[dict]:
+        """Yields the rows of the CSV file one at a time without holding the whole file.
+            Rows are read in batches of ROW_BATCH_SIZE so each schema column is parsed together.
+            A missing file prints an error and yields no rows, the same as parse_csv"""
         try:
-            with open(self.csv_file, 'r', newline='') as csvfile:
-                reader = csv.reader(csvfile, delimiter=',')
-                header = next(reader, None)
-                if not header:
-                    print(f"Error: CSV file is empty or has no header: {self.csv_file}")
-                    return []
-
-                standardized_header = [self.clean_header(h) for h in header]
-                header_indices = {h: i for i, h in enumerate(standardized_header)}
-
-                for row in reader:
-                    if not row:
-                        continue
-                    row_data = {}
-                    for i, col in enumerate(row):
-                        header_key = standardized_header[i]
-                        col_value = col.strip()
-                        # try to parse the date/time if it's in the format MM-DD-YY HH:MM AM/PM as it should
-                        if "-" in col_value and (":"  in col_value):
-                            col_value = self._parse_quantive_datetime(col_value)
-                        row_data[header_key] = col_value
-                    data.append(row_data)
-            return data
+            csvfile = open(self.csv_file, 'r', newline='')
         except FileNotFoundError:
             print(f"Error: File not found: {self.csv_file}")
-            return []
+            return
+        with csvfile:
+            reader = csv.reader(csvfile, delimiter=',')
+            header = next(reader, None)
+            if not header:
+                print(f"Error: CSV file is empty or has no header: {self.csv_file}")
+                return
+
+            with measure("header_clean", rows=1):
+                standardized_header = [self.clean_header(h) for h in header]
+                # only the columns in the schema are converted
+                schema_columns = [(h, self.schema[h]) for h in standardized_header if h in self.schema]
+
+            while True:
+                with measure("csv_read") as counter:
+                    batch = []
+                    for row in reader:
+                        if not row:
+                            continue
+                        row_data = {}
+                        for i, col in enumerate(row):
+                            row_data[standardized_header[i]] = col.strip()
+                        batch.append(row_data)
+                        if len(batch) >= ROW_BATCH_SIZE:
+                            break
+                    counter.rows = len(batch)
+                if not batch:
+                    return
+
+                with measure("datetime_parse", rows=len(batch)):
+                    self._convert_batch(batch, schema_columns)
+                yield from batch
+
+    @abc.abstractmethod
+    def _employee_key(self, row: dict):
+        """Returns the key used to index a row by employee, set by the subclasses."""
+
+    def _get_employee_index(self) -> dict:
+        """Returns the rows of self.data grouped by employee key. The index is built the first
+            time it is needed, rows appended to self.data later are added on the next call"""
+        if self._indexed_data is not self.data or self._indexed_rows > len(self.data):
+            # the data was replaced, start over
+            self._employee_index = {}
+            self._indexed_data = self.data
+            self._indexed_rows = 0
+
+        employee_index = self._employee_index
+        for i in range(self._indexed_rows, len(self.data)):
+            row = self.data[i]
+            employee_index.setdefault(self._employee_key(row), []).append(row)
+        self._indexed_rows = len(self.data)
+        return employee_index
+
+    def _sum_column(self, rows: list[dict], column: str, employee_label: str) -> float:
+        """Sums a numeric column over rows, dollar signs are removed and bad values skipped."""
+        total: float = 0
+        for row in rows:
+            try:
+                value_str: str = row.get(column, "").replace("$", "")
+                if value_str:
+                    total += float(value_str)
+            except ValueError:
+                print(f"Warning: Invalid {column} value for {employee_label}: {row.get(column)}")
+        return total
+
+    def parse_csv(self):
+        """Parses the CSV file with generic logic, to be customized by subclasses."""
+        try:
+            return list(self.iter_rows())
         except Exception as e:
             print(f"Error reading CSV: {e}")
             return []
@@ -85,8 +190,8 @@ class QunaticShiftData(TypedDict):
     last_name: str
     role: str
     day: str
-    clocked_in: str
-    clocked_out: str
+    clocked_in: datetime | str # aware datetime, empty string on the total rows
+    clocked_out: datetime | str
     c_in_c_out: str
     hourly_rate: str
     hours: str
@@ -95,8 +200,10 @@ class QunaticShiftData(TypedDict):
     status: str
 
 class QunanticShiftCsvParser(BaseCsvParser): # Subclass for the shift CSV
-    def __init__(self, csv_file):
-        super().__init__(csv_file)  # Initialize the base class
+    schema = {"clocked_in": "datetime", "clocked_out": "datetime"}
+
+    def __init__(self, csv_file, stream: bool = False):
+        super().__init__(csv_file, stream)  # Initialize the base class
         self.employee_name_key = "first_name" # for access to the employee name
         self.employee_last_name_key = "last_name" # for access to the employee name
         self.hours_key = "hours" # for access to the hours
@@ -110,55 +217,48 @@ class QunanticShiftCsvParser(BaseCsvParser): # Subclass for the shift CSV
             data.append(row)
         return data
 
+    def _employee_key(self, row: QunaticShiftData) -> tuple[str, str]:
+        return (row.get(self.employee_name_key), row.get(self.employee_last_name_key))
+
     def get_employee_data(self, first_name, last_name) -> list[QunaticShiftData]:
         """Filters and returns data for a specific employee."""
-        employee_data: list[QunaticShiftData] = []
-        for row in self.data:
-            if row.get(self.employee_name_key) == first_name and row.get(self.employee_last_name_key) == last_name:
-                employee_data.append(row)
-        return employee_data
+        return list(self._get_employee_index().get((first_name, last_name), []))
 
     def calculate_total_hours(self, first_name, last_name) -> float:
         """Calculates the total hours worked by an employee."""
-        total_hours: float = 0
-        employee_data: list[QunaticShiftData] = self.get_employee_data(first_name, last_name)
-        for row in employee_data:
-            try:
-                hours_str: str = row.get(self.hours_key, "")
-                if hours_str:
-                    total_hours += float(hours_str)
-            except ValueError:
-                print(f"Warning: Invalid hours value for {first_name} {last_name}: {row.get(self.hours_key)}")
-        return total_hours
+        employee_data: list[QunaticShiftData] = self._get_employee_index().get((first_name, last_name), [])
+        return self._sum_column(employee_data, self.hours_key, f"{first_name} {last_name}")
 
     def calculate_total_tips(self, first_name, last_name) -> float:
         """Calculates the total tips earned by an employee."""
-        total_tips: float = 0
-        employee_data: list[QunaticShiftData] = self.get_employee_data(first_name, last_name)
-        for row in employee_data:
-            try:
-                tip_str: str = row.get(self.tip_key, "").replace("$", "")
-                if tip_str:
-                    total_tips += float(tip_str)
-            except ValueError:
-                print(f"Warning: Invalid tip value for {first_name} {last_name}: {row.get(self.tip_key)}")
-        return total_tips
+        employee_data: list[QunaticShiftData] = self._get_employee_index().get((first_name, last_name), [])
+        return self._sum_column(employee_data, self.tip_key, f"{first_name} {last_name}")
+
+    def calculate_all_total_hours(self) -> dict[tuple[str, str], float]:
+        """Calculates the total hours of every employee in one pass, keyed by (first_name, last_name)."""
+        return {
+            (first_name, last_name): self._sum_column(rows, self.hours_key, f"{first_name} {last_name}")
+            for (first_name, last_name), rows in self._get_employee_index().items()
+            if first_name
+        }
+
+    def calculate_all_total_tips(self) -> dict[tuple[str, str], float]:
+        """Calculates the total tips of every employee in one pass, keyed by (first_name, last_name)."""
+        return {
+            (first_name, last_name): self._sum_column(rows, self.tip_key, f"{first_name} {last_name}")
+            for (first_name, last_name), rows in self._get_employee_index().items()
+            if first_name
+        }
 
     def get_all_employees(self) -> list[tuple[str, str]]:
         """Returns a list of unique employee names."""
-        employees: set[tuple[str, str]] = set()
-        for row in self.data:
-            first_name: str = row.get(self.employee_name_key)
-            last_name: str = row.get(self.employee_last_name_key)
-            if first_name and last_name:
-                employees.add((first_name, last_name))
-        return list(employees)
+        return [(first_name, last_name) for first_name, last_name in self._get_employee_index() if first_name and last_name]
 
 
 # Tip Data Typed Dictionary
 class QuanticTipData(TypedDict):
     ref: str
-    datetime: str
+    date_time: datetime | str # aware datetime, empty string on the total rows
     employee_name: str
     terminal: str
     cc_info: str
@@ -168,8 +268,10 @@ class QuanticTipData(TypedDict):
 
 
 class QuanticTipCsvParser(BaseCsvParser):  # Subclass for the tips CSV
-    def __init__(self, csv_file):
-        super().__init__(csv_file)  # Initialize the base class
+    schema = {"date_time": "datetime"}
+
+    def __init__(self, csv_file, stream: bool = False):
+        super().__init__(csv_file, stream)  # Initialize the base class
         self.employee_name_key = "employee_name" # for access to the employee name
         self.hours_key = None # there is no hours column in this data
         self.tip_key = "tip" # for access to the tip
@@ -181,35 +283,29 @@ class QuanticTipCsvParser(BaseCsvParser):  # Subclass for the tips CSV
             data.append(row)
         return data
 
+    def _employee_key(self, row: QuanticTipData) -> str:
+        return row.get(self.employee_name_key)
+
     def get_employee_data(self, employee_name: str) -> list[QuanticTipData]:
         """Filters and returns data for a specific employee."""
-        employee_data: list[QuanticTipData] = []
-        for row in self.data:
-            if row.get(self.employee_name_key) == employee_name:
-                employee_data.append(row)
-        return employee_data
+        return list(self._get_employee_index().get(employee_name, []))
 
     def calculate_total_tips(self, employee_name: str) -> float:
         """Calculates the total tips earned by an employee."""
-        total_tips: float = 0
-        employee_data: list[QuanticTipData] = self.get_employee_data(employee_name)
-        for row in employee_data:
-            try:
-                tip_str: str = row.get(self.tip_key, "").replace("$", "")
-                if tip_str:
-                    total_tips += float(tip_str)
-            except ValueError:
-                print(f"Warning: Invalid tip value for {employee_name}: {row.get(self.tip_key)}")
-        return total_tips
+        employee_data: list[QuanticTipData] = self._get_employee_index().get(employee_name, [])
+        return self._sum_column(employee_data, self.tip_key, employee_name)
+
+    def calculate_all_total_tips(self) -> dict[str, float]:
+        """Calculates the total tips of every employee in one pass, keyed by employee name."""
+        return {
+            employee_name: self._sum_column(rows, self.tip_key, employee_name)
+            for employee_name, rows in self._get_employee_index().items()
+            if employee_name
+        }
 
     def get_all_employees(self) -> list[str]:
         """Returns a list of unique employee names."""
-        employees: set[str] = set()
-        for row in self.data:
-            employee_name: str = row.get(self.employee_name_key)
-            if employee_name:
-                employees.add(employee_name)
-        return list(employees)
+        return [employee_name for employee_name in self._get_employee_index() if employee_name]
 
 
 if __name__ == '__main__':
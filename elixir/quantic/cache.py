@@ -0,0 +1,142 @@
+# cache of parsed quantic csv files so reruns can skip parsing the files that haven't changed
+# each csv file gets a binary sidecar file in the cache directory holding its parsed rows.
+# the sidecar name is a hash of the file path, size, mtime and content so any change to the
+# file points at a new sidecar and the old one is never read again, it just ages out
+import hashlib
+import os
+import pickle
+import tempfile
+from elixir.instrumentation import measure
+
+# bump this when the layout of the parsed rows changes so old sidecars are not used
+CACHE_VERSION = 2
+CACHE_DIR = ".elixir_cache"
+# default size cap for all the sidecars together, the least recently used are removed past it
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+SIDECAR_EXTENSION = ".rows"
+
+
+class QuanticCsvCache:
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _file_key(self, parser_class, csv_file: str) -> str:
+        """Returns the cache key for a csv file, a hash of its path, size, mtime and content."""
+        stat = os.stat(csv_file)
+        content_hash = hashlib.blake2b()
+        with open(csv_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                content_hash.update(chunk)
+
+        # the parser and its schema are part of the key since they decide what the rows look like
+        schema = sorted(getattr(parser_class, "schema", {}).items())
+        key_parts = [
+            str(CACHE_VERSION),
+            parser_class.__name__,
+            repr(schema),
+            os.path.abspath(csv_file),
+            str(stat.st_size),
+            str(stat.st_mtime_ns),
+            content_hash.hexdigest(),
+        ]
+        return hashlib.blake2b("|".join(key_parts).encode(), digest_size=16).hexdigest()
+
+    def _sidecar_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + SIDECAR_EXTENSION)
+
+    def _read(self, sidecar_path: str) -> list[dict] | None:
+        """Reads the rows from a sidecar, returns None when there is no usable sidecar."""
+        try:
+            with open(sidecar_path, 'rb') as f:
+                payload = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: ignoring unreadable cache file {sidecar_path}: {e}")
+            return None
+
+        # touch the sidecar so it counts as recently used for the eviction
+        try:
+            os.utime(sidecar_path)
+        except OSError:
+            pass
+
+        columns = payload.get("columns")
+        if columns is None:
+            return payload.get("rows", [])
+        return [dict(zip(columns, values)) for values in payload.get("rows", [])]
+
+    def _write(self, sidecar_path: str, rows: list[dict]):
+        """Writes the rows to a sidecar. When every row has the same columns the rows are stored
+            as tuples under one header instead of repeating the keys in every row"""
+        columns = list(rows[0].keys()) if rows else []
+        if all(len(row) == len(columns) and list(row.keys()) == columns for row in rows):
+            payload = {"columns": columns, "rows": [tuple(row.values()) for row in rows]}
+        else:
+            payload = {"columns": None, "rows": rows}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # write to a temp file first so a reader never sees a half written sidecar
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, sidecar_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def evict(self):
+        """Removes the least recently used sidecars until the cache is under max_bytes."""
+        try:
+            entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(SIDECAR_EXTENSION)]
+        except FileNotFoundError:
+            return
+
+        sidecars = []
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            sidecars.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        total_bytes = sum(size for _, size, _ in sidecars)
+        # oldest first
+        for _, size, path in sorted(sidecars):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+
+    def load_rows(self, parser_class, csv_file: str) -> list[dict]:
+        """Returns the parsed rows of a csv file, from the cache when the file hasn't changed
+            otherwise it is parsed with parser_class and the rows are saved for the next run"""
+        sidecar_path = self._sidecar_path(self._file_key(parser_class, csv_file))
+        with measure("cache_read") as counter:
+            rows = self._read(sidecar_path)
+            counter.rows = len(rows) if rows is not None else 0
+        if rows is not None:
+            return rows
+
+        rows = parser_class(csv_file).get_all_data()
+        # files that fail to parse come back empty, don't keep those around
+        if rows:
+            self._write(sidecar_path, rows)
+            self.evict()
+        return rows
+
+    def clear(self):
+        """Removes every sidecar in the cache directory."""
+        try:
+            entries = list(os.scandir(self.cache_dir))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.name.endswith(SIDECAR_EXTENSION):
+                os.remove(entry.path)
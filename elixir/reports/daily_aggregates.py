@@ -0,0 +1,229 @@
+# daily tip rate aggregates kept up to date between runs
+# the minutes worked and the tips of every (date, location, shift_type) are stored in
+# .elixir_cache together with what each csv file added to them. on a refresh only the files
+# that are new or changed are parsed, a changed or removed file first has its old numbers
+# taken back out, so a daily export only costs the rows of that export. a punch overlapping a
+# punch of an earlier time file is quarantined like in a full run, so the accepted punches
+# of every time file are kept too and a changed time file means the files after it are read
+# again
+import os
+import pickle
+import tempfile
+from datetime import date, datetime
+from typing import TypedDict
+import numpy as np
+import pandas as pd
+from elixir.operations import (DATA_DIR, SHIFT_LENGTH_MAX, ElixirOperations, discover_locations, parse_time_file,
+                               parse_tips_file)
+from elixir.operations.shift_validation import ShiftValidator
+from elixir.operations.work_team import to_epoch_us
+from elixir.quantic.cache import CACHE_DIR, QuanticCsvCache
+
+# bump this when the stored layout changes so old stores are rebuilt
+AGGREGATE_VERSION = 2
+AGGREGATE_FILE = os.path.join(CACHE_DIR, "daily_aggregates.pkl")
+
+# (date, location, shift_type)
+GroupKey = tuple[date, str, str]
+# (first_name, last_name, clocked_in, clocked_out) of an accepted punch
+Punch = tuple[str, str, datetime, datetime]
+
+
+class FileContribution(TypedDict):
+    kind: str # time or tips
+    location: str
+    fingerprint: tuple[int, int] # size and mtime of the file when it was read
+    groups: dict[GroupKey, tuple[float, int]] # minutes or tip amount, and the number of rows
+    punches: list[Punch] # the punches a time file added, empty for tips
+
+
+class DailyAggregateStore:
+    """Running minutes worked and tip sums by (date, location, shift_type), the same numbers
+        as a full run. The time files of a location are taken in file name order and a punch
+        that overlaps a punch of an earlier file is quarantined, as ElixirOperations does"""
+
+    def __init__(self, path: str = AGGREGATE_FILE, cache: QuanticCsvCache | None = None):
+        self.path = path
+        self.cache = cache
+        self.files: dict[str, FileContribution] = {}
+        # [minutes_worked, shift_count, tip_amount, tip_count] of each group
+        self.totals: dict[GroupKey, list] = {}
+        self.load()
+
+    def load(self):
+        """Loads the stored aggregates, a missing or outdated store starts empty."""
+        try:
+            with open(self.path, 'rb') as f:
+                payload = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Warning: ignoring unreadable aggregate file {self.path}: {e}")
+            return
+        if payload.get("version") != AGGREGATE_VERSION:
+            return
+        self.files = payload["files"]
+        self.totals = payload["totals"]
+
+    def save(self):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        payload = {"version": AGGREGATE_VERSION, "files": self.files, "totals": self.totals}
+        # write to a temp file first so a reader never sees a half written store
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _apply(self, contribution: FileContribution, sign: int):
+        """Adds (sign 1) or takes back out (sign -1) the numbers of one file."""
+        offset = 0 if contribution["kind"] == "time" else 2
+        for key, (amount, count) in contribution["groups"].items():
+            totals = self.totals.setdefault(key, [0.0, 0, 0.0, 0])
+            totals[offset] += sign * amount
+            totals[offset + 1] += sign * count
+            # an empty side is reset to exact zeros so no float remainder is left behind
+            if totals[offset + 1] == 0:
+                totals[offset] = 0.0
+            if totals[1] == 0 and totals[3] == 0:
+                del self.totals[key]
+
+    def _read_contribution(self, csv_file: str, kind: str, location: str,
+                           validator: ShiftValidator | None = None) -> FileContribution:
+        """Parses one csv file and sums its rows by group. The validator of a time file holds
+            the punches of the earlier files of its location"""
+        groups: dict[GroupKey, list] = {}
+        punches: list[Punch] = []
+        if kind == "time":
+            file_punches, _ = parse_time_file(csv_file, location, self.cache, validator)
+            for _, row, clocked_in, clocked_out, team_shifts in file_punches:
+                punches.append((row.get("first_name", ""), row.get("last_name", ""), clocked_in, clocked_out))
+                for shift in team_shifts:
+                    start_date = shift["start_date"]
+                    key = (start_date.date(), shift["location"], shift["shift_type"])
+                    group = groups.setdefault(key, [0.0, 0])
+                    # elapsed minutes from the epoch, the wall clock difference is off on DST nights
+                    group[0] += (to_epoch_us(shift["end_date"]) - to_epoch_us(start_date)) / 60e6
+                    group[1] += 1
+        else:
+            for tip in parse_tips_file(csv_file, location, self.cache):
+                key = (tip["tip_date"].date(), tip["location"], tip["shift_type"])
+                group = groups.setdefault(key, [0.0, 0])
+                group[0] += tip["tip_amount"]
+                group[1] += 1
+
+        stat = os.stat(csv_file)
+        return FileContribution(
+            kind=kind,
+            location=location,
+            fingerprint=(stat.st_size, stat.st_mtime_ns),
+            groups={key: (amount, count) for key, (amount, count) in groups.items()},
+            punches=punches,
+        )
+
+    def _is_current(self, csv_path: str) -> bool:
+        """True when the file was read before and hasn't changed since."""
+        previous = self.files.get(csv_path)
+        if previous is None:
+            return False
+        stat = os.stat(csv_path)
+        return previous["fingerprint"] == (stat.st_size, stat.st_mtime_ns)
+
+    def _refresh_time(self, location: str, csv_paths: list[str]) -> int:
+        """Brings the time files of one location up to date, returns how many files were read
+            or taken out. Files before the first new, changed or removed one keep their numbers,
+            that file and every file after it are taken out and read again in order with the
+            earlier punches in the validator, the same overlaps are quarantined as in a full run"""
+        stored = sorted(path for path, c in self.files.items() if c["location"] == location and c["kind"] == "time")
+        stale = [path for path in sorted(set(stored) | set(csv_paths))
+                 if path not in csv_paths or not self._is_current(path)]
+        if not stale:
+            return 0
+        first_stale = stale[0]
+
+        validator = ShiftValidator(location, SHIFT_LENGTH_MAX)
+        for path in stored:
+            if path < first_stale:
+                for first_name, last_name, clocked_in, clocked_out in self.files[path]["punches"]:
+                    validator.accept((first_name, last_name), clocked_in, clocked_out)
+
+        changed = 0
+        for path in stored:
+            if path >= first_stale:
+                self._apply(self.files.pop(path), -1)
+                changed += path not in csv_paths
+        for path in csv_paths:
+            if path >= first_stale:
+                contribution = self._read_contribution(path, "time", location, validator)
+                self._apply(contribution, 1)
+                self.files[path] = contribution
+                changed += 1
+        return changed
+
+    def _refresh_tips(self, location: str, csv_paths: list[str]) -> int:
+        """Brings the tips files of one location up to date, each tips file stands on its own."""
+        changed = 0
+        for csv_path in csv_paths:
+            if self._is_current(csv_path):
+                continue
+            # a re-exported file replaces everything it added last time
+            previous = self.files.get(csv_path)
+            if previous:
+                self._apply(previous, -1)
+            contribution = self._read_contribution(csv_path, "tips", location)
+            self._apply(contribution, 1)
+            self.files[csv_path] = contribution
+            changed += 1
+
+        # files of this location that are gone are taken back out
+        for csv_path in [path for path, c in self.files.items()
+                         if c["location"] == location and c["kind"] == "tips" and path not in csv_paths]:
+            self._apply(self.files.pop(csv_path), -1)
+            changed += 1
+        return changed
+
+    def refresh(self, locations: list[str] | None = None, data_dir: str = DATA_DIR) -> int:
+        """Brings the aggregates up to date with the csv files of the locations, returns how
+            many files were read or taken out. locations defaults to the locations found in
+            data_dir"""
+        if locations is None:
+            locations = discover_locations(data_dir)
+        changed = 0
+        for location in locations:
+            ops = ElixirOperations(location=location, stream=True, data_dir=data_dir)
+            changed += self._refresh_time(ops.location, [os.path.abspath(path) for path in ops.get_csv_paths("time")])
+            changed += self._refresh_tips(ops.location, [os.path.abspath(path) for path in ops.get_csv_paths("tips")])
+
+        if changed:
+            self.save()
+        return changed
+
+    def daily_rates_df(self) -> pd.DataFrame:
+        """The daily rates frame, the same as the one from get_summary_dataframes. Only the
+            groups with shifts are in it and groups without tips have a nan tip amount"""
+        keys = sorted(key for key, totals in self.totals.items() if totals[1] > 0)
+        minutes = np.array([self.totals[key][0] for key in keys], dtype=np.float64)
+        tips = np.array([self.totals[key][2] if self.totals[key][3] else np.nan for key in keys], dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = np.where(minutes > 0, tips / np.where(minutes > 0, minutes / 60, 1), 0.0)
+
+        return pd.DataFrame({
+            'date': [key[0] for key in keys],
+            'location': [key[1] for key in keys],
+            'shift_type': [key[2] for key in keys],
+            'minutes_worked': minutes,
+            'tip_amount': tips,
+            'hourly_tip_rate': rate,
+        })
+
+
+# --- Refresh and display the daily rates ---
+if __name__ == "__main__":
+    store = DailyAggregateStore()
+    print(f"refreshed {store.refresh()} files")
+    print(store.daily_rates_df())
@@ -1,38 +1,85 @@
 # summary_dataframes.py
 
 import pandas as pd
-from elixir.operations import ElixirOperations
+from elixir.instrumentation import measure
+from elixir.operations import DATA_DIR, ElixirShift, ElixirTip, load_locations
+from elixir.operations.pay_periods import PayPeriods
+from elixir.operations.payroll_engine import daily_rates, encode_group_keys
+from elixir.operations.records import records_frame
+from elixir.quantic.cache import QuanticCsvCache
 from zoneinfo import ZoneInfo
 
 eastern = ZoneInfo("America/New_York")
 
-def get_summary_dataframes():
-    buford_ops = ElixirOperations(location="Buford")
-    monroe_ops = ElixirOperations(location="Monroe")
 
-    all_tips = buford_ops.tips + monroe_ops.tips
-    all_shifts = buford_ops.shifts + monroe_ops.shifts
+def _as_eastern(column: pd.Series) -> pd.Series:
+    """The shift and tip times arrive as aware eastern datetimes so pandas already builds an
+        eastern datetime64 column from them, anything else is converted here"""
+    if isinstance(column.dtype, pd.DatetimeTZDtype) and str(column.dtype.tz) == str(eastern):
+        return column
+    return pd.to_datetime(column, utc=True).dt.tz_convert(eastern)
 
-    tips_df = pd.DataFrame(all_tips)
-    shifts_df = pd.DataFrame(all_shifts)
 
-    shifts_df['start_date'] = pd.to_datetime(shifts_df['start_date']).dt.tz_convert(eastern)
-    shifts_df['end_date'] = pd.to_datetime(shifts_df['end_date']).dt.tz_convert(eastern)
-    tips_df['tip_date'] = pd.to_datetime(tips_df['tip_date']).dt.tz_convert(eastern)
+def get_summary_dataframes(cache: QuanticCsvCache | None = None, workers: int | None = None,
+                           periods: PayPeriods | None = None, data_dir: str = DATA_DIR, shards: int | None = None):
+    # every location in the data folder, each loaded as its own shard
+    location_ops = load_locations(data_dir=data_dir, cache=cache, workers=workers, shards=shards)
+
+    all_tips = [tip for ops in location_ops.values() for tip in ops.tips]
+    all_shifts = [shift for ops in location_ops.values() for shift in ops.shifts]
+
+    return build_summary_dataframes(all_shifts, all_tips, periods)
+
+
+def build_summary_dataframes(all_shifts: list[ElixirShift], all_tips: list[ElixirTip], periods: PayPeriods | None = None):
+    """Builds the shifts, tips and daily rates frames from shifts and tips that are already parsed.
+        With pay periods the rows of all three frames are tagged with their period"""
+    with measure("summary_dataframes", rows=len(all_shifts) + len(all_tips)):
+        return _build_summary_dataframes(all_shifts, all_tips, periods)
+
+
+def _build_summary_dataframes(all_shifts: list[ElixirShift], all_tips: list[ElixirTip], periods: PayPeriods | None):
+    with measure("dataframe_build", rows=len(all_shifts) + len(all_tips)):
+        tips_df = records_frame(all_tips, ElixirTip)
+        shifts_df = records_frame(all_shifts, ElixirShift)
+
+        shifts_df['start_date'] = _as_eastern(shifts_df['start_date'])
+        shifts_df['end_date'] = _as_eastern(shifts_df['end_date'])
+        tips_df['tip_date'] = _as_eastern(tips_df['tip_date'])
 
     shifts_df['minutes_worked'] = (shifts_df['end_date'] - shifts_df['start_date']).dt.total_seconds() / 60
     shifts_df['hours_worked'] = round(shifts_df['minutes_worked'] / 60, 2)
 
-    shifts_df['date'] = shifts_df['start_date'].dt.date
-    tips_df['date'] = tips_df['tip_date'].dt.date
+    # local calendar day of each row, the day codes and the date columns both come from it
+    shift_days = shifts_df['start_date'].dt.tz_localize(None).to_numpy().astype('datetime64[D]')
+    tip_days = tips_df['tip_date'].dt.tz_localize(None).to_numpy().astype('datetime64[D]')
+    shifts_df['date'] = shift_days.astype(object)
+    tips_df['date'] = tip_days.astype(object)
+
+    # the daily sums and rates are done on integer (date, location, shift_type) codes
+    shift_keys = (shift_days, shifts_df['location'].to_numpy(dtype=object), shifts_df['shift_type'].to_numpy(dtype=object))
+    tip_keys = (tip_days, tips_df['location'].to_numpy(dtype=object), tips_df['shift_type'].to_numpy(dtype=object))
+    with measure("daily_rates", rows=len(shifts_df) + len(tips_df)):
+        keys, (shift_codes, tip_codes) = encode_group_keys(shift_keys, tip_keys)
+        rates = daily_rates(
+            shift_codes, shifts_df['minutes_worked'].to_numpy(),
+            tip_codes, tips_df['tip_amount'].to_numpy(),
+            keys.size,
+        )
+    dates, locations, shift_types = keys.decode(rates.codes)
 
-    daily_tips_df = tips_df.groupby(['date', 'location', 'shift_type']).agg({'tip_amount': 'sum'}).reset_index()
-    daily_shifts_df = shifts_df.groupby(['date', 'location', 'shift_type']).agg({'minutes_worked': 'sum'}).reset_index()
+    daily_rates_df = pd.DataFrame({
+        'date': dates.astype(object),
+        'location': locations,
+        'shift_type': shift_types,
+        'minutes_worked': rates.minutes_worked,
+        'tip_amount': rates.tip_amount,
+        'hourly_tip_rate': rates.hourly_tip_rate,
+    })
 
-    daily_rates_df = pd.merge(daily_shifts_df, daily_tips_df, on=['date', 'location', 'shift_type'], how='left')
-    daily_rates_df['hourly_tip_rate'] = daily_rates_df.apply(
-        lambda row: row['tip_amount'] / (row['minutes_worked']/60) if row['minutes_worked'] > 0 else 0, axis=1
-    )
+    if periods is not None:
+        for df in (shifts_df, tips_df, daily_rates_df):
+            periods.tag_frame(df)
 
     # Strip tz info before returning (or leave in if downstream logic needs it)
     shifts_df['start_date'] = shifts_df['start_date'].dt.tz_localize(None)
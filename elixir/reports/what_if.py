@@ -0,0 +1,176 @@
+# what if scenarios over the alpha/bravo boundary and the wage rates
+# the punches are put back together from the parsed alpha/bravo segments once, every scenario
+# then re-splits the same punch arrays at its boundary and works out the daily tip rates and
+# payroll with the array engine, nothing is parsed again. the rates of each rate table are
+# looked up once and shared by every boundary
+from datetime import datetime, time
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+from elixir.operations import ElixirShift, ElixirTip
+from elixir.operations.compensation import CompensationTable
+from elixir.operations.overtime import employee_codes
+from elixir.operations.payroll_engine import daily_rates, encode_group_keys, lookup_by_code, shift_tips
+from elixir.operations.records import records_frame
+from elixir.operations.work_team import SHIFT_BOUNDARY, eastern, get_team_codes, split_team_arrays
+from elixir.pipeline import PayrollRun
+
+SCENARIO_COLUMNS = ['boundary', 'rates']
+
+
+class Punches(NamedTuple):
+    # one entry per clock in/out, times are epoch microseconds
+    start: np.ndarray
+    end: np.ndarray
+    day: np.ndarray # datetime64[D] local date of the clock in
+    clock_in: np.ndarray # datetime64[us] local wall clock of the clock in
+    location: np.ndarray
+    employee: np.ndarray # code of the (first_name, last_name)
+
+
+class Tips(NamedTuple):
+    time: np.ndarray # epoch microseconds
+    day: np.ndarray # datetime64[D] local date
+    location: np.ndarray
+    amount: np.ndarray
+
+
+def parse_boundary(boundary: time | str) -> time:
+    """A boundary as a time, strings are read like SHIFT_BOUNDARY e.g. "6:00 PM"."""
+    if isinstance(boundary, time):
+        return boundary
+    return datetime.strptime(boundary, '%I:%M %p').time()
+
+
+def _epoch_and_local(times: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Epoch microseconds and naive local wall clock of aware datetimes."""
+    times = pd.to_datetime(times, utc=True).dt.as_unit('us')
+    local = times.dt.tz_convert(eastern).dt.tz_localize(None).to_numpy()
+    return times.dt.tz_localize(None).to_numpy().astype(np.int64), local
+
+
+def rebuild_punches(shifts_df: pd.DataFrame) -> tuple[Punches, pd.DataFrame]:
+    """Joins the alpha and bravo segments of every punch back into one clock in/out. Segments
+        are in the order they were parsed, so the bravo half of a punch is the segment right
+        after its alpha half and starts at the alpha end. Returns the punches and the
+        (first_name, last_name) of every employee code"""
+    start, start_local = _epoch_and_local(shifts_df['start_date'])
+    end, _ = _epoch_and_local(shifts_df['end_date'])
+    locations = shifts_df['location'].to_numpy(dtype=object)
+    first_names = shifts_df['first_name'].fillna('').to_numpy(dtype=object)
+    last_names = shifts_df['last_name'].fillna('').to_numpy(dtype=object)
+    employees = employee_codes(first_names, last_names)
+    shift_types = shifts_df['shift_type'].to_numpy(dtype=object)
+
+    # a bravo segment continues the punch of the alpha segment before it
+    continues = np.zeros(len(shifts_df), dtype=bool)
+    continues[1:] = (shift_types[1:] == 'b') & (shift_types[:-1] == 'a') & (start[1:] == end[:-1]) \
+        & (employees[1:] == employees[:-1]) & (locations[1:] == locations[:-1])
+    first = np.flatnonzero(~continues)
+    last = np.append(first[1:], len(shifts_df)) - 1
+
+    punches = Punches(
+        start=start[first],
+        end=end[last],
+        day=start_local[first].astype('datetime64[D]'),
+        clock_in=start_local[first],
+        location=locations[first],
+        employee=employees[first],
+    )
+    names = pd.DataFrame({'first_name': first_names, 'last_name': last_names, 'employee': employees})
+    names = names.drop_duplicates('employee').sort_values('employee')[['first_name', 'last_name']].reset_index(drop=True)
+    return punches, names
+
+
+def _scenario_totals(punches: Punches, tips: Tips, boundary: time, rates: dict[str, tuple[np.ndarray, np.ndarray]],
+                     n_employees: int) -> list[tuple[str, dict, np.ndarray]]:
+    """Splits the punches at one boundary and works out the totals of every rate table.
+        Returns (rates name, scenario totals, comp by employee) per rate table"""
+    split = split_team_arrays(punches.start, punches.end, boundary)
+    # a and b segments of every punch, one after the other
+    has = np.concatenate([split.has_a, split.has_b])
+    punch_index = np.concatenate([np.arange(len(punches.start))] * 2)[has]
+    shift_types = np.repeat(np.array(['a', 'b'], dtype=object), len(punches.start))[has]
+    hours = (np.concatenate([split.a_end - split.a_start, split.b_end - split.b_start])[has]) / 3_600_000_000
+
+    # tips right on the boundary belong to no shift, same as the tip parser
+    tip_types = get_team_codes(tips.time, boundary)
+    counted = tip_types != ""
+
+    shift_keys = (punches.day[punch_index], punches.location[punch_index], shift_types)
+    tip_keys = (tips.day[counted], tips.location[counted], tip_types[counted].astype(object))
+    keys, (shift_codes, tip_codes) = encode_group_keys(shift_keys, tip_keys)
+    day_rates = daily_rates(shift_codes, hours * 60, tip_codes, tips.amount[counted], keys.size)
+    tip_rate = lookup_by_code(day_rates.codes, day_rates.hourly_tip_rate, shift_codes, keys.size)
+
+    alpha = shift_types == 'a'
+    alpha_hours, bravo_hours = hours[alpha].sum(), hours[~alpha].sum()
+    # tips of each shift type over all the hours worked in it
+    alpha_tips = tips.amount[tip_types == 'a'].sum()
+    bravo_tips = tips.amount[tip_types == 'b'].sum()
+    employees = punches.employee[punch_index]
+    outcomes = []
+    for name, (wage_rates, tips_eligible) in rates.items():
+        wages = hours * wage_rates[punch_index]
+        tip = shift_tips(hours, tip_rate, tips_eligible[punch_index])
+        comp = wages + tip
+        totals = {
+            'alpha_hours': alpha_hours,
+            'bravo_hours': bravo_hours,
+            'alpha_tip_rate': alpha_tips / alpha_hours if alpha_hours else 0.0,
+            'bravo_tip_rate': bravo_tips / bravo_hours if bravo_hours else 0.0,
+            'total_wages': wages.sum(),
+            'total_tips': tip.sum(),
+            'total_comp': comp.sum(),
+        }
+        by_employee = np.bincount(employees, weights=comp, minlength=n_employees)
+        outcomes.append((name, totals, by_employee))
+    return outcomes
+
+
+def simulate(run: PayrollRun, boundaries: list[time | str] | None = None,
+             rate_tables: dict[str, CompensationTable] | None = None, by_employee: bool = False) -> pd.DataFrame:
+    """Works out payroll for every boundary and rate table pair from the shifts and tips the
+        run already parsed. boundaries defaults to SHIFT_BOUNDARY and rate_tables to the run's
+        compensation. Returns one row per scenario with its hours, tip rates, wages, tips and
+        comp and the change in comp from the first scenario. With by_employee the rows are per
+        scenario and employee with their total comp instead.
+        Rates are taken at the clock in of each punch, so an entry starting in the middle of a
+        day is not split across the boundary"""
+    boundaries = [parse_boundary(boundary) for boundary in (boundaries or [SHIFT_BOUNDARY])]
+    rate_tables = rate_tables or {'current': run.compensation}
+
+    # the parsed records still have their aware times, the summary frames only have wall clock
+    punches, names = rebuild_punches(records_frame(run.shifts, ElixirShift))
+    tips_df = records_frame(run.tips, ElixirTip)
+    tip_time, tip_local = _epoch_and_local(tips_df['tip_date'])
+    tips = Tips(
+        time=tip_time,
+        day=tip_local.astype('datetime64[D]'),
+        location=tips_df['location'].to_numpy(dtype=object),
+        amount=tips_df['tip_amount'].to_numpy(dtype=np.float64),
+    )
+    first_names = names['first_name'].to_numpy(dtype=object)[punches.employee]
+    last_names = names['last_name'].to_numpy(dtype=object)[punches.employee]
+    rates = {name: table.lookup(first_names, last_names, punches.clock_in) for name, table in rate_tables.items()}
+
+    rows = []
+    employee_rows = []
+    for boundary in boundaries:
+        label = boundary.strftime('%I:%M %p')
+        for name, totals, by_employee_comp in _scenario_totals(punches, tips, boundary, rates, len(names)):
+            rows.append({'boundary': label, 'rates': name, **totals})
+            employee_rows.append(names.assign(boundary=label, rates=name, total_comp=by_employee_comp))
+
+    if by_employee:
+        employees_df = pd.concat(employee_rows, ignore_index=True)
+        return employees_df[SCENARIO_COLUMNS + ['first_name', 'last_name', 'total_comp']]
+
+    comparison_df = pd.DataFrame(rows)
+    comparison_df['comp_change'] = comparison_df['total_comp'] - comparison_df['total_comp'].iloc[0]
+    return comparison_df
+
+
+# --- Compare a few boundaries ---
+if __name__ == "__main__":
+    print(simulate(PayrollRun(), ["6:00 PM", "6:30 PM", "7:00 PM"]).to_string())
@@ -0,0 +1,184 @@
+# output writers for the report sheets
+# every writer streams a sheet out in chunks of rows instead of building the whole file in
+# memory first. the xlsx writer uses xlsxwriter's constant memory mode where each row is
+# flushed to disk as soon as the next one starts, the parquet and csv writers write one file
+# per sheet a chunk at a time. ReportWriter picks the writer of each sheet from its format
+import math
+import os
+from datetime import date, datetime
+from typing import TYPE_CHECKING
+from elixir.instrumentation import measure
+
+# number of rows converted and written together
+CHUNK_ROWS = 50_000
+
+FORMAT_XLSX = "xlsx"
+FORMAT_PARQUET = "parquet"
+FORMAT_CSV = "csv"
+FORMATS = (FORMAT_XLSX, FORMAT_PARQUET, FORMAT_CSV)
+
+# only the frames passed in are pandas, the module itself never needs it
+if TYPE_CHECKING:
+    import pandas as pd
+
+# same display formats pandas uses for dates in excel
+EXCEL_DATETIME_FORMAT = "yyyy-mm-dd hh:mm:ss"
+EXCEL_DATE_FORMAT = "yyyy-mm-dd"
+
+
+def iter_chunks(df: "pd.DataFrame", chunk_rows: int = CHUNK_ROWS):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+class ExcelWriter:
+    """Writes sheets into one xlsx workbook in constant memory mode, the rows of a sheet
+        have to be written in order and a sheet can't be changed once the next one starts"""
+
+    def __init__(self, path: str, chunk_rows: int = CHUNK_ROWS):
+        import pandas as pd
+        import xlsxwriter
+
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+        self.header_format = self.workbook.add_format({"bold": True, "border": 1, "align": "center"})
+        self.datetime_format = self.workbook.add_format({"num_format": EXCEL_DATETIME_FORMAT})
+        self.date_format = self.workbook.add_format({"num_format": EXCEL_DATE_FORMAT})
+        self.nat = pd.NaT
+
+    def _write_cell(self, worksheet, row: int, col: int, value):
+        if value is None:
+            return
+        # pandas timestamps are datetimes, so check for those before plain dates
+        if isinstance(value, datetime):
+            if value.tzinfo is not None:
+                value = value.replace(tzinfo=None)
+            worksheet.write_datetime(row, col, value, self.datetime_format)
+        elif isinstance(value, date):
+            worksheet.write_datetime(row, col, value, self.date_format)
+        elif isinstance(value, bool):
+            worksheet.write_boolean(row, col, value)
+        elif isinstance(value, (int, float)):
+            # nan is a blank cell, same as pandas writes it
+            if not math.isnan(value):
+                worksheet.write_number(row, col, value)
+        elif value is self.nat:
+            return
+        else:
+            worksheet.write_string(row, col, str(value))
+
+    def write_sheet(self, name: str, df: "pd.DataFrame"):
+        worksheet = self.workbook.add_worksheet(name)
+        for col, column in enumerate(df.columns):
+            worksheet.write_string(0, col, str(column), self.header_format)
+
+        row = 1
+        for chunk in iter_chunks(df, self.chunk_rows):
+            # missing values of every dtype become None once the chunk is objects
+            values = chunk.astype(object).where(chunk.notna(), None)
+            for record in values.itertuples(index=False, name=None):
+                for col, value in enumerate(record):
+                    self._write_cell(worksheet, row, col, value)
+                row += 1
+
+    def close(self):
+        self.workbook.close()
+
+
+class ParquetWriter:
+    """Writes each sheet to its own parquet file in the directory, one row group per chunk."""
+
+    def __init__(self, directory: str, prefix: str = "", chunk_rows: int = CHUNK_ROWS):
+        self.directory = directory
+        self.prefix = prefix
+        self.chunk_rows = chunk_rows
+
+    def write_sheet(self, name: str, df: "pd.DataFrame"):
+        # pyarrow is only needed when a sheet is written as parquet
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise Exception("pyarrow is required to write parquet output, pip install pyarrow")
+
+        path = os.path.join(self.directory, f"{self.prefix}{name}.parquet")
+        # the schema comes from the whole frame so a chunk with only missing values in a
+        # column still gets the column's real type
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+        with pq.ParquetWriter(path, schema) as writer:
+            for chunk in iter_chunks(df, self.chunk_rows):
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+    def close(self):
+        pass
+
+
+class CsvWriter:
+    """Writes each sheet to its own csv file in the directory, appending a chunk at a time."""
+
+    def __init__(self, directory: str, prefix: str = "", chunk_rows: int = CHUNK_ROWS):
+        self.directory = directory
+        self.prefix = prefix
+        self.chunk_rows = chunk_rows
+
+    def write_sheet(self, name: str, df: "pd.DataFrame"):
+        path = os.path.join(self.directory, f"{self.prefix}{name}.csv")
+        # an empty frame still gets its header
+        df.iloc[:0].to_csv(path, index=False)
+        for chunk in iter_chunks(df, self.chunk_rows):
+            chunk.to_csv(path, mode="a", header=False, index=False)
+
+    def close(self):
+        pass
+
+
+class ReportWriter:
+    """Sends every sheet to the writer of its format. The xlsx sheets all go into one
+        workbook <name>.xlsx, parquet and csv sheets get a file each named <name>_<sheet>"""
+
+    def __init__(self, output_dir: str, name: str, formats: dict[str, str] | None = None,
+                 default_format: str = FORMAT_XLSX, chunk_rows: int = CHUNK_ROWS):
+        for sheet_format in list((formats or {}).values()) + [default_format]:
+            if sheet_format not in FORMATS:
+                raise ValueError(f"Invalid output format: {sheet_format}. Must be one of {', '.join(FORMATS)}.")
+        self.output_dir = output_dir
+        self.name = name
+        self.formats = formats or {}
+        self.default_format = default_format
+        self.chunk_rows = chunk_rows
+        self.writers: dict[str, ExcelWriter | ParquetWriter | CsvWriter] = {}
+        # every file written, in the order the sheets were written
+        self.paths: list[str] = []
+
+    def _get_writer(self, sheet_format: str):
+        if sheet_format not in self.writers:
+            if sheet_format == FORMAT_XLSX:
+                path = os.path.join(self.output_dir, f"{self.name}.xlsx")
+                self.writers[sheet_format] = ExcelWriter(path, self.chunk_rows)
+            elif sheet_format == FORMAT_PARQUET:
+                self.writers[sheet_format] = ParquetWriter(self.output_dir, f"{self.name}_", self.chunk_rows)
+            else:
+                self.writers[sheet_format] = CsvWriter(self.output_dir, f"{self.name}_", self.chunk_rows)
+        return self.writers[sheet_format]
+
+    def write_sheet(self, sheet: str, df: "pd.DataFrame"):
+        sheet_format = self.formats.get(sheet, self.default_format)
+        with measure(f"write_{sheet}", rows=len(df)):
+            self._get_writer(sheet_format).write_sheet(sheet, df)
+        if sheet_format == FORMAT_XLSX:
+            path = os.path.join(self.output_dir, f"{self.name}.xlsx")
+        else:
+            path = os.path.join(self.output_dir, f"{self.name}_{sheet}.{sheet_format}")
+        if path not in self.paths:
+            self.paths.append(path)
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
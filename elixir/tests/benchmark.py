@@ -0,0 +1,159 @@
+# scaling benchmark of the payroll pipeline on synthetic quantic exports
+# every size gets its own synthetic data folder, then each stage is run once to warm up, timed
+# over a few runs keeping the fastest, like import_budget, and run again under tracemalloc for
+# its peak memory. the throughput and memory of every stage are compared
+# with benchmark_baseline.json and anything more than --tolerance worse is flagged
+#   python -m elixir.tests.benchmark
+#   python -m elixir.tests.benchmark --sizes 1000 10000 100000 1000000 10000000
+#   python -m elixir.tests.benchmark --save-baseline
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, TypedDict
+from elixir.operations.payroll_utils import get_payroll_calculations
+from elixir.operations.shift_parser import ElixirShiftParser
+from elixir.operations.tip_parser import ElixirTipParser
+from elixir.quantic import QuanticTipCsvParser, QunanticShiftCsvParser
+from elixir.reports.summary_dataframes import get_summary_dataframes
+from elixir.tests.synthetic import write_dataset
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "benchmark_baseline.json")
+DEFAULT_SIZES = [1_000, 10_000]
+# a stage is a regression when it is this much slower or bigger than the baseline
+DEFAULT_TOLERANCE = 0.25
+# timed runs of every stage, the fastest one is kept
+RUNS = 5
+LOCATION = "synthetic0"
+
+
+class StageResult(TypedDict):
+    seconds: float
+    rows: int
+    rows_per_second: float
+    peak_mb: float | None
+
+
+@contextlib.contextmanager
+def _quiet():
+    """The parsers print progress, keep it out of the benchmark output."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _measure(stage: Callable[[], int], memory: bool, runs: int = RUNS) -> StageResult:
+    """Runs the stage once to warm up and keeps the fastest of runs timed runs, then runs it
+        again under tracemalloc for its peak memory. The stage returns the number of rows it handled"""
+    with _quiet():
+        # the first run pays for imports, caches and page faults the later ones don't
+        rows = stage()
+        seconds = None
+        for _ in range(max(runs, 1)):
+            started = time.perf_counter()
+            rows = stage()
+            elapsed = time.perf_counter() - started
+            seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+    peak_mb = None
+    if memory:
+        with _quiet():
+            tracemalloc.start()
+            try:
+                stage()
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        peak_mb = peak / 2 ** 20
+
+    return StageResult(seconds=seconds, rows=rows, rows_per_second=rows / seconds if seconds else 0.0, peak_mb=peak_mb)
+
+
+def benchmark_size(rows: int, memory: bool = True, seed: int = 0, runs: int = RUNS) -> dict[str, StageResult]:
+    """Writes a synthetic data folder with rows shifts and measures every stage on it."""
+    with tempfile.TemporaryDirectory(prefix="elixir_bench_") as data_dir:
+        write_dataset(data_dir, rows, seed=seed)
+        location_dir = os.path.join(data_dir, LOCATION)
+        time_csv = os.path.join(location_dir, "time", os.listdir(os.path.join(location_dir, "time"))[0])
+        tips_csv = os.path.join(location_dir, "tips", os.listdir(os.path.join(location_dir, "tips"))[0])
+
+        # the rows of each parser stage are read once up front so only the stage itself is timed
+        shift_rows = QunanticShiftCsvParser(time_csv).data
+        tip_rows = QuanticTipCsvParser(tips_csv).data
+
+        stages: dict[str, Callable[[], int]] = {
+            "parse_time_csv": lambda: len(QunanticShiftCsvParser(time_csv).parse_csv()),
+            "parse_tips_csv": lambda: len(QuanticTipCsvParser(tips_csv).parse_csv()),
+            "parse_shifts": lambda: len(ElixirShiftParser(shift_rows, LOCATION, stream=True).parse_shifts()),
+            "parse_tips": lambda: len(ElixirTipParser(tip_rows, LOCATION, stream=True).parse_tips()),
+            "summary_dataframes": lambda: len(get_summary_dataframes(data_dir=data_dir, shards=1)[0]),
+            "payroll_calculations": lambda: len(get_payroll_calculations(data_dir=data_dir, shards=1)[0]),
+        }
+        return {name: _measure(stage, memory, runs) for name, stage in stages.items()}
+
+
+def find_regressions(results: dict[str, dict[str, StageResult]], baseline: dict[str, dict[str, StageResult]],
+                     tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """Compares every stage with the same stage and size in the baseline, returns a message
+        for each one that lost more than tolerance of its throughput or grew its peak memory
+        by more than tolerance. Sizes or stages missing from the baseline are skipped"""
+    regressions = []
+    for size, stages in results.items():
+        for stage, result in stages.items():
+            base = baseline.get(size, {}).get(stage)
+            if not base:
+                continue
+            if result["rows_per_second"] < base["rows_per_second"] * (1 - tolerance):
+                regressions.append(f"{stage} at {size} rows: {result['rows_per_second']:,.0f} rows/s, "
+                                   f"baseline {base['rows_per_second']:,.0f} rows/s")
+            if result["peak_mb"] and base.get("peak_mb") and result["peak_mb"] > base["peak_mb"] * (1 + tolerance):
+                regressions.append(f"{stage} at {size} rows: peak {result['peak_mb']:,.1f} MB, "
+                                   f"baseline {base['peak_mb']:,.1f} MB")
+    return regressions
+
+
+def print_results(results: dict[str, dict[str, StageResult]]):
+    print(f"{'rows':>10}  {'stage':<22}{'seconds':>10}{'rows/s':>14}{'peak MB':>10}")
+    for size, stages in results.items():
+        for stage, result in stages.items():
+            peak = f"{result['peak_mb']:.1f}" if result["peak_mb"] is not None else "-"
+            print(f"{size:>10}  {stage:<22}{result['seconds']:>10.3f}{result['rows_per_second']:>14,.0f}{peak:>10}")
+
+
+# --- Run the benchmark ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the payroll pipeline on synthetic quantic exports")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="shift rows of each run")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline json to compare with or save to")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--runs", type=int, default=RUNS, help="timed runs of every stage, the fastest is kept")
+    parser.add_argument("--output", help="also write the results to this json file")
+    args = parser.parse_args()
+
+    # json keys are strings, so the sizes are too
+    results = {str(size): benchmark_size(size, memory=not args.no_memory, runs=args.runs) for size in args.sizes}
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print(f"Warning: no baseline at {args.baseline}, run with --save-baseline to store one")
+        sys.exit(0)
+    with open(args.baseline) as f:
+        regressions = find_regressions(results, json.load(f), args.tolerance)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    sys.exit(1 if regressions else 0)
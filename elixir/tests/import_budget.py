@@ -0,0 +1,76 @@
+# import time budget of the light modules
+# the parsing, splitting and cli modules have to import with the standard library only, pandas,
+# numpy and the writers load later where they are used. each module is imported in a fresh
+# interpreter a few times and the fastest import is checked against its budget
+#   python -m elixir.tests.import_budget
+import argparse
+import json
+import subprocess
+import sys
+
+# milliseconds each module may take to import, measured inside the interpreter so python's own
+# startup isn't counted. each budget is about twice the fastest import on a development machine,
+# room for a slower machine but not for a module that starts loading the parsers or the store
+BUDGETS_MS = {
+    "elixir.instrumentation": 30,
+    "elixir.quantic": 35,
+    "elixir.operations": 20,
+    "elixir.operations.work_team": 40,
+    "elixir.operations.records": 25,
+    "elixir.operations.overtime": 25,
+    "elixir.operations.shift_parser": 60,
+    "elixir.operations.tip_parser": 70,
+    "elixir.operations.store": 80,
+    "elixir.operations.location": 100,
+    "elixir.reports.writers": 30,
+    "elixir.pipeline": 110,
+}
+# modules none of the light modules may bring in
+HEAVY_MODULES = ("pandas", "numpy", "xlsxwriter", "pyarrow", "openpyxl", "pytz", "dateutil")
+RUNS = 5
+
+MEASURE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - started
+print(json.dumps({{"ms": seconds * 1000, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module: str, runs: int = RUNS) -> tuple[float, list[str]]:
+    """The fastest of runs imports of the module in a fresh interpreter, and the heavy modules
+        it brought in"""
+    fastest = None
+    heavy: list[str] = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", MEASURE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        fastest = result["ms"] if fastest is None else min(fastest, result["ms"])
+        heavy = result["heavy"]
+    return fastest, heavy
+
+
+# --- Check the budgets ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the import time of the light modules")
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget, for slow machines")
+    args = parser.parse_args()
+
+    failures = []
+    for module, budget in BUDGETS_MS.items():
+        ms, heavy = measure_import(module, args.runs)
+        status = "ok"
+        if heavy:
+            status = f"imports {', '.join(heavy)}"
+            failures.append(module)
+        elif ms > budget * args.scale:
+            status = "over budget"
+            failures.append(module)
+        print(f"{module:<36}{ms:>8.1f} ms  budget {budget * args.scale:>6.0f} ms  {status}")
+
+    sys.exit(1 if failures else 0)
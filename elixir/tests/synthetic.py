@@ -0,0 +1,171 @@
+# synthetic quantic exports for benchmarks and scale tests
+# writes time and tip csv files laid out like the real quantic exports, employee total rows
+# and the grand total rows included. closers run past midnight, the default start week has
+# the march DST change in it and longer runs go through both changes. employees are written
+# a block at a time with numpy so 10M rows never have to be in memory together
+#   python -m elixir.tests.synthetic /tmp/synthetic --rows 1000000
+import argparse
+import csv
+import os
+from datetime import date, timedelta
+import numpy as np
+from elixir.operations.compensation import COMPENSATION_FILE_NAME
+from elixir.operations.payroll_engine import CLOCK_LABELS
+
+TIME_HEADER = ["FIRST NAME ↑", "LAST NAME", "ROLE", "DAY", "CLOCKED IN", "CLOCKED OUT", "C.IN / C.OUT",
+               "HOURLY RATE", "HOURS", "TIP", "DECLARED TIP", "STATUS"]
+TIPS_HEADER = ["REF#", "DATE/TIME", "EMPLOYEE NAME", "TERMINAL", "CC INFO", "SERVICE AREA", "PAY TYPE", "TIP"]
+
+FIRST_NAMES = ["Becca", "Bennet", "Caroline", "Haley", "Kathryn", "Keri", "Laura", "Nate", "Pam", "Vanessa",
+               "Chad", "Ryan", "Sarah Beth", "Colleen", "Alyssa"]
+WEEKDAYS = np.array(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"], dtype=object)
+
+# starts the thursday before the 2025-03-09 spring forward
+START_DAY = date(2025, 3, 6)
+# two digit years only go to 2099, long runs add employees instead of days
+MAX_DAYS = 728
+# employees generated and written together
+EMPLOYEE_BLOCK = 256
+
+
+def plan_size(rows: int) -> tuple[int, int]:
+    """The number of employees and days that give about rows shifts, at least a week of days."""
+    days = min(max(rows // 20, 7), MAX_DAYS)
+    employees = max(-(-rows // days), 1)
+    return employees, days
+
+
+def employee_names(employees: int) -> list[tuple[str, str]]:
+    """Distinct (first_name, last_name) pairs, every tenth employee has no last name like some
+        of the real staff"""
+    names = []
+    for i in range(employees):
+        first = FIRST_NAMES[i % len(FIRST_NAMES)]
+        if i % 10 == 0:
+            names.append((f"{first} {i}", ""))
+        else:
+            names.append((first, f"Synthetic{i}"))
+    return names
+
+
+def _money(values) -> list[str]:
+    return [f"${value:,.2f}" for value in values]
+
+
+def write_location(data_dir: str, location: str, rows: int, tips_per_shift: float = 3.0, seed: int = 0,
+                   start_day: date = START_DAY) -> tuple[str, str, list[tuple[str, str]]]:
+    """Writes the time and tips csv of one location with about rows shifts, returns the two
+        paths and the employee names"""
+    rng = np.random.default_rng(seed)
+    employees, days = plan_size(rows)
+    names = employee_names(employees)
+
+    time_dir = os.path.join(data_dir, location, "time")
+    tips_dir = os.path.join(data_dir, location, "tips")
+    os.makedirs(time_dir, exist_ok=True)
+    os.makedirs(tips_dir, exist_ok=True)
+    time_path = os.path.join(time_dir, f"{location[0]}time_synthetic.csv")
+    tips_path = os.path.join(tips_dir, f"{location[0]}tip_synthetic.csv")
+
+    # "MM-DD-YY" of every day a shift or tip can land on, closers end the day after the last one
+    day_labels = np.array([(start_day + timedelta(days=d)).strftime("%m-%d-%y") for d in range(days + 2)], dtype=object)
+    day_names = WEEKDAYS[[(start_day + timedelta(days=d)).weekday() for d in range(days)]]
+
+    next_ref = 11000
+    grand_hours = 0.0
+    grand_tips = 0.0
+    with open(time_path, "w", newline="") as time_file, open(tips_path, "w", newline="") as tips_file:
+        time_writer = csv.writer(time_file, quoting=csv.QUOTE_ALL)
+        tips_writer = csv.writer(tips_file, quoting=csv.QUOTE_ALL)
+        time_writer.writerow(TIME_HEADER)
+        tips_writer.writerow(TIPS_HEADER)
+
+        for block_start in range(0, employees, EMPLOYEE_BLOCK):
+            block = names[block_start:block_start + EMPLOYEE_BLOCK]
+            shape = (len(block), days)
+
+            # openers clock in late morning and cross the boundary, closers clock in late
+            # afternoon and often run past midnight
+            closer = rng.random(shape) < 0.5
+            clock_in = np.where(closer, rng.integers(15 * 60, 20 * 60, shape), rng.integers(10 * 60, 12 * 60, shape))
+            length = rng.integers(3 * 60, 9 * 60, shape)
+            clock_in += np.arange(days) * 24 * 60
+            clock_out = clock_in + length
+
+            in_labels = day_labels[clock_in // (24 * 60)] + " " + CLOCK_LABELS[clock_in % (24 * 60)]
+            out_labels = day_labels[clock_out // (24 * 60)] + " " + CLOCK_LABELS[clock_out % (24 * 60)]
+            hours = length / 60
+
+            for e, (first, last) in enumerate(block):
+                employee_hours = hours[e]
+                time_writer.writerows(zip(
+                    [first] * days, [last] * days, ["Admin"] * days, day_names, in_labels[e], out_labels[e],
+                    ["Yes"] * days, ["0.00"] * days, [f"{h:.2f}" for h in employee_hours],
+                    ["$0.00"] * days, ["$0.00"] * days, ["Clocked Out"] * days,
+                ))
+                time_writer.writerow([first, last, "", "", "", "", "", "Total", f"{employee_hours.sum():.2f}",
+                                      "$0.00", "$0.00", ""])
+                grand_hours += employee_hours.sum()
+
+            # tips land at random minutes inside the shifts of the block, in time order
+            tip_counts = rng.poisson(tips_per_shift, shape).ravel()
+            shift_index = np.repeat(np.arange(tip_counts.size), tip_counts)
+            tip_minutes = clock_in.ravel()[shift_index] + (rng.random(shift_index.size) * length.ravel()[shift_index]).astype(np.int64)
+            tip_minutes.sort()
+            amounts = np.round(rng.lognormal(1.5, 0.7, tip_minutes.size), 2)
+            # a few checks are split and share their REF#
+            split = rng.random(tip_minutes.size) < 0.02
+            refs = next_ref + np.cumsum(~split)
+            next_ref = int(refs[-1]) + 1 if refs.size else next_ref
+
+            tip_labels = day_labels[tip_minutes // (24 * 60)] + " " + CLOCK_LABELS[tip_minutes % (24 * 60)]
+            count = tip_minutes.size
+            tips_writer.writerows(zip(
+                refs.astype(str), tip_labels, ["POS Admin"] * count, ["POS 1"] * count,
+                rng.integers(0, 10_000, count).astype(str), ["Bar"] * count, ["CreditCard"] * count,
+                _money(amounts),
+            ))
+            grand_tips += amounts.sum()
+
+        time_writer.writerow(["Total", "", "", "", "", "", "", "", f"{grand_hours:.2f}", "$0.00", "$0.00", ""])
+        tips_writer.writerow(["TOTAL", "", f"${grand_tips:,.2f}"])
+
+    return time_path, tips_path, names
+
+
+def write_compensation(data_dir: str, names: list[tuple[str, str]], seed: int = 0):
+    """Writes a compensation.csv for the employees, most get tips and a few are wage only."""
+    rng = np.random.default_rng(seed)
+    rates = rng.integers(10, 16, len(names))
+    with open(os.path.join(data_dir, COMPENSATION_FILE_NAME), "w", newline="") as f:
+        compensation_writer = csv.writer(f)
+        compensation_writer.writerow(["first_name", "last_name", "effective_from", "rate", "tips_eligible"])
+        for (first, last), rate, index in zip(names, rates, range(len(names))):
+            compensation_writer.writerow([first, last, "2025-01-01", f"{rate:.2f}", "false" if index % 12 == 11 else "true"])
+
+
+def write_dataset(data_dir: str, rows: int, locations: int = 1, tips_per_shift: float = 3.0, seed: int = 0,
+                  start_day: date = START_DAY) -> list[str]:
+    """Writes a data folder with about rows shifts per location and its compensation.csv,
+        returns the location names"""
+    location_names = [f"synthetic{i}" for i in range(locations)]
+    names: dict[tuple[str, str], None] = {}
+    for i, location in enumerate(location_names):
+        _, _, location_employees = write_location(data_dir, location, rows, tips_per_shift, seed + i, start_day)
+        names.update(dict.fromkeys(location_employees))
+    write_compensation(data_dir, list(names), seed)
+    return location_names
+
+
+# --- Write a synthetic data folder ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic quantic time and tip exports")
+    parser.add_argument("data_dir", help="folder to write the locations and compensation.csv into")
+    parser.add_argument("--rows", type=int, default=10_000, help="shift rows per location")
+    parser.add_argument("--locations", type=int, default=1)
+    parser.add_argument("--tips-per-shift", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    written = write_dataset(args.data_dir, args.rows, args.locations, args.tips_per_shift, args.seed)
+    print(f"wrote {', '.join(written)} to {args.data_dir}")
@@ -0,0 +1,106 @@
+# tests of the sidecar cache of parsed quantic csv files
+#   python -m pytest elixir/tests/test_cache.py
+import os
+from elixir.quantic import QuanticTipCsvParser
+from elixir.quantic.cache import SIDECAR_EXTENSION, QuanticCsvCache
+
+HEADER = '"REF#","DATE/TIME","EMPLOYEE NAME","TERMINAL","CC INFO","SERVICE AREA","PAY TYPE","TIP"\n'
+ROWS = [
+    '"11000","04-09-25 04:03 PM","Bennet","POS 1","6888","Bar","CreditCard","$5.25"\n',
+    '"11002","04-09-25 07:17 PM","Bennet","POS 1","8381","Bar","CreditCard","$3.00"\n',
+]
+
+
+class CountingParser(QuanticTipCsvParser):
+    # counts the files really parsed, everything else comes from the cache
+    parsed = 0
+
+    def __init__(self, csv_file, stream: bool = False):
+        CountingParser.parsed += 1
+        super().__init__(csv_file, stream)
+
+
+def write_tips(path, rows=ROWS) -> str:
+    path.write_text(HEADER + "".join(rows))
+    return str(path)
+
+
+def sidecars(cache_dir) -> list[str]:
+    return sorted(name for name in os.listdir(cache_dir) if name.endswith(SIDECAR_EXTENSION))
+
+
+def test_second_load_reads_the_sidecar(tmp_path):
+    CountingParser.parsed = 0
+    csv_file = write_tips(tmp_path / "tips.csv")
+    cache = QuanticCsvCache(str(tmp_path / "cache"))
+
+    first = cache.load_rows(CountingParser, csv_file)
+    second = cache.load_rows(CountingParser, csv_file)
+    assert CountingParser.parsed == 1
+    assert second == first
+    assert [row["ref"] for row in second] == ["11000", "11002"]
+
+
+def test_cached_datetimes_come_back_aware(tmp_path):
+    csv_file = write_tips(tmp_path / "tips.csv")
+    cache = QuanticCsvCache(str(tmp_path / "cache"))
+    parsed = cache.load_rows(QuanticTipCsvParser, csv_file)
+    cached = cache.load_rows(QuanticTipCsvParser, csv_file)
+    assert cached[0]["date_time"] == parsed[0]["date_time"]
+    assert cached[0]["date_time"].hour == 16 and cached[0]["date_time"].tzinfo is not None
+
+
+def test_changed_file_is_parsed_again(tmp_path):
+    CountingParser.parsed = 0
+    csv_file = write_tips(tmp_path / "tips.csv")
+    cache = QuanticCsvCache(str(tmp_path / "cache"))
+    cache.load_rows(CountingParser, csv_file)
+
+    write_tips(tmp_path / "tips.csv", ROWS[:1])
+    rows = cache.load_rows(CountingParser, csv_file)
+    assert CountingParser.parsed == 2
+    assert [row["ref"] for row in rows] == ["11000"]
+
+
+def test_unreadable_sidecar_is_ignored(tmp_path, capsys):
+    csv_file = write_tips(tmp_path / "tips.csv")
+    cache = QuanticCsvCache(str(tmp_path / "cache"))
+    cache.load_rows(QuanticTipCsvParser, csv_file)
+    (sidecar,) = sidecars(cache.cache_dir)
+    (tmp_path / "cache" / sidecar).write_bytes(b"not a pickle")
+
+    rows = cache.load_rows(QuanticTipCsvParser, csv_file)
+    assert len(rows) == 2
+    assert "Warning: ignoring unreadable cache file" in capsys.readouterr().out
+
+
+def test_empty_results_are_not_cached(tmp_path):
+    cache = QuanticCsvCache(str(tmp_path / "cache"))
+    csv_file = str(tmp_path / "empty.csv")
+    open(csv_file, "w").close()
+    assert cache.load_rows(QuanticTipCsvParser, csv_file) == []
+    assert not os.path.exists(cache.cache_dir) or sidecars(cache.cache_dir) == []
+
+
+def test_evict_removes_the_least_recently_used(tmp_path):
+    cache = QuanticCsvCache(str(tmp_path / "cache"))
+    files = [write_tips(tmp_path / f"tips_{i}.csv", ROWS[:i + 1]) for i in range(2)]
+    for csv_file in files:
+        cache.load_rows(QuanticTipCsvParser, csv_file)
+    names = sidecars(cache.cache_dir)
+    # make the first file's sidecar the oldest
+    oldest = cache._sidecar_path(cache._file_key(QuanticTipCsvParser, files[0]))
+    os.utime(oldest, ns=(0, 0))
+
+    cache.max_bytes = max(os.path.getsize(os.path.join(cache.cache_dir, name)) for name in names)
+    cache.evict()
+    assert sidecars(cache.cache_dir) == [os.path.basename(cache._sidecar_path(cache._file_key(QuanticTipCsvParser, files[1])))]
+
+
+def test_clear(tmp_path):
+    cache = QuanticCsvCache(str(tmp_path / "cache"))
+    cache.load_rows(QuanticTipCsvParser, write_tips(tmp_path / "tips.csv"))
+    cache.clear()
+    assert sidecars(cache.cache_dir) == []
+    # clearing a cache that was never written is fine
+    QuanticCsvCache(str(tmp_path / "none")).clear()
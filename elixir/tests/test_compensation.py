@@ -0,0 +1,63 @@
+# tests of the effective dated compensation table
+#   python -m pytest elixir/tests/test_compensation.py
+from datetime import date
+import numpy as np
+import pandas as pd
+from elixir.operations.compensation import CompensationTable
+
+
+def table() -> CompensationTable:
+    return CompensationTable.from_entries([
+        {"first_name": "Becca", "last_name": "Wilson", "effective_from": date(2025, 1, 1), "rate": 12.0, "tips_eligible": True},
+        {"first_name": "Becca", "last_name": "Wilson", "effective_from": date(2025, 4, 10), "rate": 14.0, "tips_eligible": True},
+        {"first_name": "Sam", "last_name": "Cole", "effective_from": date(2025, 1, 1), "rate": 20.0, "tips_eligible": False},
+    ])
+
+
+def test_rate_in_force_at_each_time():
+    rates, tips_eligible = table().lookup(
+        ["Becca", "Becca", "Becca", "Sam"],
+        ["Wilson", "Wilson", "Wilson", "Cole"],
+        np.array(["2025-04-09T23:59", "2025-04-10T00:00", "2025-05-01T12:00", "2025-04-10T00:00"], dtype="datetime64[us]"),
+    )
+    assert rates.tolist() == [12.0, 14.0, 14.0, 20.0]
+    assert tips_eligible.tolist() == [True, True, True, False]
+
+
+def test_results_keep_the_order_given():
+    times = np.array(["2025-05-01", "2025-02-01", "2025-04-20"], dtype="datetime64[us]")
+    rates, _ = table().lookup(["Becca"] * 3, ["Wilson"] * 3, times)
+    assert rates.tolist() == [14.0, 12.0, 14.0]
+
+
+def test_missing_employee_gets_no_rate_and_no_tips(capsys):
+    rates, tips_eligible = table().lookup(
+        ["Nobody", "Becca"], ["Here", "Wilson"], np.array(["2025-04-01", "2024-12-31"], dtype="datetime64[us]"))
+    assert rates.tolist() == [0.0, 0.0]
+    assert tips_eligible.tolist() == [False, False]
+    assert "Warning: no compensation in force for Becca Wilson, Nobody Here" in capsys.readouterr().out
+
+
+def test_tips_eligible_strings_are_read_the_same_everywhere(tmp_path):
+    values = ["true", "False", "no", "YES", "1", "0"]
+    expected = [True, False, False, True, True, False]
+    entries = pd.DataFrame({
+        "first_name": [f"e{i}" for i in range(len(values))],
+        "last_name": "",
+        "effective_from": "2025-01-01",
+        "rate": 10.0,
+        "tips_eligible": values,
+    })
+    assert CompensationTable(entries).entries.sort_values("first_name")["tips_eligible"].tolist() == expected
+
+    csv_file = tmp_path / "compensation.csv"
+    entries.to_csv(csv_file, index=False)
+    assert CompensationTable.from_csv(str(csv_file)).entries.sort_values("first_name")["tips_eligible"].tolist() == expected
+
+
+def test_names_are_stripped_and_blank_last_names_match():
+    compensation = CompensationTable(pd.DataFrame({
+        "first_name": [" Alyssa "], "last_name": [None], "effective_from": ["2025-01-01"], "rate": [9.5], "tips_eligible": [True],
+    }))
+    rates, _ = compensation.lookup(["Alyssa"], [None], np.array(["2025-03-01"], dtype="datetime64[us]"))
+    assert rates.tolist() == [9.5]
@@ -0,0 +1,127 @@
+# tests of the incremental daily tip rate aggregates
+# after every refresh the aggregates have to be the daily rates frame of a full run
+#   python -m pytest elixir/tests/test_daily_aggregates.py
+import csv
+import os
+import pandas as pd
+import pytest
+from elixir.reports.daily_aggregates import DailyAggregateStore
+from elixir.reports.summary_dataframes import get_summary_dataframes
+from elixir.tests.synthetic import TIME_HEADER, TIPS_HEADER
+
+
+def punch(first_name: str, clocked_in: str, clocked_out: str) -> list[str]:
+    return [first_name, "Wilson", "Admin", "", clocked_in, clocked_out, "Yes", "0.00", "0.00", "$0.00", "$0.00",
+            "Clocked Out"]
+
+
+def tip(ref: str, tip_time: str, amount: str) -> list[str]:
+    return [ref, tip_time, "POS Admin", "POS 1", "1234", "Bar", "CreditCard", amount]
+
+
+def write_csv(data_dir, kind: str, name: str, header: list[str], rows: list[list[str]], mtime: int = 1_700_000_000):
+    folder = data_dir / "buford" / kind
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / name
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(header)
+        writer.writerows(rows)
+    # a re-export always has a new modified time
+    os.utime(path, ns=(mtime * 10**9, mtime * 10**9))
+    return path
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data_dir = tmp_path / "data"
+    write_csv(data_dir, "time", "btime_1.csv", TIME_HEADER, [
+        punch("Becca", "04-08-25 05:00 PM", "04-08-25 08:00 PM"),
+        punch("Sam", "04-08-25 10:00 AM", "04-08-25 02:00 PM"),
+    ])
+    write_csv(data_dir, "time", "btime_2.csv", TIME_HEADER, [punch("Becca", "04-09-25 11:00 AM", "04-09-25 03:00 PM")])
+    write_csv(data_dir, "tips", "btip_1.csv", TIPS_HEADER, [
+        tip("11000", "04-08-25 07:00 PM", "$35.00"),
+        tip("11001", "04-08-25 12:00 PM", "$9.00"),
+    ])
+    write_csv(data_dir, "tips", "btip_2.csv", TIPS_HEADER, [tip("11002", "04-09-25 12:30 PM", "$8.00")])
+    return data_dir
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DailyAggregateStore(str(tmp_path / "daily_aggregates.pkl"))
+
+
+def assert_matches_a_full_run(store: DailyAggregateStore, data_dir):
+    _, _, daily_rates_df = get_summary_dataframes(data_dir=str(data_dir))
+    pd.testing.assert_frame_equal(store.daily_rates_df(), daily_rates_df, check_dtype=False)
+
+
+def test_first_refresh_reads_every_file(store, data_dir):
+    assert store.refresh(data_dir=str(data_dir)) == 4
+    assert_matches_a_full_run(store, data_dir)
+    assert store.refresh(data_dir=str(data_dir)) == 0
+
+
+def test_refresh_after_a_re_export(store, data_dir):
+    store.refresh(data_dir=str(data_dir))
+    write_csv(data_dir, "tips", "btip_1.csv", TIPS_HEADER, [
+        tip("11000", "04-08-25 07:00 PM", "$35.00"),
+        tip("11001", "04-08-25 12:00 PM", "$9.00"),
+        tip("11003", "04-08-25 07:15 PM", "$12.50"),
+    ], mtime=1_700_000_100)
+    assert store.refresh(data_dir=str(data_dir)) == 1
+    assert_matches_a_full_run(store, data_dir)
+
+
+def test_deleted_file_is_taken_back_out(store, data_dir):
+    store.refresh(data_dir=str(data_dir))
+    os.remove(data_dir / "buford" / "tips" / "btip_2.csv")
+    os.remove(data_dir / "buford" / "time" / "btime_2.csv")
+    assert store.refresh(data_dir=str(data_dir)) == 2
+    assert_matches_a_full_run(store, data_dir)
+    assert store.daily_rates_df()["date"].astype(str).unique().tolist() == ["2025-04-08"]
+
+
+def test_file_whose_group_keys_change(store, data_dir):
+    store.refresh(data_dir=str(data_dir))
+    # the re-export moved the shift to the next day and into the bravo team
+    write_csv(data_dir, "time", "btime_2.csv", TIME_HEADER, [punch("Becca", "04-10-25 07:00 PM", "04-10-25 11:00 PM")],
+              mtime=1_700_000_100)
+    write_csv(data_dir, "tips", "btip_2.csv", TIPS_HEADER, [tip("11002", "04-10-25 08:30 PM", "$8.00")],
+              mtime=1_700_000_100)
+    store.refresh(data_dir=str(data_dir))
+    assert_matches_a_full_run(store, data_dir)
+    keys = list(zip(store.daily_rates_df()["date"].astype(str), store.daily_rates_df()["shift_type"]))
+    assert ("2025-04-09", "a") not in keys and ("2025-04-10", "b") in keys
+    # no empty groups are left behind either
+    assert all(totals[1] or totals[3] for totals in store.totals.values())
+
+
+def test_cross_file_overlap_is_quarantined_and_released(store, data_dir):
+    store.refresh(data_dir=str(data_dir))
+    # a later file repeats a punch of the first one, it is quarantined like in a full run
+    write_csv(data_dir, "time", "btime_3.csv", TIME_HEADER, [punch("Becca", "04-08-25 06:00 PM", "04-08-25 09:00 PM")])
+    store.refresh(data_dir=str(data_dir))
+    assert_matches_a_full_run(store, data_dir)
+    # once the first file no longer has the punch the later one counts
+    write_csv(data_dir, "time", "btime_1.csv", TIME_HEADER, [punch("Sam", "04-08-25 10:00 AM", "04-08-25 02:00 PM")],
+              mtime=1_700_000_100)
+    store.refresh(data_dir=str(data_dir))
+    assert_matches_a_full_run(store, data_dir)
+
+
+def test_minutes_across_the_spring_forward_night(store, tmp_path):
+    data_dir = tmp_path / "dst"
+    write_csv(data_dir, "time", "btime_1.csv", TIME_HEADER, [punch("Becca", "03-08-25 11:00 PM", "03-09-25 05:00 AM")])
+    store.refresh(data_dir=str(data_dir))
+    assert store.daily_rates_df()["minutes_worked"].tolist() == [300.0]
+    assert_matches_a_full_run(store, data_dir)
+
+
+def test_aggregates_are_kept_between_runs(store, data_dir):
+    store.refresh(data_dir=str(data_dir))
+    reopened = DailyAggregateStore(store.path)
+    assert reopened.refresh(data_dir=str(data_dir)) == 0
+    assert_matches_a_full_run(reopened, data_dir)
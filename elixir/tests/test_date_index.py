@@ -0,0 +1,73 @@
+# tests of the sorted date index behind the shift and tip date lookups
+#   python -m pytest elixir/tests/test_date_index.py
+from datetime import date, datetime, timezone
+from elixir.operations.date_index import DateIndex, to_day
+from elixir.operations.work_team import eastern
+
+
+def at(day: int, hour: int, minute: int = 0) -> datetime:
+    return datetime(2025, 4, day, hour, minute, tzinfo=eastern)
+
+
+def records() -> list[dict]:
+    return [
+        {"name": "late", "start_date": at(9, 23, 30)},
+        {"name": "first", "start_date": at(8, 9)},
+        {"name": "tie a", "start_date": at(8, 18, 30)},
+        {"name": "tie b", "start_date": at(8, 18, 30)},
+        {"name": "next", "start_date": at(10, 1)},
+    ]
+
+
+def names(found: list[dict]) -> list[str]:
+    return [record["name"] for record in found]
+
+
+def test_records_are_sorted_and_ties_keep_their_order():
+    index = DateIndex(records(), "start_date")
+    assert names(index.records) == ["first", "tie a", "tie b", "late", "next"]
+
+
+def test_between_includes_both_ends():
+    index = DateIndex(records(), "start_date")
+    assert names(index.between(at(8, 18, 30), at(9, 23, 30))) == ["tie a", "tie b", "late"]
+    assert names(index.between(end=at(8, 9))) == ["first"]
+    assert names(index.between(start=at(10, 1))) == ["next"]
+    assert names(index.between()) == names(index.records)
+    assert index.between(at(11, 0), at(12, 0)) == []
+
+
+def test_between_takes_other_time_zones():
+    index = DateIndex(records(), "start_date")
+    # 03:30 utc on the 10th is 23:30 eastern on the 9th
+    assert names(index.between(datetime(2025, 4, 10, 3, 30, tzinfo=timezone.utc))) == ["late", "next"]
+
+
+def test_on_day_uses_the_local_date():
+    index = DateIndex(records(), "start_date")
+    assert names(index.on_day(date(2025, 4, 8))) == ["first", "tie a", "tie b"]
+    assert names(index.on_day(at(9, 12))) == ["late"]
+    assert index.on_day(date(2025, 4, 11)) == []
+    assert to_day(datetime(2025, 4, 10, 3, 30, tzinfo=timezone.utc)) == date(2025, 4, 9)
+
+
+def test_is_current_follows_the_list():
+    shifts = records()
+    index = DateIndex(shifts, "start_date")
+    assert index.is_current(shifts)
+    # a copy of the same length is another list
+    assert not index.is_current(list(shifts))
+    shifts.append({"name": "added", "start_date": at(12, 9)})
+    assert not index.is_current(shifts)
+
+
+def test_owner_rebuilds_when_the_list_is_replaced():
+    from elixir.operations.shift_parser import ElixirShiftParser
+
+    parser = ElixirShiftParser([], "buford", stream=True)
+    parser.parsed_shifts = records()
+    assert names(parser.get_shifts_by_date(date(2025, 4, 9))) == ["late"]
+    # same length, different shifts
+    parser.parsed_shifts = [dict(record, start_date=record["start_date"].replace(day=20)) for record in records()]
+    assert parser.get_shifts_by_date(date(2025, 4, 9)) == []
+    assert len(parser.get_shifts_by_date(date(2025, 4, 20))) == 5
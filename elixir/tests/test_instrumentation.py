@@ -0,0 +1,118 @@
+# tests of the opt in stage timing and memory
+#   python -m pytest elixir/tests/test_instrumentation.py
+import json
+import os
+import pstats
+import subprocess
+import sys
+import time
+import tracemalloc
+import pytest
+import elixir
+from elixir.instrumentation import Instrumentation, active, location_profile_path, measure
+
+# the folder elixir is in, a fresh interpreter started there can import it
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(elixir.__file__)))
+
+
+def records_by_stage(instrumentation: Instrumentation) -> dict:
+    return {(record["stage"], record["location"]): record for record in instrumentation.records()}
+
+
+def test_measure_does_nothing_without_an_instrumentation():
+    assert active() is None
+    with measure("parse", "buford", rows=5) as counter:
+        counter.rows += 10
+    with Instrumentation(memory=False) as instrumentation:
+        pass
+    assert instrumentation.records() == []
+
+
+def test_stages_add_up_per_stage_and_location():
+    with Instrumentation(memory=False) as instrumentation:
+        assert active() is instrumentation
+        with measure("load", "buford"):
+            for _ in range(3):
+                with measure("parse", rows=10) as counter:
+                    counter.rows += 5
+                    time.sleep(0.01)
+        with measure("parse", "monroe", rows=2):
+            pass
+    assert active() is None
+
+    records = records_by_stage(instrumentation)
+    # the nested stage takes the location of the stage it is in
+    parse = records[("parse", "buford")]
+    assert parse["calls"] == 3
+    assert parse["rows"] == 45
+    assert parse["seconds"] >= 0.03
+    assert parse["rows_per_second"] == pytest.approx(45 / parse["seconds"])
+    assert parse["peak_mb"] is None
+    # the outer stage includes the time of the stages inside it
+    assert records[("load", "buford")]["seconds"] >= parse["seconds"]
+    assert records[("parse", "monroe")]["calls"] == 1
+    assert instrumentation.seconds >= records[("load", "buford")]["seconds"]
+
+
+def test_memory_peak_of_each_stage():
+    was_tracing = tracemalloc.is_tracing()
+    with Instrumentation() as instrumentation:
+        with measure("outer"):
+            with measure("inner"):
+                block = bytearray(4 * 2 ** 20)
+                del block
+    records = records_by_stage(instrumentation)
+    assert records[("inner", None)]["peak_mb"] >= 4
+    # the outer stage saw the peak of the stage inside it
+    assert records[("outer", None)]["peak_mb"] >= records[("inner", None)]["peak_mb"]
+    # tracing is only stopped when the instrumentation started it
+    assert tracemalloc.is_tracing() == was_tracing
+
+
+def test_only_one_instrumentation_per_process():
+    with Instrumentation(memory=False):
+        with pytest.raises(Exception, match="already running"):
+            Instrumentation(memory=False).start()
+
+
+def test_merged_records_from_another_process():
+    with Instrumentation(memory=False) as shard:
+        with measure("parse", "buford", rows=7):
+            pass
+    with Instrumentation(memory=False) as instrumentation:
+        with measure("parse", "buford", rows=3):
+            pass
+    instrumentation.merge(shard.records())
+    parse = records_by_stage(instrumentation)[("parse", "buford")]
+    assert (parse["calls"], parse["rows"]) == (2, 10)
+
+
+def test_report_and_profile_files(tmp_path):
+    profile_path = str(tmp_path / "profiles" / "run.prof")
+    with Instrumentation(memory=False, profile_path=profile_path) as instrumentation:
+        with measure("parse", "buford", rows=4):
+            sorted(range(1000))
+    report_path = str(tmp_path / "reports" / "run.json")
+    instrumentation.write_report(report_path)
+
+    with open(report_path) as f:
+        report = json.load(f)
+    assert report["memory"] is False
+    assert report["profile"] == profile_path
+    assert report["seconds"] == instrumentation.seconds
+    assert [(stage["stage"], stage["location"], stage["rows"]) for stage in report["stages"]] == [("parse", "buford", 4)]
+    assert pstats.Stats(profile_path).total_calls > 0
+
+
+def test_location_profile_path():
+    assert location_profile_path(None, "buford") is None
+    assert location_profile_path("out/run.prof", "buford") == "out/run_buford.prof"
+    assert location_profile_path("out/run", "buford") == "out/run_buford.prof"
+
+
+def test_profiling_modules_are_not_imported_until_used():
+    code = ("import sys, elixir.instrumentation; "
+            "print([m for m in ('cProfile', 'pstats', 'tracemalloc', 'json') if m in sys.modules])")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=ROOT).stdout
+    assert output.strip() == "[]"
@@ -0,0 +1,94 @@
+# tests of loading a location serially and in a process pool
+# the pool parses each csv file in its own process and re-checks the punches for overlaps
+# between the files afterwards, the result has to be the same as the serial run
+#   python -m pytest elixir/tests/test_location.py
+import os
+import shutil
+from datetime import timedelta
+import pytest
+from elixir.operations import ElixirOperations, load_locations
+from elixir.operations.shift_validation import ISSUE_OVERLAPPING_SHIFT, ISSUE_SHIFT_TOO_LONG
+from elixir.tests.synthetic import START_DAY, write_location
+
+ROWS = 200
+
+
+def synthetic_files(scratch_dir: str, location: str, seed: int, weeks_later: int = 0) -> tuple[str, str]:
+    time_path, tips_path, _ = write_location(scratch_dir, location, ROWS, seed=seed,
+                                             start_day=START_DAY + timedelta(weeks=weeks_later))
+    return time_path, tips_path
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """A location with three time and two tips files. The third time file repeats punches
+        of the first, so they overlap across files, and has one shift that is too long"""
+    data_dir = tmp_path / "data"
+    time_dir = data_dir / "buford" / "time"
+    tips_dir = data_dir / "buford" / "tips"
+    time_dir.mkdir(parents=True)
+    tips_dir.mkdir(parents=True)
+
+    first_time, first_tips = synthetic_files(str(tmp_path / "first"), "buford", seed=0)
+    second_time, second_tips = synthetic_files(str(tmp_path / "second"), "buford", seed=1, weeks_later=3)
+    shutil.copy(first_time, time_dir / "btime_1.csv")
+    shutil.copy(second_time, time_dir / "btime_2.csv")
+    shutil.copy(first_tips, tips_dir / "btip_1.csv")
+    shutil.copy(second_tips, tips_dir / "btip_2.csv")
+
+    with open(first_time) as f:
+        lines = f.readlines()
+    with open(time_dir / "btime_3.csv", "w") as f:
+        f.writelines(lines[:25])
+        f.write('"Keri","Wilson","Admin","Monday","04-21-25 06:00 AM","04-22-25 06:00 AM","Yes","0.00","24.00",'
+                '"$0.00","$0.00","Clocked Out"\n')
+    return str(data_dir)
+
+
+def issue_keys(ops: ElixirOperations) -> list[tuple]:
+    return sorted((os.path.basename(issue["csv_file"]), issue["row_index"], issue["issue"], issue["message"])
+                  for issue in ops.validation.issues)
+
+
+def quarantined_keys(ops: ElixirOperations) -> list[tuple]:
+    return sorted((row["first_name"], row["last_name"], row["clocked_in"], row["clocked_out"])
+                  for row in ops.validation.quarantined)
+
+
+def test_pool_loads_the_same_as_a_serial_run(data_dir):
+    serial = ElixirOperations("buford", data_dir=data_dir)
+    pooled = ElixirOperations("buford", data_dir=data_dir, workers=3)
+    assert pooled._use_pool(pooled.get_csv_paths("time")) and pooled._use_pool(pooled.get_csv_paths("tips"))
+
+    assert len(serial.shifts) > ROWS
+    assert pooled.shifts == serial.shifts
+    assert pooled.tips == serial.tips
+    assert pooled.validation.checked_rows == serial.validation.checked_rows
+    assert issue_keys(pooled) == issue_keys(serial)
+    assert quarantined_keys(pooled) == quarantined_keys(serial)
+
+
+def test_cross_file_overlaps_are_quarantined_in_both_modes(data_dir):
+    for workers in (None, 3):
+        ops = ElixirOperations("buford", data_dir=data_dir, workers=workers)
+        issues = [(os.path.basename(issue["csv_file"]), issue["issue"]) for issue in ops.validation.issues]
+        # every punch the third file repeats overlaps the first file, the 24 rows copied are
+        # the 10 days of 2 employees with their total rows and 2 days of the next one
+        overlaps = issues.count(("btime_3.csv", ISSUE_OVERLAPPING_SHIFT))
+        assert overlaps == 22, workers
+        assert issues.count(("btime_3.csv", ISSUE_SHIFT_TOO_LONG)) == 1
+        assert len(ops.validation.quarantined) == overlaps + 1
+        # the first file keeps its punches
+        assert not any(csv_file == "btime_1.csv" for csv_file, _ in issues)
+
+
+def test_sharded_locations_load_the_same_as_serial(tmp_path):
+    data_dir = str(tmp_path / "data")
+    for i, location in enumerate(["buford", "monroe"]):
+        write_location(data_dir, location, ROWS, seed=i)
+    serial = load_locations(data_dir=data_dir)
+    sharded = load_locations(data_dir=data_dir, shards=2)
+    assert list(sharded) == list(serial) == ["buford", "monroe"]
+    for location in serial:
+        assert sharded[location].shifts == serial[location].shifts
+        assert sharded[location].tips == serial[location].tips
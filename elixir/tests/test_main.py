@@ -0,0 +1,42 @@
+# tests of the command line options of main.py
+#   python -m pytest elixir/tests/test_main.py
+from datetime import date
+import pytest
+from main import build_parser, main
+
+
+def test_periods_are_parsed_to_dates():
+    args = build_parser().parse_args(["--periods", "2025-04-01", "2025-04-15", "2025-05-01"])
+    assert args.periods == [date(2025, 4, 1), date(2025, 4, 15), date(2025, 5, 1)]
+
+
+@pytest.mark.parametrize("periods", [["2025-04-01", "2025-13-01"], ["04/01/2025", "2025-04-15"], ["2025-04-01", "soon"]])
+def test_bad_period_dates_are_usage_errors(periods, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        build_parser().parse_args(["--periods", *periods])
+    assert exit_info.value.code == 2
+    assert "argument --periods: expected a YYYY-MM-DD date" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("periods", [["2025-04-01"], ["2025-04-01", "2025-04-01"]])
+def test_periods_need_a_start_and_an_end(periods, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(["--periods", *periods])
+    assert exit_info.value.code == 2
+    assert "--periods needs at least a start and an end date" in capsys.readouterr().err
+
+
+def test_sheet_formats():
+    args = build_parser().parse_args(["--format", "shifts=parquet", "--format", "tips=csv"])
+    assert dict(args.sheet_formats) == {"shifts": "parquet", "tips": "csv"}
+
+
+@pytest.mark.parametrize("value, message", [
+    ("shifts", "expected SHEET=FORMAT"),
+    ("rota=csv", "unknown sheet 'rota'"),
+    ("shifts=json", "unknown format 'json'"),
+])
+def test_bad_sheet_formats_are_usage_errors(value, message, capsys):
+    with pytest.raises(SystemExit):
+        build_parser().parse_args(["--format", value])
+    assert message in capsys.readouterr().err
@@ -0,0 +1,75 @@
+# tests of the weekly overtime split
+#   python -m pytest elixir/tests/test_overtime.py
+import numpy as np
+import pytest
+from elixir.operations.overtime import OvertimeRule, employee_codes, split_overtime, week_starts
+
+
+def times(*values: str) -> np.ndarray:
+    return np.array(values, dtype="datetime64[us]")
+
+
+def reference_regular(codes, starts, hours, rule: OvertimeRule) -> list[float]:
+    """Regular hours of every segment worked out one segment at a time."""
+    weeks = week_starts(starts, rule.week_start)
+    totals: dict = {}
+    regular = [0.0] * len(hours)
+    for i in sorted(range(len(hours)), key=lambda i: (codes[i], weeks[i], starts[i])):
+        before = totals.get((codes[i], weeks[i]), 0.0)
+        regular[i] = min(max(rule.weekly_hours - before, 0.0), hours[i])
+        totals[(codes[i], weeks[i])] = before + hours[i]
+    return regular
+
+
+def test_week_starts_on_the_rule_weekday():
+    # 2025-04-09 is a wednesday
+    assert week_starts(np.array(["2025-04-09"], dtype="datetime64[D]"))[0] == np.datetime64("2025-04-07")
+    assert week_starts(np.array(["2025-04-09"], dtype="datetime64[D]"), week_start=6)[0] == np.datetime64("2025-04-06")
+    assert week_starts(np.array(["2025-04-07"], dtype="datetime64[D]"))[0] == np.datetime64("2025-04-07")
+
+
+def test_fortieth_hour_inside_a_segment():
+    starts = times(*[f"2025-04-{day:02d}T09:00" for day in range(7, 12)])
+    split = split_overtime(np.zeros(5), starts, [9.0] * 5)
+    assert split.regular_hours.tolist() == [9.0, 9.0, 9.0, 9.0, 4.0]
+    assert split.overtime_hours.tolist() == [0.0, 0.0, 0.0, 0.0, 5.0]
+
+
+def test_segments_are_counted_in_clock_in_order():
+    # given out of order, the last segment of the week is the one past 40 hours
+    starts = times("2025-04-11T09:00", "2025-04-07T09:00", "2025-04-08T09:00")
+    split = split_overtime(np.zeros(3), starts, [10.0, 20.0, 15.0])
+    assert split.regular_hours.tolist() == [5.0, 20.0, 15.0]
+
+
+def test_each_employee_and_week_has_its_own_total():
+    starts = times("2025-04-07T09:00", "2025-04-07T09:00", "2025-04-14T09:00")
+    split = split_overtime([0, 1, 0], starts, [45.0, 30.0, 41.0])
+    assert split.overtime_hours.tolist() == [5.0, 0.0, 1.0]
+    assert split.week_start.tolist() == np.array(["2025-04-07", "2025-04-07", "2025-04-14"], dtype="datetime64[D]").tolist()
+
+
+def test_custom_rule():
+    rule = OvertimeRule(weekly_hours=8.0, week_start=6)
+    # saturday and sunday are in different weeks when the week starts on sunday
+    starts = times("2025-04-12T09:00", "2025-04-13T09:00")
+    split = split_overtime([0, 0], starts, [10.0, 10.0], rule)
+    assert split.regular_hours.tolist() == [8.0, 8.0]
+
+
+def test_randomized_against_a_running_total():
+    rng = np.random.default_rng(19)
+    n = 2_000
+    codes = rng.integers(0, 12, n)
+    starts = np.datetime64("2025-01-01T00:00", "us") + rng.integers(0, 60 * 24 * 90, n).astype("timedelta64[m]")
+    hours = rng.uniform(0.0, 12.0, n).round(2)
+    rule = OvertimeRule(week_start=2)
+    split = split_overtime(codes, starts, hours, rule)
+    assert split.regular_hours == pytest.approx(reference_regular(codes, starts, hours, rule))
+    assert split.regular_hours + split.overtime_hours == pytest.approx(hours)
+
+
+def test_employee_codes():
+    codes = employee_codes(["Becca", "Sam", "Becca", "Becca"], ["Wilson", "Cole", "Wilson", "Young"])
+    assert codes[0] == codes[2]
+    assert len({codes[0], codes[1], codes[3]}) == 3
@@ -0,0 +1,35 @@
+# tests of the pay periods
+#   python -m pytest elixir/tests/test_pay_periods.py
+from datetime import date
+import numpy as np
+import pandas as pd
+import pytest
+from elixir.operations.pay_periods import PayPeriods
+
+
+def test_boundaries_make_back_to_back_periods():
+    periods = PayPeriods(["2025-04-15", date(2025, 4, 1), "2025-05-01", "2025-04-15"])
+    assert len(periods) == 2
+    assert periods.starts.tolist() == [date(2025, 4, 1), date(2025, 4, 15)]
+    assert periods.ends.tolist() == [date(2025, 4, 14), date(2025, 4, 30)]
+
+
+def test_needs_two_boundaries():
+    with pytest.raises(Exception, match="at least a start and an end"):
+        PayPeriods(["2025-04-01", "2025-04-01"])
+
+
+def test_tag_days():
+    periods = PayPeriods(["2025-04-01", "2025-04-15", "2025-05-01"])
+    days = np.array(["2025-03-31", "2025-04-01", "2025-04-14", "2025-04-15", "2025-04-30", "2025-05-01"],
+                    dtype="datetime64[D]")
+    assert periods.tag(days).tolist() == [-1, 0, 0, 1, 1, -1]
+
+
+def test_tag_frame():
+    periods = PayPeriods(["2025-04-01", "2025-04-15"])
+    df = pd.DataFrame({"date": [date(2025, 4, 3), date(2025, 4, 20)]})
+    tagged = periods.tag_frame(df)
+    assert tagged is df
+    assert df["period_start"].tolist() == [date(2025, 4, 1), None]
+    assert df["period_end"].tolist() == [date(2025, 4, 14), None]
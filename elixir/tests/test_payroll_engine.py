@@ -0,0 +1,118 @@
+# tests of the array payroll math
+#   python -m pytest elixir/tests/test_payroll_engine.py
+from datetime import date, datetime
+import numpy as np
+import pytest
+from elixir.operations.compensation import CompensationTable
+from elixir.operations.payroll_engine import daily_rates, encode_group_keys, lookup_by_code, shift_tips
+from elixir.operations.payroll_utils import build_payroll_calculations
+from elixir.operations.shift_parser import ElixirShift
+from elixir.operations.tip_parser import ElixirTip
+from elixir.operations.work_team import eastern
+from elixir.pipeline import PayrollRun
+from elixir.reports.summary_dataframes import build_summary_dataframes
+
+
+def days(*values: str) -> np.ndarray:
+    return np.array(values, dtype="datetime64[D]")
+
+
+def at(day: int, hour: int) -> datetime:
+    return datetime(2025, 4, day, hour, tzinfo=eastern)
+
+
+def shift(first_name: str, start: datetime, end: datetime, shift_type: str = "a") -> ElixirShift:
+    return ElixirShift(first_name, "Wilson", start, end, "complete", shift_type, "buford")
+
+
+def compensation(*entries: tuple[str, float, bool]) -> CompensationTable:
+    return CompensationTable.from_entries([
+        {"first_name": first_name, "last_name": "Wilson", "effective_from": date(2025, 1, 1), "rate": rate,
+         "tips_eligible": tips_eligible}
+        for first_name, rate, tips_eligible in entries
+    ])
+
+
+def test_group_codes_are_shared_and_sorted():
+    shift_keys = (days("2025-04-09", "2025-04-08", "2025-04-08"), ["buford", "monroe", "buford"], ["b", "a", "a"])
+    tip_keys = (days("2025-04-08", "2025-04-10"), ["buford", "buford"], ["a", "b"])
+    keys, (shift_codes, tip_codes) = encode_group_keys(shift_keys, tip_keys)
+
+    assert keys.dates.tolist() == [date(2025, 4, 8), date(2025, 4, 9), date(2025, 4, 10)]
+    assert keys.locations.tolist() == ["buford", "monroe"]
+    assert keys.shift_types.tolist() == ["a", "b"]
+    assert keys.size == 12
+    # the same key gets the same code in both triples, and codes sort like the keys
+    assert tip_codes[0] == shift_codes[2]
+    assert shift_codes[2] < shift_codes[1] < shift_codes[0] < tip_codes[1]
+    decoded_days, locations, shift_types = keys.decode(shift_codes)
+    assert decoded_days.tolist() == [date(2025, 4, 9), date(2025, 4, 8), date(2025, 4, 8)]
+    assert locations.tolist() == ["buford", "monroe", "buford"]
+    assert shift_types.tolist() == ["b", "a", "a"]
+
+
+def test_daily_rates():
+    rates = daily_rates([0, 0, 2, 3], [90.0, 30.0, 60.0, 0.0], [0, 2, 2, 5], [10.0, 3.0, 4.0, 99.0], size=6)
+    assert rates.codes.tolist() == [0, 2, 3]
+    assert rates.minutes_worked.tolist() == [120.0, 60.0, 0.0]
+    assert rates.tip_amount[:2].tolist() == [10.0, 7.0]
+    assert rates.hourly_tip_rate[:2].tolist() == [5.0, 7.0]
+    # a group with shifts but no tips keeps a nan tip, tips of a group without shifts are dropped
+    assert np.isnan(rates.tip_amount[2])
+    assert rates.hourly_tip_rate[2] == 0.0
+
+
+def test_group_without_tips_has_a_nan_rate():
+    rates = daily_rates([0, 1], [60.0, 120.0], [1], [12.0], size=2)
+    assert np.isnan(rates.hourly_tip_rate[0])
+    assert rates.hourly_tip_rate[1] == 6.0
+    assert np.isnan(lookup_by_code(rates.codes, rates.hourly_tip_rate, [0, 1], size=2)[0])
+
+
+def test_shift_tips_count_a_nan_rate_as_no_tips():
+    tips = shift_tips([4.0, 3.0, 2.0], [np.nan, 10 / 3, 5.0], [True, True, False])
+    assert tips.tolist() == pytest.approx([0.0, 10.0, 0.0])
+
+
+def test_payroll_summary_keeps_the_wages_of_days_without_tips():
+    shifts = [shift("Becca", at(8, 10), at(8, 14)), shift("Becca", at(9, 10), at(9, 13)),
+              shift("Sam", at(9, 11), at(9, 13))]
+    tips = [ElixirTip(at(9, 12), 10.0, "a", "buford", "11000")]
+    shifts_df, _, daily_rates_df = build_summary_dataframes(shifts, tips)
+
+    detail, summary = build_payroll_calculations(
+        shifts_df, daily_rates_df, compensation(("Becca", 12.0, True), ("Sam", 15.0, False)))
+    assert not detail[["shift_tip", "total_comp"]].isna().any().any()
+    summary = summary.set_index("first_name")
+    assert summary.loc["Becca", "total_hours"] == pytest.approx(7.0)
+    assert summary.loc["Becca", "total_wages"] == pytest.approx(84.0)
+    # the tips of the 9th are pooled over the 5 hours worked, Sam isn't tip eligible
+    assert summary.loc["Becca", "total_tips"] == pytest.approx(6.0)
+    assert summary.loc["Becca", "total_comp"] == pytest.approx(90.0)
+    assert summary.loc["Sam", "total_tips"] == 0
+    assert summary.loc["Sam", "total_comp"] == pytest.approx(30.0)
+
+
+def test_payroll_summary_of_the_no_tip_day():
+    shifts = [shift("Becca", at(8, 10), at(8, 14)), shift("Becca", at(9, 10), at(9, 13))]
+    tips = [ElixirTip(at(9, 12), 10.0, "a", "buford", "11000")]
+    shifts_df, _, daily_rates_df = build_summary_dataframes(shifts, tips)
+
+    _, summary = build_payroll_calculations(shifts_df, daily_rates_df, compensation(("Becca", 12.0, True)))
+    assert summary["total_tips"].tolist() == pytest.approx([10.0])
+    assert summary["total_comp"].tolist() == pytest.approx([94.0])
+
+
+def test_tips_are_allocated_on_epoch_time_through_the_fall_back_hour():
+    # 2025-11-02 the clock goes from 1:59 EDT back to 1:00 EST. Becca leaves at the first 1:30
+    # and Sam comes in at the second 1:00, on the wall clock they overlap and would split both tips
+    def fall_back(hour: int, minute: int, fold: int = 0) -> datetime:
+        return datetime(2025, 11, 2, hour, minute, fold=fold, tzinfo=eastern)
+
+    run = PayrollRun(locations=("buford",), compensation=compensation(("Becca", 12.0, True), ("Sam", 12.0, True)),
+                     allocate=True)
+    run.shifts = [shift("Becca", fall_back(0, 30), fall_back(1, 30)), shift("Sam", fall_back(1, 0, fold=1), fall_back(3, 0))]
+    run.tips = [ElixirTip(fall_back(1, 15), 10.0, "a", "buford", "11000"),
+                ElixirTip(fall_back(1, 15, fold=1), 4.0, "a", "buford", "11001")]
+    summary = run.payroll_summary_df.set_index("first_name")
+    assert summary["total_allocated_tips"].to_dict() == {"Becca": 10.0, "Sam": 4.0}
@@ -0,0 +1,71 @@
+# tests of the quantic csv parsers
+#   python -m pytest elixir/tests/test_quantic.py
+from datetime import datetime
+import pytest
+from elixir.quantic import BaseCsvParser, QuanticParseError, QuanticTipCsvParser, QunanticShiftCsvParser
+from elixir.operations.work_team import eastern
+
+TIME_CSV = (
+    '"FIRST NAME ↑","LAST NAME","ROLE","DAY","CLOCKED IN","CLOCKED OUT","C.IN / C.OUT","HOURLY RATE","HOURS","TIP","DECLARED TIP","STATUS"\n'
+    '"Becca","Wilson","Admin","Saturday","04-12-25 05:56 PM","04-12-25 11:42 PM","Yes","0.00","5.76","$1.50","$0.00","Clocked Out"\n'
+    '"Becca","Wilson","Admin","Sunday","04-13-25 03:56 PM","04-13-25 09:23 PM","Yes","0.00","5.46","$2.00","$0.00","Clocked Out"\n'
+    '"Total","","","","","","","","11.22","$3.50","",""\n'
+)
+
+
+def write(tmp_path, text: str) -> str:
+    path = tmp_path / "export.csv"
+    path.write_text(text)
+    return str(path)
+
+
+def test_headers(tmp_path):
+    parser = QunanticShiftCsvParser(write(tmp_path, TIME_CSV))
+    assert parser.data[0]["first_name"] == "Becca"
+    assert parser.data[0]["declared_tip"] == "$0.00"
+    # total rows keep their empty cells
+    assert parser.data[-1]["clocked_in"] == ""
+
+
+def test_datetimes_are_aware_eastern(tmp_path):
+    parser = QunanticShiftCsvParser(write(tmp_path, TIME_CSV))
+    assert parser.data[0]["clocked_in"] == datetime(2025, 4, 12, 17, 56, tzinfo=eastern)
+    assert parser.data[0]["clocked_in"].utcoffset().total_seconds() == -4 * 3600
+
+
+def test_employee_totals(tmp_path):
+    parser = QunanticShiftCsvParser(write(tmp_path, TIME_CSV))
+    assert parser.calculate_total_hours("Becca", "Wilson") == pytest.approx(11.22)
+    assert parser.calculate_total_tips("Becca", "Wilson") == pytest.approx(3.5)
+    assert parser.get_all_employees() == [("Becca", "Wilson")]
+
+
+def test_all_employee_totals_in_one_pass(tmp_path):
+    parser = QunanticShiftCsvParser(write(tmp_path, TIME_CSV))
+    assert parser.calculate_all_total_hours() == {("Becca", "Wilson"): pytest.approx(11.22), ("Total", ""): pytest.approx(11.22)}
+    assert parser.calculate_all_total_tips() == {("Becca", "Wilson"): 3.5, ("Total", ""): 3.5}
+
+
+def test_stream_mode_reads_the_same_rows(tmp_path):
+    csv_file = write(tmp_path, TIME_CSV)
+    parser = QunanticShiftCsvParser(csv_file, stream=True)
+    assert parser.data == []
+    assert list(parser.iter_rows()) == QunanticShiftCsvParser(csv_file).data
+
+
+def test_missing_file_gives_no_rows_in_both_modes(tmp_path, capsys):
+    missing = str(tmp_path / "missing.csv")
+    assert QuanticTipCsvParser(missing).data == []
+    assert list(QuanticTipCsvParser(missing, stream=True).iter_rows()) == []
+    assert capsys.readouterr().out.count(f"Error: File not found: {missing}") == 2
+
+
+def test_bad_datetime_raises_the_parse_error(tmp_path):
+    parser = QunanticShiftCsvParser(write(tmp_path, TIME_CSV), stream=True)
+    with pytest.raises(QuanticParseError):
+        parser._parse_datetime_column(["2025-04-12 17:56"])
+
+
+def test_base_parser_is_abstract():
+    with pytest.raises(TypeError):
+        BaseCsvParser("export.csv")
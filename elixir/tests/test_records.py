@@ -0,0 +1,70 @@
+# tests of the __slots__ shift and tip records
+#   python -m pytest elixir/tests/test_records.py
+from datetime import datetime
+import pickle
+import pytest
+from elixir.operations.records import intern_string, records_frame
+from elixir.operations.shift_parser import ElixirShift
+from elixir.operations.tip_parser import ElixirTip
+from elixir.operations.work_team import eastern
+
+START = datetime(2025, 4, 8, 17, 0, tzinfo=eastern)
+END = datetime(2025, 4, 8, 18, 30, tzinfo=eastern)
+
+
+def shift(**changes) -> ElixirShift:
+    fields = {"first_name": "Becca", "last_name": "Wilson", "start_date": START, "end_date": END,
+              "shift_status": "complete", "shift_type": "a", "location": "buford"}
+    fields.update(changes)
+    return ElixirShift(*fields.values())
+
+
+def test_reads_like_a_dict():
+    record = shift()
+    assert record["start_date"] == START
+    assert record.get("location") == "buford"
+    assert record.get("missing", "default") == "default"
+    assert "shift_type" in record and "missing" not in record
+    assert list(record) == list(ElixirShift.__slots__)
+    assert len(record) == 7
+    with pytest.raises(KeyError):
+        record["missing"]
+
+
+def test_equal_to_the_dict_it_replaced():
+    record = shift()
+    as_dict = dict(record)
+    assert record == as_dict
+    assert {**record} == as_dict
+    assert record != dict(as_dict, shift_type="b")
+
+
+def test_pickles_as_its_fields():
+    record = ElixirTip(START, 12.5, "a", "buford", "1001")
+    copy = pickle.loads(pickle.dumps(record))
+    assert type(copy) is ElixirTip
+    assert copy == record
+
+
+def test_no_instance_dict():
+    with pytest.raises(AttributeError):
+        shift().__dict__
+
+
+def test_intern_string():
+    first = intern_string("".join(["buf", "ord"]))
+    assert first is intern_string("".join(["bu", "ford"]))
+    assert intern_string(None) is None
+
+
+def test_records_frame_columns_in_slot_order():
+    frame = records_frame([shift(), shift(shift_type="b", start_date=END)], ElixirShift)
+    assert list(frame.columns) == list(ElixirShift.__slots__)
+    assert frame["shift_type"].tolist() == ["a", "b"]
+    assert frame["start_date"].tolist() == [START, END]
+
+
+def test_records_frame_of_dicts_and_empty_lists():
+    frame = records_frame([dict(shift())], ElixirShift)
+    assert frame["first_name"].tolist() == ["Becca"]
+    assert records_frame([], ElixirShift).empty
@@ -0,0 +1,134 @@
+# tests of the one pass shift validation and quarantine
+#   python -m pytest elixir/tests/test_shift_validation.py
+from datetime import datetime
+import pytest
+from elixir.operations.shift_parser import SHIFT_LENGTH_MAX, ElixirShiftLengthError, ElixirShiftParser
+from elixir.operations.shift_validation import (ISSUE_MISSING_PUNCH, ISSUE_OPEN_SHIFT, ISSUE_OVERLAPPING_SHIFT,
+                                                ISSUE_SHIFT_TOO_LONG, SEVERITY_ERROR, SEVERITY_WARNING, ShiftValidator)
+from elixir.operations.work_team import eastern
+
+
+def at(day: int, hour: int, minute: int = 0, month: int = 4, fold: int = 0) -> datetime:
+    return datetime(2025, month, day, hour, minute, tzinfo=eastern, fold=fold)
+
+
+def row(first_name: str = "Becca", status: str = "Clocked Out", clocked_in: datetime | None = None,
+        clocked_out: datetime | None = None) -> dict:
+    return {"first_name": first_name, "last_name": "Wilson", "status": status, "clocked_in": clocked_in,
+            "clocked_out": clocked_out}
+
+
+def validate(*punches: tuple, max_hours: float = SHIFT_LENGTH_MAX, validator: ShiftValidator | None = None):
+    """Validates (row, clocked_in, clocked_out) punches as one batch, returns the validator and
+        the row indexes that passed"""
+    validator = validator or ShiftValidator("buford", max_hours)
+    batch = [(row_index, shift, clocked_in, clocked_out) for row_index, (shift, clocked_in, clocked_out) in enumerate(punches)]
+    passed = validator.validate(batch, "btime.csv")
+    return validator, [item[0] for item in passed]
+
+
+def issues(validator: ShiftValidator) -> list[tuple[str, str, int]]:
+    return [(issue["issue"], issue["severity"], issue["row_index"]) for issue in validator.report.issues]
+
+
+def test_good_shifts_pass_without_issues():
+    validator, passed = validate((row(), at(8, 17), at(8, 22)), (row("Sam"), at(8, 10), at(8, 14)))
+    assert passed == [0, 1]
+    assert validator.report.issues == []
+    assert validator.report.summary() == "checked 2 shifts, quarantined 0"
+
+
+def test_missing_punch_is_quarantined():
+    validator, passed = validate((row(), None, at(8, 22)), (row("Sam"), at(8, 10), None), (row("Keri"), at(8, 10), at(8, 12)))
+    assert passed == [2]
+    assert issues(validator) == [(ISSUE_MISSING_PUNCH, SEVERITY_ERROR, 0), (ISSUE_MISSING_PUNCH, SEVERITY_ERROR, 1)]
+    assert "has a shift with no clocked in time" in validator.report.issues[0]["message"]
+    assert validator.report.issues[0]["csv_file"] == "btime.csv"
+    assert len(validator.report.quarantined) == 2
+
+
+def test_open_shift_is_an_error_without_a_clock_out_and_a_warning_with_one():
+    validator, passed = validate((row(status="Clocked In"), at(8, 17), None),
+                                 (row("Sam", status="Clocked In"), at(8, 10), at(8, 14)))
+    assert passed == [1]
+    assert issues(validator) == [(ISSUE_OPEN_SHIFT, SEVERITY_ERROR, 0), (ISSUE_OPEN_SHIFT, SEVERITY_WARNING, 1)]
+    assert validator.report.has_errors()
+    assert len(validator.report.get_warnings()) == 1
+
+
+def test_too_long_shift_is_quarantined():
+    validator, passed = validate((row(), at(8, 6), at(9, 0)), (row("Sam"), at(8, 6), at(8, 23)), max_hours=17)
+    assert passed == [1]
+    assert issues(validator) == [(ISSUE_SHIFT_TOO_LONG, SEVERITY_ERROR, 0)]
+    assert "total shift length of 18.0 hours" in validator.report.issues[0]["message"]
+
+
+def test_too_long_counts_the_fall_back_hour():
+    # 8 hours on the wall clock but 9 were worked
+    validator, passed = validate((row(), at(1, 23, month=11), at(2, 7, month=11)), max_hours=8.5)
+    assert passed == []
+    assert issues(validator) == [(ISSUE_SHIFT_TOO_LONG, SEVERITY_ERROR, 0)]
+
+
+def test_negative_length_is_a_missing_punch():
+    validator, passed = validate((row(), at(8, 22), at(8, 17)))
+    assert passed == []
+    assert issues(validator) == [(ISSUE_MISSING_PUNCH, SEVERITY_ERROR, 0)]
+    assert "clocked out before it clocked in" in validator.report.issues[0]["message"]
+
+
+def test_later_of_two_overlapping_shifts_is_quarantined():
+    # rows out of time order, the overlap is still found against the neighbours only
+    validator, passed = validate(
+        (row(), at(8, 17), at(8, 22)),
+        (row(), at(8, 10), at(8, 14)),
+        (row(), at(8, 13), at(8, 18)),
+        (row("Sam"), at(8, 13), at(8, 18)),
+        # touching shifts are not overlapping
+        (row(), at(8, 22), at(8, 23)),
+        # the same clock in twice, the shorter shift counts as the earlier one
+        (row(), at(8, 10), at(8, 15)),
+    )
+    assert passed == [0, 1, 3, 4]
+    assert issues(validator) == [(ISSUE_OVERLAPPING_SHIFT, SEVERITY_ERROR, 5), (ISSUE_OVERLAPPING_SHIFT, SEVERITY_ERROR, 2)]
+
+
+def test_overlaps_across_batches_and_accepted_shifts():
+    validator = ShiftValidator("buford", SHIFT_LENGTH_MAX)
+    assert validator.accept(("Becca", "Wilson"), at(7, 17), at(7, 22))
+    assert not validator.accept(("Becca", "Wilson"), at(7, 18), at(7, 19))
+    _, passed = validate((row(), at(7, 21), at(7, 23)), (row(), at(8, 10), at(8, 14)), validator=validator)
+    assert passed == [1]
+    _, passed = validate((row(), at(8, 12), at(8, 15)), validator=validator)
+    assert passed == []
+    assert validator.report.checked_rows == 3
+
+
+def test_shifts_either_side_of_the_fall_back_hour_do_not_overlap():
+    # the first 1 AM ends before the second one starts, the wall clock says otherwise
+    first = (row(), at(2, 0, 30, month=11), at(2, 1, 50, month=11))
+    second = (row(), at(2, 1, 10, month=11, fold=1), at(2, 3, month=11))
+    validator, passed = validate(first, second)
+    assert passed == [0, 1]
+    validator, passed = validate(second, first)
+    assert passed == [0, 1]
+    assert validator.report.issues == []
+
+
+def test_parser_quarantines_and_strict_mode_raises():
+    rows = [row(clocked_in=at(8, 6), clocked_out=at(9, 6)), row("Sam", clocked_in=at(8, 10), clocked_out=at(8, 14))]
+    parser = ElixirShiftParser(rows, "buford")
+    assert [shift["first_name"] for shift in parser.parsed_shifts] == ["Sam"]
+    assert parser.validation.quarantined == [rows[0]]
+
+    with pytest.raises(ElixirShiftLengthError, match="total shift length of 24.0 hours"):
+        ElixirShiftParser(rows, "buford", strict=True)
+    with pytest.raises(Exception, match="has a shift with no clocked out time"):
+        ElixirShiftParser([row(clocked_in=at(8, 6))], "buford", strict=True)
+
+
+def test_warnings_do_not_stop_strict_mode(capsys):
+    rows = [row(status="Clocked In", clocked_in=at(8, 10), clocked_out=at(8, 14))]
+    parser = ElixirShiftParser(rows, "buford", strict=True)
+    assert len(parser.parsed_shifts) == 1
+    assert "User Becca Wilson is clocked in at buford" in capsys.readouterr().out
@@ -0,0 +1,151 @@
+# tests of the sqlite store of shifts and tips
+#   python -m pytest elixir/tests/test_store.py
+from datetime import date, datetime
+import sqlite3
+import pytest
+from elixir.operations.compensation import CompensationTable
+from elixir.operations.shift_parser import ElixirShiftParser
+from elixir.operations.store import ElixirStore
+from elixir.operations.tip_parser import ElixirTip
+from elixir.operations.work_team import eastern
+
+
+def at(day: int, hour: int, minute: int = 0) -> datetime:
+    return datetime(2025, 4, day, hour, minute, tzinfo=eastern)
+
+
+def row(first_name: str, clocked_in: datetime, clocked_out: datetime) -> dict:
+    return {"first_name": first_name, "last_name": "Wilson", "clocked_in": clocked_in, "clocked_out": clocked_out,
+            "status": "Clocked Out"}
+
+
+def tip(tip_date: datetime, amount: float, shift_type: str, ref: str) -> ElixirTip:
+    return ElixirTip(tip_date=tip_date, tip_amount=amount, shift_type=shift_type, location="buford", ref=ref)
+
+
+def punches(rows: list[dict]) -> list:
+    return list(ElixirShiftParser(rows, "buford", stream=True).iter_punches())
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ElixirStore(str(tmp_path / "elixir.db"))
+    yield store
+    store.close()
+
+
+def shift_rows(store: ElixirStore) -> list[tuple]:
+    return store.connection.execute(
+        "SELECT first_name, shift_type, start_date, end_date, minutes_worked FROM shifts ORDER BY start_date, shift_type"
+    ).fetchall()
+
+
+def test_punch_is_stored_as_its_alpha_and_bravo_shifts(store):
+    store.upsert_punches("Buford", punches([row("Becca", at(8, 17), at(8, 20))]))
+    assert shift_rows(store) == [
+        ("Becca", "a", "2025-04-08 17:00:00", "2025-04-08 18:30:00", 90.0),
+        ("Becca", "b", "2025-04-08 18:30:00", "2025-04-08 20:00:00", 90.0),
+    ]
+
+
+def test_loading_twice_never_doubles(store):
+    rows = [row("Becca", at(8, 17), at(8, 20)), row("Sam", at(8, 10), at(8, 14))]
+    store.upsert_punches("buford", punches(rows))
+    store.upsert_punches("buford", punches(rows))
+    assert store.connection.execute("SELECT COUNT(*) FROM punches").fetchone()[0] == 2
+    assert len(shift_rows(store)) == 3
+
+
+def test_changed_clock_out_is_updated_in_place(store):
+    store.upsert_punches("buford", punches([row("Becca", at(8, 17), at(8, 20))]))
+    store.upsert_punches("buford", punches([row("Becca", at(8, 17), at(8, 18))]))
+    assert shift_rows(store) == [("Becca", "a", "2025-04-08 17:00:00", "2025-04-08 18:00:00", 60.0)]
+
+
+def test_reloading_a_file_replaces_its_punches(store, tmp_path):
+    csv_file = str(tmp_path / "btime.csv")
+    store.upsert_punches("buford", punches([row("Becca", at(8, 17), at(8, 20))]), csv_file)
+    # the re-export corrected the clock in, the old punch must not stay behind
+    store.upsert_punches("buford", punches([row("Becca", at(8, 16, 45), at(8, 20))]), csv_file)
+    assert store.connection.execute("SELECT clocked_in FROM punches").fetchall() == [("2025-04-08 16:45:00",)]
+    assert [shift[2] for shift in shift_rows(store)] == ["2025-04-08 16:45:00", "2025-04-08 18:30:00"]
+
+
+def test_reloading_a_file_keeps_other_files(store, tmp_path):
+    store.upsert_punches("buford", punches([row("Becca", at(8, 17), at(8, 20))]), str(tmp_path / "a.csv"))
+    store.upsert_punches("buford", punches([row("Sam", at(9, 10), at(9, 12))]), str(tmp_path / "b.csv"))
+    store.upsert_punches("buford", [], str(tmp_path / "a.csv"))
+    assert store.get_workers("buford") == ["Sam Wilson"]
+
+
+def test_split_check_tips_are_kept_apart(store, tmp_path):
+    tips = [tip(at(8, 19), 5.0, "b", "11000"), tip(at(8, 19), 3.0, "b", "11000")]
+    store.upsert_tips(tips, str(tmp_path / "btip.csv"))
+    store.upsert_tips(tips, str(tmp_path / "btip.csv"))
+    assert store.connection.execute("SELECT SUM(tip_amount), COUNT(*) FROM tips").fetchone() == (8.0, 2)
+    store.upsert_tips(tips[:1], str(tmp_path / "btip.csv"))
+    assert store.connection.execute("SELECT SUM(tip_amount), COUNT(*) FROM tips").fetchone() == (5.0, 1)
+
+
+def test_get_workers_date_range(store):
+    store.upsert_punches("buford", punches([row("Becca", at(8, 17), at(8, 20)), row("Sam", at(10, 10), at(10, 12))]))
+    assert store.get_workers() == ["Becca Wilson", "Sam Wilson"]
+    assert store.get_workers("buford", start_date_range=at(9, 0)) == ["Sam Wilson"]
+    assert store.get_workers("buford", end_date_range=at(8, 20)) == ["Becca Wilson"]
+    assert store.get_workers("monroe") == []
+
+
+def test_daily_rates_and_payroll_totals(store):
+    store.upsert_punches("buford", punches([row("Becca", at(8, 17), at(8, 20)), row("Sam", at(8, 19), at(8, 21))]))
+    store.upsert_tips([tip(at(8, 19), 35.0, "b", "11000"), tip(at(8, 12), 9.0, "a", "11001")])
+    rates = store.daily_rates_df("buford", "2025-04-08", "2025-04-08")
+    assert rates["date"].tolist() == [date(2025, 4, 8)] * 2
+    assert rates["shift_type"].tolist() == ["a", "b"]
+    assert rates["minutes_worked"].tolist() == [90.0, 210.0]
+    assert rates["hourly_tip_rate"].tolist() == pytest.approx([6.0, 10.0])
+
+    store.load_compensation(CompensationTable.from_entries([
+        {"first_name": "Becca", "last_name": "Wilson", "effective_from": date(2025, 1, 1), "rate": 12.0, "tips_eligible": True},
+        {"first_name": "Sam", "last_name": "Wilson", "effective_from": date(2025, 1, 1), "rate": 20.0, "tips_eligible": False},
+    ]))
+    totals = store.payroll_totals_df("buford").set_index("first_name")
+    assert totals.loc["Becca", "total_wages"] == pytest.approx(36.0)
+    assert totals.loc["Becca", "total_tips"] == pytest.approx(1.5 * 6.0 + 1.5 * 10.0)
+    assert totals.loc["Sam", "total_tips"] == 0
+    assert totals.loc["Sam", "total_comp"] == pytest.approx(40.0)
+
+
+def test_store_from_before_the_csv_file_columns_is_upgraded(tmp_path):
+    path = str(tmp_path / "old.db")
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE punches (id INTEGER PRIMARY KEY, location TEXT NOT NULL, first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL, clocked_in TEXT NOT NULL, clocked_out TEXT NOT NULL,
+            UNIQUE (location, first_name, last_name, clocked_in));
+        CREATE TABLE tips (location TEXT NOT NULL, ref TEXT NOT NULL, tip_date TEXT NOT NULL, seq INTEGER NOT NULL,
+            date TEXT NOT NULL, tip_amount REAL NOT NULL, shift_type TEXT NOT NULL,
+            PRIMARY KEY (location, ref, tip_date, seq));
+    """)
+    connection.close()
+
+    store = ElixirStore(path)
+    store.upsert_punches("buford", punches([row("Becca", at(8, 17), at(8, 20))]), str(tmp_path / "btime.csv"))
+    assert store.get_workers("buford") == ["Becca Wilson"]
+    store.close()
+
+
+def test_minutes_worked_across_the_spring_forward_night(store):
+    clocked_in, clocked_out = datetime(2025, 3, 8, 23, tzinfo=eastern), datetime(2025, 3, 9, 5, tzinfo=eastern)
+    store.upsert_punches("buford", punches([row("Becca", clocked_in, clocked_out)]))
+    assert sum(shift[4] for shift in shift_rows(store)) == 300.0
+
+
+def test_payroll_totals_keep_the_wages_of_days_without_tips(store):
+    store.upsert_punches("buford", punches([row("Becca", at(8, 10), at(8, 14)), row("Becca", at(9, 10), at(9, 13))]))
+    store.upsert_tips([tip(at(9, 12), 10.0, "a", "11000")])
+    store.load_compensation(CompensationTable.from_entries([
+        {"first_name": "Becca", "last_name": "Wilson", "effective_from": date(2025, 1, 1), "rate": 12.0, "tips_eligible": True},
+    ]))
+    totals = store.payroll_totals_df("buford")
+    assert totals["total_tips"].tolist() == pytest.approx([10.0])
+    assert totals["total_comp"].tolist() == pytest.approx([94.0])
@@ -0,0 +1,105 @@
+# tests of the tips credited to the staff on the clock
+#   python -m pytest elixir/tests/test_tip_allocation.py
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from elixir.operations.tip_allocation import allocate_location_tips, allocate_tips
+from elixir.operations.work_team import eastern
+
+
+def times(*values: str) -> np.ndarray:
+    return np.array(values, dtype="datetime64[us]")
+
+
+def reference_allocation(starts, ends, tip_times, amounts) -> tuple[list[float], float]:
+    """Every tip compared with every shift, the slow way the sweep replaces."""
+    allocated = [0.0] * len(starts)
+    unallocated = 0.0
+    for tip_time, amount in zip(tip_times, amounts):
+        on_clock = [i for i in range(len(starts)) if starts[i] <= tip_time < ends[i]]
+        if not on_clock:
+            unallocated += amount
+        for i in on_clock:
+            allocated[i] += amount / len(on_clock)
+    return allocated, unallocated
+
+
+def test_tip_is_split_between_the_staff_on_the_clock():
+    allocation = allocate_location_tips(
+        times("2025-04-08T17:00", "2025-04-08T19:00"), times("2025-04-08T21:00", "2025-04-08T22:00"),
+        times("2025-04-08T18:00", "2025-04-08T20:00", "2025-04-08T21:30", "2025-04-08T23:00"), [10.0, 10.0, 6.0, 4.0],
+    )
+    assert allocation.staff_on_clock.tolist() == [1, 2, 1, 0]
+    assert allocation.allocated.tolist() == [15.0, 11.0]
+    assert allocation.unallocated.tolist() == [0.0, 0.0, 0.0, 4.0]
+
+
+def test_shifts_are_half_open():
+    # the alpha half ends and the bravo half starts right at the tip
+    allocation = allocate_location_tips(
+        times("2025-04-08T17:00", "2025-04-08T18:30"), times("2025-04-08T18:30", "2025-04-08T20:00"),
+        times("2025-04-08T18:30"), [8.0],
+    )
+    assert allocation.allocated.tolist() == [0.0, 8.0]
+
+
+def test_allocate_tips_by_location_and_eligibility():
+    shifts_df = pd.DataFrame({
+        "location": ["buford", "buford", "monroe"],
+        "start_date": times("2025-04-08T17:00", "2025-04-08T17:00", "2025-04-08T17:00"),
+        "end_date": times("2025-04-08T22:00", "2025-04-08T22:00", "2025-04-08T22:00"),
+    })
+    tips_df = pd.DataFrame({
+        "location": ["buford", "monroe", "monroe"],
+        "tip_date": times("2025-04-08T19:00", "2025-04-08T19:00", "2025-04-08T23:00"),
+        "tip_amount": [12.0, 5.0, 3.0],
+    })
+    allocated, unallocated = allocate_tips(shifts_df, tips_df, eligible=[True, False, True])
+    assert allocated.tolist() == [12.0, 0.0, 5.0]
+    assert unallocated == 3.0
+
+
+def test_randomized_against_every_pair():
+    rng = np.random.default_rng(18)
+    base = np.datetime64("2025-04-08T10:00", "us")
+    starts = base + rng.integers(0, 12 * 60, 200).astype("timedelta64[m]")
+    ends = starts + rng.integers(0, 8 * 60, 200).astype("timedelta64[m]")
+    tip_times = base + rng.integers(0, 20 * 60, 500).astype("timedelta64[m]")
+    amounts = rng.uniform(0.0, 20.0, 500).round(2)
+
+    allocation = allocate_location_tips(starts, ends, tip_times, amounts)
+    expected, unallocated = reference_allocation(starts, ends, tip_times, amounts)
+    assert allocation.allocated == pytest.approx(expected)
+    assert allocation.unallocated.sum() == pytest.approx(unallocated)
+    assert allocation.allocated.sum() + allocation.unallocated.sum() == pytest.approx(amounts.sum())
+
+
+
+def fall_back(hour: int, minute: int, fold: int = 0) -> datetime:
+    """Eastern time on 2025-11-02, the clock goes from 1:59 EDT back to 1:00 EST and fold=1 is
+        the second pass through 1 AM"""
+    return datetime(2025, 11, 2, hour, minute, fold=fold, tzinfo=eastern)
+
+
+def test_tips_in_the_repeated_fall_back_hour():
+    # the first shift ends at the first 1:30 and the second starts at the second 1:00, on the
+    # wall clock they overlap and both tips would be split between them
+    shifts_df = pd.DataFrame({
+        "location": ["buford", "buford"],
+        "start_date": [fall_back(0, 30), fall_back(1, 0, fold=1)],
+        "end_date": [fall_back(1, 30), fall_back(3, 0)],
+    })
+    tips_df = pd.DataFrame({
+        "location": ["buford", "buford"],
+        "tip_date": [fall_back(1, 15), fall_back(1, 15, fold=1)],
+        "tip_amount": [10.0, 4.0],
+    })
+    assert isinstance(shifts_df["start_date"].dtype, pd.DatetimeTZDtype)
+    allocated, unallocated = allocate_tips(shifts_df, tips_df)
+    assert allocated.tolist() == [10.0, 4.0]
+    assert unallocated == 0.0
+
+    # the same datetimes in object columns go through to_epoch_us one at a time
+    allocated, _ = allocate_tips(shifts_df.astype(object), tips_df.astype({"tip_date": object}))
+    assert allocated.tolist() == [10.0, 4.0]
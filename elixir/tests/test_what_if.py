@@ -0,0 +1,95 @@
+# tests of the what-if sweep over shift boundaries and rate tables
+#   python -m pytest elixir/tests/test_what_if.py
+import csv
+from datetime import date
+import pandas as pd
+import pytest
+from elixir.operations.compensation import CompensationTable
+from elixir.pipeline import PayrollRun
+from elixir.reports.what_if import simulate
+from elixir.tests.synthetic import TIME_HEADER, TIPS_HEADER
+
+PUNCHES = [
+    ("Becca", "04-08-25 05:00 PM", "04-08-25 10:00 PM"),
+    ("Sam", "04-08-25 10:00 AM", "04-08-25 07:00 PM"),
+    ("Keri", "04-08-25 11:00 AM", "04-08-25 03:00 PM"),
+    # nobody left a tip on the 9th
+    ("Becca", "04-09-25 11:00 AM", "04-09-25 03:00 PM"),
+]
+TIPS = [("11000", "04-08-25 07:30 PM", "$40.00"), ("11001", "04-08-25 12:00 PM", "$18.00")]
+
+
+def compensation(becca: float = 12.0, sam: float = 15.0) -> CompensationTable:
+    return CompensationTable.from_entries([
+        {"first_name": first_name, "last_name": "Wilson", "effective_from": date(2025, 1, 1), "rate": rate,
+         "tips_eligible": tips_eligible}
+        for first_name, rate, tips_eligible in [("Becca", becca, True), ("Sam", sam, True), ("Keri", 20.0, False)]
+    ])
+
+
+def payroll_run(tmp_path, punches: list[tuple] = PUNCHES) -> PayrollRun:
+    data_dir = tmp_path / "data"
+    for kind, header, rows in [
+        ("time", TIME_HEADER, [[first_name, "Wilson", "Admin", "", clocked_in, clocked_out, "Yes", "0.00", "0.00",
+                                "$0.00", "$0.00", "Clocked Out"] for first_name, clocked_in, clocked_out in punches]),
+        ("tips", TIPS_HEADER, [[ref, tip_time, "POS Admin", "POS 1", "1234", "Bar", "CreditCard", amount]
+                               for ref, tip_time, amount in TIPS]),
+    ]:
+        folder = data_dir / "buford" / kind
+        folder.mkdir(parents=True, exist_ok=True)
+        with open(folder / f"b{kind}.csv", "w", newline="") as f:
+            writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+            writer.writerow(header)
+            writer.writerows(rows)
+    return PayrollRun(data_dir=str(data_dir), compensation=compensation())
+
+
+def test_current_scenario_is_the_payroll_totals(tmp_path):
+    run = payroll_run(tmp_path)
+    scenario = simulate(run).iloc[0]
+    summary = run.payroll_summary_df
+    assert scenario["total_wages"] == pytest.approx(summary["total_wages"].sum())
+    assert scenario["total_tips"] == pytest.approx(summary["total_tips"].sum())
+    assert scenario["total_comp"] == pytest.approx(summary["total_comp"].sum())
+    # the day without tips keeps its wages in both
+    assert scenario["total_comp"] == pytest.approx(scenario["total_wages"] + scenario["total_tips"])
+    assert scenario["comp_change"] == 0
+
+
+def test_comp_by_employee_is_the_payroll_summary(tmp_path):
+    run = payroll_run(tmp_path)
+    employees = simulate(run, by_employee=True).set_index("first_name")["total_comp"]
+    summary = run.payroll_summary_df.set_index("first_name")["total_comp"]
+    pd.testing.assert_series_equal(employees.sort_index(), summary.sort_index(), check_names=False)
+
+
+def test_swapped_rates_move_the_wages(tmp_path):
+    run = payroll_run(tmp_path)
+    scenarios = simulate(run, rate_tables={"current": run.compensation, "swapped": compensation(becca=15.0, sam=12.0)})
+    current, swapped = scenarios.iloc[0], scenarios.iloc[1]
+    # Becca worked 9 hours and Sam 9, the swap only moves wages between them
+    assert swapped["total_wages"] == pytest.approx(current["total_wages"])
+    by_employee = simulate(run, rate_tables={"swapped": compensation(becca=15.0, sam=12.0)}, by_employee=True)
+    comp = by_employee.set_index("first_name")["total_comp"]
+    summary = run.payroll_summary_df.set_index("first_name")["total_comp"]
+    assert comp["Becca"] - summary["Becca"] == pytest.approx(9 * 3.0)
+    assert comp["Sam"] - summary["Sam"] == pytest.approx(-9 * 3.0)
+    assert swapped["comp_change"] == pytest.approx(0.0)
+
+
+def test_removed_shift_lowers_the_totals_by_its_pay(tmp_path):
+    full = simulate(payroll_run(tmp_path / "full")).iloc[0]
+    # without Keri the same tips are pooled over fewer hours, but she isn't tip eligible
+    without = simulate(payroll_run(tmp_path / "without", [p for p in PUNCHES if p[0] != "Keri"])).iloc[0]
+    assert full["total_wages"] - without["total_wages"] == pytest.approx(4 * 20.0)
+    assert full["alpha_hours"] - without["alpha_hours"] == pytest.approx(4.0)
+    # the tips of the eligible staff go up as Keri's share of the pool is theirs now
+    assert without["total_tips"] > full["total_tips"]
+    assert without["alpha_tip_rate"] > full["alpha_tip_rate"]
+
+
+def test_later_boundary_moves_hours_to_alpha(tmp_path):
+    scenarios = simulate(payroll_run(tmp_path), ["6:30 PM", "7:00 PM"]).set_index("boundary")
+    # Becca's 5 PM and Sam's 10 AM punches both run past 7 PM
+    assert scenarios.loc["07:00 PM", "alpha_hours"] - scenarios.loc["06:30 PM", "alpha_hours"] == pytest.approx(1.0)
+    assert scenarios.loc["07:00 PM", "total_wages"] == pytest.approx(scenarios.loc["06:30 PM", "total_wages"])
@@ -0,0 +1,151 @@
+# differential tests of the batch splitter against WorkTeamDay
+# WorkTeamDay is the scalar reference, split_team_arrays and get_team_codes have to give the
+# same alpha/bravo segments and shift types for every punch and tip time
+#   python -m pytest elixir/tests/test_work_team.py
+from datetime import datetime, timedelta
+import random
+import numpy as np
+import pytest
+from elixir.operations.work_team import (SHIFT_BOUNDARY, TeamType, WorkTeamDay, eastern, from_epoch_us,
+                                         get_team_codes, split_team_arrays, to_epoch_us)
+
+# the spring forward and fall back days of 2025
+DST_DAYS = [datetime(2025, 3, 9), datetime(2025, 11, 2)]
+
+
+def local(year, month, day, hour=0, minute=0) -> datetime:
+    return datetime(year, month, day, hour, minute, tzinfo=eastern)
+
+
+def boundary_on(day: datetime) -> datetime:
+    return datetime.combine(day.date(), SHIFT_BOUNDARY, tzinfo=eastern)
+
+
+def reference_split(start: datetime, end: datetime) -> tuple:
+    """(has_a, a_start, a_end, has_b, b_start, b_end) of one punch from WorkTeamDay, as epoch
+        microseconds with 0 for a missing segment"""
+    team_day = WorkTeamDay(start, end)
+    a, b = team_day.team_a, team_day.team_b
+    return (
+        a is not None,
+        to_epoch_us(a["start_date"]) if a else 0,
+        to_epoch_us(a["end_date"]) if a else 0,
+        b is not None,
+        to_epoch_us(b["start_date"]) if b else 0,
+        to_epoch_us(b["end_date"]) if b else 0,
+    )
+
+
+def assert_split_matches(punches: list[tuple[datetime, datetime]]):
+    split = split_team_arrays([to_epoch_us(start) for start, _ in punches],
+                              [to_epoch_us(end) for _, end in punches])
+    for i, (start, end) in enumerate(punches):
+        has_a, a_start, a_end, has_b, b_start, b_end = reference_split(start, end)
+        assert bool(split.has_a[i]) == has_a, (start, end)
+        assert bool(split.has_b[i]) == has_b, (start, end)
+        if has_a:
+            assert (split.a_start[i], split.a_end[i]) == (a_start, a_end), (start, end)
+        if has_b:
+            assert (split.b_start[i], split.b_end[i]) == (b_start, b_end), (start, end)
+
+
+def assert_codes_match(times: list[datetime]):
+    codes = get_team_codes([to_epoch_us(tip_time) for tip_time in times])
+    expected = {TeamType.a: "a", TeamType.b: "b", None: ""}
+    for tip_time, code in zip(times, codes):
+        assert code == expected[WorkTeamDay.get_team_by_time(tip_time)], tip_time
+
+
+def test_alpha_bravo_and_both():
+    assert_split_matches([
+        (local(2025, 4, 8, 10), local(2025, 4, 8, 15)),
+        (local(2025, 4, 8, 19), local(2025, 4, 8, 23)),
+        (local(2025, 4, 8, 16), local(2025, 4, 8, 22, 15)),
+    ])
+
+
+def test_shift_crossing_midnight_stays_bravo():
+    start, end = local(2025, 4, 8, 17), local(2025, 4, 9, 2, 30)
+    assert_split_matches([(start, end), (local(2025, 4, 8, 21), local(2025, 4, 9, 1))])
+    split = split_team_arrays([to_epoch_us(start)], [to_epoch_us(end)])
+    # the boundary is the one of the day the shift started
+    assert split.boundary[0] == to_epoch_us(boundary_on(start))
+    assert split.b_end[0] == to_epoch_us(end)
+
+
+@pytest.mark.parametrize("day", DST_DAYS)
+def test_dst_days(day):
+    punches = []
+    for hour in range(0, 24):
+        # clock ins every hour of the changeover day, converted from utc so the wall clock always exists
+        start = from_epoch_us(to_epoch_us(local(day.year, day.month, day.day)) + hour * 3_600_000_000)
+        punches.append((start, start + timedelta(hours=6)))
+    # the day before into the changeover night
+    before = day - timedelta(days=1)
+    punches.append((local(before.year, before.month, before.day, 17), local(day.year, day.month, day.day, 4)))
+    assert_split_matches(punches)
+    assert_codes_match([start for start, _ in punches] + [boundary_on(day)])
+
+
+def test_dst_boundary_is_local():
+    for day in DST_DAYS:
+        split = split_team_arrays([to_epoch_us(local(day.year, day.month, day.day, 12))],
+                                  [to_epoch_us(local(day.year, day.month, day.day, 20))])
+        assert from_epoch_us(split.boundary[0]).time() == SHIFT_BOUNDARY
+
+
+def test_punches_on_the_boundary():
+    boundary = boundary_on(local(2025, 4, 8))
+    punches = [
+        (local(2025, 4, 8, 12), boundary),
+        (boundary, local(2025, 4, 8, 23)),
+        (boundary, boundary),
+    ]
+    assert_split_matches(punches)
+    split = split_team_arrays([to_epoch_us(start) for start, _ in punches], [to_epoch_us(end) for _, end in punches])
+    # ending on the boundary leaves an empty bravo segment and starting on it an empty alpha one
+    assert split.has_a.tolist() == [True, True, True]
+    assert split.has_b.tolist() == [True, True, True]
+
+
+def test_zero_length_punches():
+    assert_split_matches([
+        (local(2025, 4, 8, 9), local(2025, 4, 8, 9)),
+        (local(2025, 4, 8, 21), local(2025, 4, 8, 21)),
+        (local(2025, 11, 2, 1, 30), local(2025, 11, 2, 1, 30)),
+    ])
+
+
+def test_tip_codes_on_the_boundary():
+    boundary = boundary_on(local(2025, 4, 8))
+    times = [boundary - timedelta(minutes=1), boundary, boundary + timedelta(minutes=1)]
+    assert_codes_match(times)
+    assert get_team_codes([to_epoch_us(t) for t in times]).tolist() == ["a", "", "b"]
+
+
+def test_empty_arrays():
+    split = split_team_arrays(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+    assert split.has_a.size == 0 and split.has_b.size == 0
+    assert get_team_codes(np.empty(0, dtype=np.int64)).size == 0
+
+
+def test_randomized_against_work_team_day():
+    rng = random.Random(20250309)
+    year_start = to_epoch_us(local(2025, 1, 1))
+    year_minutes = 365 * 24 * 60
+    punches = []
+    tip_times = []
+    for _ in range(5_000):
+        # whole minutes like the quantic exports, from utc so every wall clock exists
+        start = from_epoch_us(year_start + rng.randrange(year_minutes) * 60_000_000)
+        end = start + timedelta(minutes=rng.choice([0, rng.randrange(1, 16 * 60)]))
+        punches.append((start, end))
+        tip_times.append(from_epoch_us(to_epoch_us(start) + rng.randrange(0, 12 * 60) * 60_000_000))
+    # some punches that start or end right on the boundary
+    for day in range(0, 365, 7):
+        boundary = boundary_on(local(2025, 1, 1) + timedelta(days=day))
+        punches.append((boundary - timedelta(hours=rng.randrange(1, 8)), boundary))
+        punches.append((boundary, boundary + timedelta(hours=rng.randrange(1, 8))))
+        tip_times.append(boundary)
+    assert_split_matches(punches)
+    assert_codes_match(tip_times)
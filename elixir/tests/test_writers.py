@@ -0,0 +1,107 @@
+# round trips of the report sheet writers
+# every sheet is written in chunks of 2 rows to tmp_path and read back with pandas
+#   python -m pytest elixir/tests/test_writers.py
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+import pytest
+from elixir.reports.writers import (FORMAT_CSV, FORMAT_PARQUET, CsvWriter, ExcelWriter, ParquetWriter, ReportWriter,
+                                    iter_chunks)
+
+CHUNK_ROWS = 2
+
+
+def frame() -> pd.DataFrame:
+    return pd.DataFrame({
+        "first_name": ["Becca", "Sam", None, "Keri", "Alyssa"],
+        "date": [date(2025, 4, 8), date(2025, 4, 9), date(2025, 4, 9), None, date(2025, 4, 10)],
+        "start_date": pd.to_datetime(["2025-04-08 17:00", "2025-04-09 10:30", None, "2025-04-09 11:00", "2025-04-10 18:30"]),
+        "hours_worked": [3.0, 4.5, np.nan, 1.25, 2.0],
+        "shifts": [1, 2, 3, 4, 5],
+        "tips_eligible": [True, False, True, True, False],
+    })
+
+
+def test_iter_chunks():
+    assert [len(chunk) for chunk in iter_chunks(frame(), CHUNK_ROWS)] == [2, 2, 1]
+    assert list(iter_chunks(frame().iloc[:0], CHUNK_ROWS)) == []
+
+
+def test_xlsx_round_trip(tmp_path):
+    path = str(tmp_path / "report.xlsx")
+    writer = ExcelWriter(path, CHUNK_ROWS)
+    assert writer.workbook.constant_memory
+    writer.write_sheet("shifts", frame())
+    writer.write_sheet("empty", frame().iloc[:0])
+    writer.close()
+
+    sheets = pd.read_excel(path, sheet_name=None)
+    assert list(sheets) == ["shifts", "empty"]
+    shifts = sheets["shifts"]
+    expected = frame()
+    assert list(shifts.columns) == list(expected.columns)
+    assert shifts["first_name"].tolist()[:2] == ["Becca", "Sam"] and pd.isna(shifts["first_name"][2])
+    assert pd.to_datetime(shifts["date"]).dt.date.tolist()[:3] == expected["date"].tolist()[:3]
+    assert pd.isna(shifts["date"][3])
+    pd.testing.assert_series_equal(pd.to_datetime(shifts["start_date"]), expected["start_date"], check_dtype=False)
+    pd.testing.assert_series_equal(shifts["hours_worked"], expected["hours_worked"])
+    assert shifts["shifts"].tolist() == expected["shifts"].tolist()
+    assert shifts["tips_eligible"].tolist() == expected["tips_eligible"].tolist()
+    assert sheets["empty"].empty and list(sheets["empty"].columns) == list(expected.columns)
+
+
+def test_xlsx_writes_aware_times_as_their_wall_clock(tmp_path):
+    path = str(tmp_path / "report.xlsx")
+    aware = pd.DataFrame({"start_date": pd.to_datetime(["2025-04-08 17:00"]).tz_localize("America/New_York")})
+    writer = ExcelWriter(path, CHUNK_ROWS)
+    writer.write_sheet("shifts", aware)
+    writer.close()
+    assert pd.read_excel(path)["start_date"].tolist() == [pd.Timestamp("2025-04-08 17:00")]
+
+
+def test_parquet_round_trip(tmp_path):
+    writer = ParquetWriter(str(tmp_path), "report_", CHUNK_ROWS)
+    writer.write_sheet("shifts", frame())
+    writer.close()
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "report_shifts.parquet"), frame(), check_dtype=False)
+
+
+def test_parquet_keeps_the_type_of_a_column_missing_in_a_chunk(tmp_path):
+    df = pd.DataFrame({"tip_amount": [np.nan, np.nan, 5.0], "ref": [None, None, "11000"]})
+    ParquetWriter(str(tmp_path), chunk_rows=CHUNK_ROWS).write_sheet("tips", df)
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "tips.parquet"), df, check_dtype=False)
+
+
+def test_csv_round_trip(tmp_path):
+    writer = CsvWriter(str(tmp_path), "report_", CHUNK_ROWS)
+    writer.write_sheet("shifts", frame())
+    writer.write_sheet("empty", frame().iloc[:0])
+    writer.close()
+
+    shifts = pd.read_csv(tmp_path / "report_shifts.csv", parse_dates=["start_date"])
+    expected = frame()
+    pd.testing.assert_frame_equal(shifts.drop(columns="date"), expected.drop(columns="date"), check_dtype=False)
+    assert shifts["date"].tolist()[:3] == ["2025-04-08", "2025-04-09", "2025-04-09"]
+    # the header is written once however many chunks there are
+    assert (tmp_path / "report_shifts.csv").read_text().count("first_name") == 1
+    assert (tmp_path / "report_empty.csv").read_text().strip() == ",".join(expected.columns)
+
+
+def test_report_writer_sends_each_sheet_to_its_format(tmp_path):
+    with ReportWriter(str(tmp_path), "payroll", {"tips": FORMAT_CSV, "rates": FORMAT_PARQUET}, chunk_rows=CHUNK_ROWS) as writer:
+        writer.write_sheet("shifts", frame())
+        writer.write_sheet("tips", frame())
+        writer.write_sheet("rates", frame())
+        writer.write_sheet("summary", frame())
+    assert writer.paths == [str(tmp_path / "payroll.xlsx"), str(tmp_path / "payroll_tips.csv"),
+                            str(tmp_path / "payroll_rates.parquet")]
+    assert list(pd.read_excel(tmp_path / "payroll.xlsx", sheet_name=None)) == ["shifts", "summary"]
+    assert len(pd.read_csv(tmp_path / "payroll_tips.csv")) == 5
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "payroll_rates.parquet"), frame(), check_dtype=False)
+
+
+def test_report_writer_rejects_unknown_formats(tmp_path):
+    with pytest.raises(ValueError, match="Invalid output format: json"):
+        ReportWriter(str(tmp_path), "payroll", {"tips": "json"})
+    with pytest.raises(ValueError, match="Invalid output format: txt"):
+        ReportWriter(str(tmp_path), "payroll", default_format="txt")
@@ -1,29 +1,145 @@
 # elixir/main.py
 
-import pandas as pd
-from datetime import datetime
-from elixir.operations.payroll_utils import get_payroll_calculations
-from elixir.reports.summary_dataframes import get_summary_dataframes
+import argparse
 import os
+from datetime import date, datetime
+from elixir.instrumentation import Instrumentation
+from elixir.operations.store import STORE_FILE, ElixirStore
+from elixir.operations.overtime import OvertimeRule
+from elixir.pipeline import PayrollRun
+from elixir.quantic.cache import QuanticCsvCache
+from elixir.reports.writers import FORMAT_XLSX, FORMATS, ReportWriter
 
-# Create output folder if it doesn't exist
-output_dir = os.path.join("elixir", "outputs")
-os.makedirs(output_dir, exist_ok=True)
+# the sheets of a run in the order they are written
+SHEETS = ("payroll_detail", "payroll_summary", "shifts", "tips", "daily_rates")
 
-# Get today's date for filename
-today_str = datetime.today().strftime("%Y%m%d")
-output_path = os.path.join(output_dir, f"payroll_outputs_{today_str}.xlsx")
 
-# Get payroll and summary data
-payroll_calc_df, payroll_summary_df = get_payroll_calculations()
-shifts_df, tips_df, daily_rates_df = get_summary_dataframes()
+def sheet_format(value: str) -> tuple[str, str]:
+    """Parses one --format SHEET=FORMAT value, argparse reports the errors."""
+    sheet, separator, output_format = value.partition("=")
+    if not separator:
+        raise argparse.ArgumentTypeError(f"expected SHEET=FORMAT, got '{value}'")
+    if sheet not in SHEETS:
+        raise argparse.ArgumentTypeError(f"unknown sheet '{sheet}', expected one of {', '.join(SHEETS)}")
+    if output_format not in FORMATS:
+        raise argparse.ArgumentTypeError(f"unknown format '{output_format}', expected one of {', '.join(FORMATS)}")
+    return sheet, output_format
 
-# Write to Excel
-with pd.ExcelWriter(output_path, engine="xlsxwriter") as writer:
-    payroll_calc_df.to_excel(writer, sheet_name="payroll_detail", index=False)
-    payroll_summary_df.to_excel(writer, sheet_name="payroll_summary", index=False)
-    shifts_df.to_excel(writer, sheet_name="shifts", index=False)
-    tips_df.to_excel(writer, sheet_name="tips", index=False)
-    daily_rates_df.to_excel(writer, sheet_name="daily_rates", index=False)
 
-print(f"✅ Payroll export complete: {output_path}")
+def period_boundary(value: str) -> date:
+    """Parses one --periods YYYY-MM-DD date, argparse reports the errors."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a YYYY-MM-DD date, got '{value}'")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Run payroll for the quantic exports in data/")
+    parser.add_argument(
+        "--periods", nargs="+", type=period_boundary, metavar="YYYY-MM-DD",
+        help="pay period boundaries, each period runs from one date up to the day before the next "
+             "(e.g. --periods 2025-04-01 2025-04-15 2025-05-01 is two periods)",
+    )
+    parser.add_argument(
+        "--format", action="append", default=[], type=sheet_format, metavar="SHEET=FORMAT", dest="sheet_formats",
+        help=f"output format of one sheet, one of {', '.join(FORMATS)} (e.g. --format shifts=parquet), can be repeated",
+    )
+    parser.add_argument(
+        "--default-format", default=FORMAT_XLSX, choices=FORMATS,
+        help="output format of the sheets without a --format",
+    )
+    parser.add_argument(
+        "--shards", type=int, default=1,
+        help="number of locations processed at once in their own processes, each location in data/ is its own "
+             "shard (default: 1, no process pool)",
+    )
+    parser.add_argument(
+        "--store", nargs="?", const=STORE_FILE, metavar="PATH",
+        help=f"also upsert the parsed shifts and tips into a sqlite store (default path: {STORE_FILE})",
+    )
+    parser.add_argument(
+        "--allocate-tips", action="store_true",
+        help="also credit each tip to the tip eligible staff on the clock when it came in, next to the pooled tips",
+    )
+    parser.add_argument(
+        "--overtime", nargs="?", type=float, const=OvertimeRule().weekly_hours, metavar="HOURS",
+        help=f"pay hours past HOURS in an employee's monday to sunday week at {OvertimeRule().multiplier}x "
+             f"(default: {OvertimeRule().weekly_hours:g})",
+    )
+    parser.add_argument(
+        "--instrument", nargs="?", const="", metavar="PATH",
+        help="write a json report of the time, rows and peak memory of every stage "
+             "(default path: elixir/outputs/run_report_<date>.json)",
+    )
+    parser.add_argument(
+        "--no-trace-memory", action="store_true",
+        help="leave out the tracemalloc peaks of --instrument, tracing memory slows the run down",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="with --instrument also dump a cProfile file next to the report, and one per location loaded as a shard",
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.periods and len(set(args.periods)) < 2:
+        parser.error("--periods needs at least a start and an end date")
+    periods = None
+    if args.periods:
+        # numpy is only loaded once there are periods to work out
+        from elixir.operations.pay_periods import PayPeriods
+
+        periods = PayPeriods(args.periods)
+    sheet_formats = dict(args.sheet_formats)
+
+    # Create output folder if it doesn't exist
+    output_dir = os.path.join("elixir", "outputs")
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Get today's date for filename
+    today_str = datetime.today().strftime("%Y%m%d")
+    output_name = f"payroll_outputs_{today_str}"
+
+    # Opt in timing and memory of every stage, started before anything is parsed
+    instrumentation = None
+    if args.instrument is not None:
+        report_path = args.instrument or os.path.join(output_dir, f"run_report_{today_str}.json")
+        profile_path = os.path.splitext(report_path)[0] + ".prof" if args.profile else None
+        instrumentation = Instrumentation(memory=not args.no_trace_memory, profile_path=profile_path)
+        instrumentation.start()
+
+    # Parsed csv files are cached so reruns only parse the files that changed
+    cache = QuanticCsvCache()
+
+    # Get payroll and summary data, the run parses every csv file once and shares it between them
+    store = ElixirStore(args.store) if args.store else None
+    run = PayrollRun(cache=cache, periods=periods, shards=args.shards, store=store, allocate=args.allocate_tips,
+                     overtime=OvertimeRule(weekly_hours=args.overtime) if args.overtime is not None else None)
+    payroll_calc_df, payroll_summary_df = run.payroll
+    shifts_df, tips_df, daily_rates_df = run.summary
+
+    # Write each sheet in its format, the xlsx sheets share one workbook
+    with ReportWriter(output_dir, output_name, sheet_formats, args.default_format) as writer:
+        for sheet, df in zip(SHEETS, (payroll_calc_df, payroll_summary_df, shifts_df, tips_df, daily_rates_df)):
+            writer.write_sheet(sheet, df)
+
+    if store:
+        store.load_compensation(run.compensation)
+        store.close()
+
+    if instrumentation:
+        instrumentation.stop()
+        instrumentation.write_report(report_path)
+        print(f"Run report written to {report_path}")
+
+    print(f"✅ Payroll export complete: {', '.join(writer.paths)}")
+
+
+# the process pool of --shards imports this module again in every worker under the spawn start
+# method, the run must only start when main.py is the script being run
+if __name__ == "__main__":
+    main()
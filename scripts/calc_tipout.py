@@ -1,105 +1,113 @@
 from scripts.clean_time import get_clean_shift_data
 from scripts.clean_tips import get_clean_tip_data
+import numpy as np
 import pandas as pd
-import os
-import glob
-from datetime import datetime
+from elixir.operations import DATA_DIR
+from elixir.operations.payroll_engine import daily_rates, encode_group_keys
+from elixir.pipeline import PayrollRun
 
 # === Configuration ===
-TIP_DATA_DIR = "data/"
-SHIFT_DATA_FILE = "data/processed_shifts.xlsx"
 OUTPUT_FILE = "data/tip_calculations.xlsx"
+# groups whose minutes or tips are further apart than this don't match the payroll
+CHECK_TOLERANCE = 0.01
+
 
 # === Helper Functions ===
-def find_latest_tip_file(directory):
-    """Finds the most recent processed tip data file."""
-    search_pattern = os.path.join(directory, "processed_tips_*.xlsx")
-    list_of_files = glob.glob(search_pattern)
-    if not list_of_files:
-        raise FileNotFoundError(f"No tip data files found in {directory}")
-    latest_file = max(list_of_files, key=os.path.getctime)
-    return latest_file
+def calculate_daily_rates(shifts_df: pd.DataFrame, tips_df: pd.DataFrame) -> pd.DataFrame:
+    """The minutes, tips and hourly tip rate of every (date, location, shift_type) with shifts,
+        summed on integer group codes by the same daily_rates the payroll uses"""
+    # every clock in/out is an alpha and a bravo segment, the empty ones are left out
+    shift_days = shifts_df['date'].to_numpy().astype('datetime64[D]')
+    locations = shifts_df['location'].to_numpy(dtype=object)
+    minutes = np.concatenate([shifts_df['minutes_a'].to_numpy(), shifts_df['minutes_b'].to_numpy()])
+    worked = minutes > 0
+    shift_keys = (
+        np.concatenate([shift_days, shift_days])[worked],
+        np.concatenate([locations, locations])[worked],
+        np.repeat(np.array(['a', 'b'], dtype=object), len(shifts_df))[worked],
+    )
+
+    # tips right on the boundary have no shift and count for neither
+    counted = (tips_df['shift'] != "").to_numpy()
+    tip_keys = (
+        tips_df['date'].to_numpy().astype('datetime64[D]')[counted],
+        tips_df['location'].to_numpy(dtype=object)[counted],
+        tips_df['shift'].str.lower().to_numpy(dtype=object)[counted],
+    )
+
+    keys, (shift_codes, tip_codes) = encode_group_keys(shift_keys, tip_keys)
+    rates = daily_rates(shift_codes, minutes[worked], tip_codes, tips_df['TIP'].to_numpy()[counted], keys.size)
+    dates, locations, shift_types = keys.decode(rates.codes)
+    return pd.DataFrame({
+        'date': dates.astype(object),
+        'location': locations,
+        'shift_type': shift_types,
+        'minutes_worked': rates.minutes_worked,
+        'tip_amount': rates.tip_amount,
+        'hourly_tip_rate': rates.hourly_tip_rate,
+    })
+
+
+def check_against_payroll(rates_df: pd.DataFrame, run: PayrollRun) -> pd.DataFrame:
+    """Compares the daily rates worked out from the raw csv rows with the daily rates of the
+        payroll run, returns the groups that are missing from either side or don't match.
+        Shifts the shift parser quarantined show up here"""
+    payroll_df = run.daily_rates_df[['date', 'location', 'shift_type', 'minutes_worked', 'tip_amount']]
+    merged_df = pd.merge(rates_df, payroll_df, on=['date', 'location', 'shift_type'], how='outer',
+                         suffixes=('', '_payroll'), indicator=True)
+    differs = (merged_df['_merge'] != 'both') \
+        | ((merged_df['minutes_worked'] - merged_df['minutes_worked_payroll']).abs() > CHECK_TOLERANCE) \
+        | ((merged_df['tip_amount'].fillna(0) - merged_df['tip_amount_payroll'].fillna(0)).abs() > CHECK_TOLERANCE)
+    return merged_df[differs].drop(columns='_merge').reset_index(drop=True)
 
 
 # === Main Calculation Function ===
-def calculate_tipout():
+def calculate_tipout(data_dir=DATA_DIR, output_file=OUTPUT_FILE, check=True):
     try:
         # 1. Load Data using the imported functions
-        tips_df = get_clean_tip_data()
-        shifts_df = get_clean_shift_data()
-
-
-        # # 2. Data Cleaning/Preprocessing (Check for NaN values and potential data type conversion)
-        # if tips_df.isnull().any().any():
-        #     print("Warning: Missing values found in tip data.  Investigate.")
-        # if shifts_df.drop(columns=["LAST NAME ↑"], errors="ignore").isnull().any().any():
-        #         print("Warning: Missing values found in shift data (excluding LAST NAME). Investigate.")
-
-
-        # # Ensure 'TIP' is numeric (handle potential errors)
-        # try:
-        #     # regex remove the $ from the TIP column
-        #     tips_df['TIP_clean'] = tips_df['TIP'].str.replace(r'^\$', '', regex=True)
-
-        #     # convert TIP_clean to number
-        #     tips_df['TIP_clean'] = pd.to_numeric(tips_df['TIP_clean'], errors='coerce')
-
-        # except KeyError:
-        #     print("Warning: 'TIP' column not found in tip data. Check column names.")
-        #     return  # Exit if critical column is missing
-        # except ValueError as e:
-        #     print(f"Error converting 'TIP' to numeric: {e}")
-        #     return  # Exit if conversion fails
-
-
-        # # 3. Data Cleaning and formatting the date columns for the merge
-        tips_df['date'] = tips_df['date'].dt.strftime('%m/%d/%Y')
-        shifts_df['date'] = pd.to_datetime(shifts_df['date']).dt.strftime('%m/%d/%Y')
-        print(tips_df.dtypes)
-
-
-        # 4. Calculate total hours, shift_a, and shift_b by date in shifts_df
-        shifts_grouped = shifts_df.groupby('date').agg(
-            total_hours=('HOURS', 'sum'),  # Assuming 'HOURS' is the column name for shift duration
-            total_shift_a=('shift_a', 'sum'),
-            total_shift_b=('shift_b', 'sum')
-        ).reset_index()
-
-        print(shifts_grouped)
-
-        # 5. Calculate total tips, total_a_tips, and total_b_tips for each day in tips_df
-        #def calculate_tips_by_shift(group, shift_type):
-        """Helper function to calculate total tips for a specific shift type."""
-            #return group[group['shift'] == shift_type]['TIP'].sum()
-
-        tips_grouped = tips_df.groupby(['date', 'shift']).agg(
-            total_tips=('TIP', 'sum'),
-            total_a_tips=('TIP', lambda x: calculate_tips_by_shift(tips_df[tips_df['date'] == x.name], 'A')),
-            total_b_tips=('TIP', lambda x: calculate_tips_by_shift(tips_df[tips_df['date'] == x.name], 'B'))
-        ).reset_index()
-
-        print(tips_grouped)
-
-        # 6. Merge the aggregated dataframes
-        merged_df = pd.merge(shifts_grouped, tips_grouped, on='date', how='outer')
+        tips_df = get_clean_tip_data(data_dir)
+        shifts_df = get_clean_shift_data(data_dir)
+
+        # 2. Daily hours and tips of each shift type
+        rates_df = calculate_daily_rates(shifts_df, tips_df)
+
+        # 3. One row per date and location with the alpha and bravo columns next to each other
+        by_shift = rates_df.pivot(index=['date', 'location'], columns='shift_type',
+                                  values=['minutes_worked', 'tip_amount', 'hourly_tip_rate'])
+        by_shift = by_shift.reindex(columns=pd.MultiIndex.from_product([by_shift.columns.levels[0], ['a', 'b']]))
+        merged_df = pd.DataFrame({
+            'total_shift_a': by_shift[('minutes_worked', 'a')].fillna(0) / 60,
+            'total_shift_b': by_shift[('minutes_worked', 'b')].fillna(0) / 60,
+            'total_a_tips': by_shift[('tip_amount', 'a')].fillna(0),
+            'total_b_tips': by_shift[('tip_amount', 'b')].fillna(0),
+            'tip_rate_a': by_shift[('hourly_tip_rate', 'a')].fillna(0),
+            'tip_rate_b': by_shift[('hourly_tip_rate', 'b')].fillna(0),
+        })
+
+        # quantic's own hours of each day, next to the split hours
+        shifts_df['date'] = shifts_df['date'].to_numpy().astype('datetime64[D]').astype(object)
+        merged_df.insert(0, 'total_hours', shifts_df.groupby(['date', 'location'])['hours'].sum())
+        merged_df = merged_df.reset_index()
+
+        # 4. Output Results
+        if output_file:
+            merged_df.to_excel(output_file, index=False)
+            print(f"✅ Tip calculations written to: {output_file}")
+        print(merged_df)
 
-        # 7. Calculate Tip Rates (Handle potential division by zero)
-        merged_df['tip_rate_a'] = merged_df.apply(
-            lambda row: row['total_a_tips'] / row['total_shift_a'] if row['total_shift_a'] > 0 else 0, axis=1
-        )
-        merged_df['tip_rate_b'] = merged_df.apply(
-            lambda row: row['total_b_tips'] / row['total_shift_b'] if row['total_shift_b'] > 0 else 0, axis=1
-        )
+        # 5. Cross check with the payroll
+        if check:
+            mismatches = check_against_payroll(rates_df, PayrollRun(data_dir=data_dir))
+            if len(mismatches):
+                print(f"Warning: {len(mismatches)} daily groups don't match the payroll")
+                print(mismatches)
+            else:
+                print("✅ Daily hours and tips match the payroll")
 
-        # 8. Output Results
-        # merged_df.to_excel(OUTPUT_FILE, index=False)
-        print(merged_df)
-        print(f"✅ Tip calculations written to: {OUTPUT_FILE}")
+        return merged_df
 
     except FileNotFoundError as e:
         print(f"Error: {e}")
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
 
 
 # === Entry Point ===
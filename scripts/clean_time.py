@@ -1,101 +1,77 @@
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-import os
+from elixir.operations import DATA_DIR, ElixirOperations, discover_locations
+from elixir.operations.payroll_engine import format_clock_times
+from elixir.operations.work_team import eastern, split_team_arrays
 
 
 # === Config ===
-SHIFT_BOUNDARY = datetime.strptime("6:30 PM", '%I:%M %p').time()
-TIME_FORMAT = '%m-%d-%y %I:%M %p'
-INPUT_FILES = {
-    'Monroe': 'data/m_time_33125.csv',
-    'Buford': 'data/b_time_33125.csv'
-}
+# the time csvs of every location are read from the same data folder the elixir package uses,
+# e.g. data/monroe/time/*.csv, and split at the package's SHIFT_BOUNDARY
 OUTPUT_FILE = 'data/processed_shifts.xlsx'
+MICROSECONDS_PER_HOUR = 3_600_000_000
+
+
+# === Time Conversions ===
+def to_epoch_and_local(times: pd.Series) -> tuple[np.ndarray, pd.Series]:
+    """Epoch microseconds and naive local wall clock of a column of aware eastern datetimes."""
+    times = pd.to_datetime(times, utc=True).dt.as_unit('us')
+    epoch_us = times.dt.tz_localize(None).to_numpy().astype(np.int64)
+    local = times.dt.tz_convert(eastern).dt.tz_localize(None)
+    return epoch_us, local
+
 
 # === Shift Calculations ===
-def calculate_shift_a(row, shift_boundary):
-    if pd.isna(row['CLOCKED IN']) or pd.isna(row['CLOCKED OUT']):
-        return 0
-
-    time_in = row['CLOCKED IN'].time()
-    time_out = row['CLOCKED OUT'].time()
-
-    if row['CLOCKED IN'].date() == row['CLOCKED OUT'].date():
-        if time_in < shift_boundary:
-            shift_a_end = min(shift_boundary, time_out)
-            shift_a = (datetime.combine(row['CLOCKED IN'].date(), shift_a_end) - row['CLOCKED IN']).seconds / 3600
-            return round(shift_a, 2)
-    else:
-        if time_in >= shift_boundary:
-            return 0
-        else:
-            shift_a_end = datetime.combine(row['CLOCKED IN'].date(), shift_boundary)
-            shift_a = (shift_a_end - row['CLOCKED IN']).seconds / 3600
-            return round(shift_a, 2)
-    return 0
-
-
-def calculate_shift_b(row, shift_boundary):
-    if pd.isna(row['CLOCKED IN']) or pd.isna(row['CLOCKED OUT']):
-        return 0
-
-    time_out = row['CLOCKED OUT'].time()
-    time_in = row['CLOCKED IN'].time()
-
-    if row['CLOCKED IN'].date() != row['CLOCKED OUT'].date():
-        midnight = datetime.combine(row['CLOCKED IN'].date(), datetime.min.time()) + timedelta(days=1)
-        shift_b_start = max(shift_boundary, time_in)
-        shift_b = (midnight - datetime.combine(row['CLOCKED IN'].date(), shift_b_start)).seconds / 3600
-        shift_b += (row['CLOCKED OUT'] - midnight).seconds / 3600
-        return round(shift_b, 2)
-    else:
-        if time_out > shift_boundary:
-            shift_b_start = max(shift_boundary, time_in)
-            shift_b = (datetime.combine(row['CLOCKED OUT'].date(), time_out) - datetime.combine(
-                row['CLOCKED IN'].date(), shift_b_start)).seconds / 3600
-            return round(shift_b, 2)
-        return 0
+def calculate_shift_hours(start_us: np.ndarray, end_us: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """The alpha and bravo hours of every clock in/out, split with the package's
+        split_team_arrays so the hours agree with the payroll"""
+    split = split_team_arrays(start_us, end_us)
+    shift_a = np.where(split.has_a, split.a_end - split.a_start, 0) / MICROSECONDS_PER_HOUR
+    shift_b = np.where(split.has_b, split.b_end - split.b_start, 0) / MICROSECONDS_PER_HOUR
+    return shift_a, shift_b
 
 
 # === Main Processing ===
 def process_shifts(df):
-    df['date'] = df['CLOCKED IN'].dt.strftime("%m/%d/%Y")
-    df['time_in'] = df['CLOCKED IN'].dt.strftime("%I:%M %p")
-    df['time_out'] = df['CLOCKED OUT'].dt.strftime("%I:%M %p")
-    df['shift_a'] = df.apply(calculate_shift_a, axis=1, args=(SHIFT_BOUNDARY,))
-    df['shift_b'] = df.apply(calculate_shift_b, axis=1, args=(SHIFT_BOUNDARY,))
-    # we want create a new  row for each shift. the shift_a and shift_b columns will be the duration of the shift. this will go into the time_by_shift_df
-
+    start_us, clocked_in_local = to_epoch_and_local(df['clocked_in'])
+    end_us, clocked_out_local = to_epoch_and_local(df['clocked_out'])
+    df['date'] = clocked_in_local.dt.normalize()
+    df['time_in'] = format_clock_times(clocked_in_local.to_numpy())
+    df['time_out'] = format_clock_times(clocked_out_local.to_numpy())
+    shift_a, shift_b = calculate_shift_hours(start_us, end_us)
+    df['shift_a'] = np.round(shift_a, 2)
+    df['shift_b'] = np.round(shift_b, 2)
+    # unrounded hours for the daily sums in calc_tipout
+    df['minutes_a'] = shift_a * 60
+    df['minutes_b'] = shift_b * 60
     return df
 
 
-def read_and_prepare(file_path, location):
-    df = pd.read_csv(file_path)
-
-    # Remove rows where FIRST NAME ↑ is "Total" or blank
-    df = df[df['FIRST NAME ↑'].notna() & (df['FIRST NAME ↑'] != "Total")]
-
-    # Drop rows missing time info
-    df = df.dropna(subset=['CLOCKED IN', 'CLOCKED OUT'])
+def read_and_prepare(location, data_dir=DATA_DIR):
+    # the quantic parser reads the csvs and parses the clock in/out times a batch at a time
+    rows = ElixirOperations(location, stream=True, data_dir=data_dir).iter_time_rows()
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return df
 
-    try:
-        df['CLOCKED IN'] = pd.to_datetime(df['CLOCKED IN'], format=TIME_FORMAT)
-        df['CLOCKED OUT'] = pd.to_datetime(df['CLOCKED OUT'], format=TIME_FORMAT)
-    except Exception as e:
-        print(f"Error parsing dates in {location} file: {e}")
-        raise
+    # Remove the employee and grand total rows, they have no clock in/out
+    df = df[(df['first_name'] != "") & (df['first_name'] != "Total")]
+    df = df[(df['clocked_in'] != "") & (df['clocked_out'] != "")].copy()
 
+    df['hours'] = pd.to_numeric(df['hours'], errors='coerce')
     df['location'] = location
     return df
 
 
-def get_clean_shift_data():
-    # Load and clean both dataframes
-    df_monroe = read_and_prepare(INPUT_FILES['Monroe'], 'Monroe')
-    df_buford = read_and_prepare(INPUT_FILES['Buford'], 'Buford')
+def get_clean_shift_data(data_dir=DATA_DIR):
+    # Load and clean every location in the data folder
+    frames = [read_and_prepare(location, data_dir) for location in discover_locations(data_dir)]
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        raise FileNotFoundError(f"No time csv files found in {data_dir}")
 
     # Combine and process
-    df_combined = pd.concat([df_monroe, df_buford], ignore_index=True)
+    df_combined = pd.concat(frames, ignore_index=True)
     df_processed = process_shifts(df_combined)
 
     return df_processed
@@ -103,7 +79,10 @@ def get_clean_shift_data():
 
 def main():
     df = get_clean_shift_data()
-    df.to_excel(OUTPUT_FILE,index=False)
+    # excel has no time zones, the clock in/out are written as local wall clock
+    for column in ('clocked_in', 'clocked_out'):
+        df[column] = to_epoch_and_local(df[column])[1]
+    df.to_excel(OUTPUT_FILE, index=False)
     print(f"✅ Processed shift data written to: {OUTPUT_FILE}")
 
 if __name__ == "__main__":
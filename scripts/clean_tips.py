@@ -1,72 +1,63 @@
-import csv
-from datetime import datetime, time
+import numpy as np
 import pandas as pd
+from elixir.operations import DATA_DIR, ElixirOperations, discover_locations
+from elixir.operations.payroll_engine import format_clock_times
+from elixir.operations.work_team import get_team_codes
+from scripts.clean_time import to_epoch_and_local
 
 # === Config ===
-SHIFT_CUTOFF = time(18, 30)  # 6:30 PM
-INPUT_FILES = {
-    'Monroe': 'data/m_tip_3_31.csv',
-    'Buford': 'data/b_tip_3_31.csv'
-}
+# the tips csvs of every location are read from the package's data folder, e.g.
+# data/monroe/tips/*.csv. tips are put on a shift with the package's SHIFT_BOUNDARY
 EXPORT_PREFIX = 'data/processed_tips_'
 
 
 # === CSV Reading and Cleaning ===
-def read_and_parse_tips(csv_path):
-    rows = []
-    with open(csv_path, mode='r', newline='', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            if row["REF#"] != "TOTAL":
-                rows.append(row)
-    return rows
+def read_and_parse_tips(location, data_dir=DATA_DIR):
+    # the quantic parser reads the csvs and parses the tip times a batch at a time
+    rows = ElixirOperations(location, stream=True, data_dir=data_dir).iter_tip_rows()
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return df
 
+    # the TOTAL row has no tip time
+    df = df[(df['ref'] != "TOTAL") & (df['date_time'] != "")].copy()
+    df['location'] = location
+    return df
 
-def enrich_tip_rows(rows):
-    for row in rows:
-        parsed_dt = datetime.strptime(row["DATE/TIME"], '%m-%d-%y %I:%M %p')
-        row["day"] = parsed_dt.strftime("%A")
-        row["date"] = parsed_dt.strftime("%m/%d/%Y")
-        row["time"] = parsed_dt.strftime("%H:%M")
-        row["12_time"] = parsed_dt.strftime("%I:%M %p")
-        row["iso_dt"] = parsed_dt.isoformat()
-        row["shift"] = "B" if parsed_dt.time() > SHIFT_CUTOFF else "A"
 
-        row["SHIFTNDATE"] = f"{parsed_dt.strftime('YYY-MM-DD')}_{row['shift']}"
-    return rows
+def enrich_tip_rows(df):
+    # every column is worked out for the whole frame at once
+    epoch_us, local = to_epoch_and_local(df['date_time'])
+    df['day'] = local.dt.day_name()
+    df['date'] = local.dt.normalize()
+    df['time'] = local.dt.hour.astype(str).str.zfill(2) + ":" + local.dt.minute.astype(str).str.zfill(2)
+    df['12_time'] = format_clock_times(local.to_numpy())
+    # "A" before the boundary and "B" after it, tips right on the boundary belong to no
+    # shift and get "" the same as the tip parser leaves them out
+    df['shift'] = pd.Series(get_team_codes(epoch_us), index=df.index).str.upper()
+    df['SHIFTNDATE'] = np.datetime_as_string(local.to_numpy().astype('datetime64[D]')).astype(object) + "_" + df['shift']
+    return df
 
 
 # === Main Processing Function ===
-def get_clean_tip_data():
-    rows_m = enrich_tip_rows(read_and_parse_tips(INPUT_FILES['Monroe']))
-    rows_b = enrich_tip_rows(read_and_parse_tips(INPUT_FILES['Buford']))
-    combined_rows = rows_m + rows_b
-
-    for row in combined_rows:
-        tip = row.get("TIP")
-        row["TIP"] = tip.replace("$", "").strip()
-        row["TIP"] = float(row["TIP"])
-        # convert date to datetime
-        date = row.get("date")
-        row["date"] = datetime.strptime(date, "%m/%d/%Y")
+def get_clean_tip_data(data_dir=DATA_DIR):
+    frames = [read_and_parse_tips(location, data_dir) for location in discover_locations(data_dir)]
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        raise FileNotFoundError(f"No tips csv files found in {data_dir}")
 
-    df = pd.DataFrame(combined_rows)
+    df = enrich_tip_rows(pd.concat(frames, ignore_index=True))
+    df['TIP'] = pd.to_numeric(df['tip'].str.replace('$', '', regex=False).str.replace(',', '', regex=False).str.strip(),
+                              errors='coerce').fillna(0.0)
     return df
 
 def process_tip_data():
     df = get_clean_tip_data()
 
-    df = df.groupby(['date', 'shift']).agg(
+    df = df.groupby(['date', 'location', 'shift']).agg(
         total_tips=('TIP', 'sum'),
-        # total_a_tips=('TIP', lambda x: calculate_tips_by_shift(tips_df[tips_df['date'] == x.name], 'A')),
-        # total_b_tips=('TIP', lambda x: calculate_tips_by_shift(tips_df[tips_df['date'] == x.name], 'B'))
     )
     print(df)
-    # now = datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
-    # output_path = f"{EXPORT_PREFIX}{now}.xlsx"
-    #
-    # df.to_excel(output_path, index=False)
-    # print(f"✅ Processed tip data written to: {output_path}")
 
 # === Entry Point ===
 if __name__ == "__main__":